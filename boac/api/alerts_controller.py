@@ -26,7 +26,6 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from boac.api.util import advisor_required
 from boac.lib.http import tolerant_jsonify
 from boac.models.alert import Alert
-from boac.models.cohort_filter import CohortFilter
 from flask import current_app as app
 from flask_login import current_user
 
@@ -36,5 +35,4 @@ from flask_login import current_user
 def dismiss_alert(alert_id):
     user_id = current_user.get_id()
     Alert.dismiss(alert_id, user_id)
-    CohortFilter.refresh_alert_counts_for_owner(user_id)
     return tolerant_jsonify({'message': f'Alert {alert_id} dismissed by UID {current_user.get_uid()}'}), 200
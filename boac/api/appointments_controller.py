@@ -23,16 +23,21 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+from datetime import datetime, timedelta
+from threading import BoundedSemaphore
+import time
 import urllib.parse
 
+from boac import std_commit
 from boac.api.errors import BadRequestError, ForbiddenRequestError, ResourceNotFoundError
 from boac.api.util import advising_data_access_required, authorized_users_api_feed, drop_in_advisors_for_dept_code, scheduler_required
 from boac.lib.berkeley import BERKELEY_DEPT_CODE_TO_NAME
+from boac.lib.change_feed import appointment_changes
 from boac.lib.http import tolerant_jsonify
 from boac.lib.sis_advising import get_legacy_attachment_stream
-from boac.lib.util import localize_datetime, localized_timestamp_to_utc, process_input_from_rich_text_editor, utc_now
+from boac.lib.util import localize_datetime, localized_timestamp_to_utc, process_input_from_rich_text_editor, to_int_or_none, utc_now
 from boac.merged.student import get_distilled_student_profiles
-from boac.models.appointment import Appointment
+from boac.models.appointment import Appointment, appointments_to_api_json
 from boac.models.appointment_availability import AppointmentAvailability
 from boac.models.appointment_event import appointment_event_type
 from boac.models.appointment_read import AppointmentRead
@@ -40,6 +45,9 @@ from boac.models.authorized_user import AuthorizedUser
 from flask import current_app as app, request, Response
 from flask_login import current_user
 
+# Bounds the WSGI threads in this process that long polling may hold.
+_long_poll_slots = BoundedSemaphore(app.config['APPT_DESK_LONG_POLL_MAX_WAITERS'])
+
 
 @app.route('/api/appointments/waitlist/<dept_code>')
 @scheduler_required
@@ -53,23 +61,32 @@ def get_waitlist(dept_code):
     elif _is_current_user_authorized():
         show_all_statuses = current_user.is_drop_in_advisor or current_user.is_admin
         statuses = appointment_event_type.enums if show_all_statuses else ['reserved', 'waiting']
-        unresolved = []
-        resolved = []
-        for appointment in Appointment.get_drop_in_waitlist(dept_code, statuses):
-            a = appointment.to_api_json(current_user.get_id())
-            if a['status'] in ['reserved', 'waiting']:
-                unresolved.append(a)
-            else:
-                resolved.append(a)
-        _put_student_profile_per_appointment(unresolved)
-        _put_student_profile_per_appointment(resolved)
-        return tolerant_jsonify({
-            'advisors': drop_in_advisors_for_dept_code(dept_code),
-            'waitlist': {
-                'unresolved': unresolved,
-                'resolved': resolved,
-            },
-        })
+        version = _wait_for_change(
+            dept_code,
+            lambda: Appointment.get_drop_in_waitlist_version(dept_code, current_user.get_id(), statuses),
+        )
+        if request.if_none_match.contains(version):
+            response = Response(status=304)
+        else:
+            unresolved = []
+            resolved = []
+            waitlist = Appointment.get_drop_in_waitlist(dept_code, statuses)
+            for a in appointments_to_api_json(waitlist, current_user.get_id()):
+                if a['status'] in ['reserved', 'waiting']:
+                    unresolved.append(a)
+                else:
+                    resolved.append(a)
+            _put_student_profile_per_appointment(unresolved + resolved)
+            response = tolerant_jsonify({
+                'advisors': drop_in_advisors_for_dept_code(dept_code),
+                'waitlist': {
+                    'unresolved': unresolved,
+                    'resolved': resolved,
+                },
+            })
+        response.set_etag(version)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     else:
         raise ForbiddenRequestError(f'You are unauthorized to manage {dept_code} appointments.')
 
@@ -86,18 +103,55 @@ def get_today_scheduled_appointments(dept_code):
     elif _is_current_user_authorized():
         local_today = localize_datetime(utc_now())
         advisor_uid = request.args.get('advisorUid')
-        scheduled_for_today = Appointment.get_scheduled(dept_code, local_today, advisor_uid)
-        appointments = [a.to_api_json(current_user.get_id()) for a in scheduled_for_today]
-        openings = AppointmentAvailability.get_openings(dept_code, local_today, appointments)
-        _put_student_profile_per_appointment(appointments)
-        return tolerant_jsonify({
-            'appointments': appointments,
-            'openings': openings,
-        })
+        version = _wait_for_change(
+            dept_code,
+            lambda: Appointment.get_scheduled_version(dept_code, local_today, current_user.get_id(), advisor_uid),
+        )
+        if request.if_none_match.contains(version):
+            response = Response(status=304)
+        else:
+            scheduled_for_today = Appointment.get_scheduled(dept_code, local_today, advisor_uid)
+            appointments = appointments_to_api_json(scheduled_for_today, current_user.get_id())
+            booked_times = [(a.advisor_uid, a.scheduled_time) for a in scheduled_for_today]
+            openings = AppointmentAvailability.get_openings(dept_code, [local_today], booked_times)
+            _put_student_profile_per_appointment(appointments)
+            response = tolerant_jsonify({
+                'appointments': appointments,
+                'openings': openings,
+            })
+        response.set_etag(version)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     else:
         raise ForbiddenRequestError(f'You are unauthorized to manage {dept_code} appointments.')
 
 
+@app.route('/api/appointments/openings/<dept_code>')
+@scheduler_required
+def get_openings(dept_code):
+    dept_code = dept_code.upper()
+    if dept_code not in BERKELEY_DEPT_CODE_TO_NAME:
+        raise ResourceNotFoundError(f'Unrecognized department code: {dept_code}')
+    if not (current_user.is_admin or dept_code in _dept_codes_with_scheduler_privilege()):
+        raise ForbiddenRequestError(f'You are unauthorized to manage {dept_code} appointments.')
+    local_today = localize_datetime(utc_now()).strftime('%Y-%m-%d')
+    try:
+        start_date = datetime.strptime(request.args.get('startDate') or local_today, '%Y-%m-%d')
+        end_date = datetime.strptime(request.args.get('endDate') or request.args.get('startDate') or local_today, '%Y-%m-%d')
+    except ValueError:
+        raise BadRequestError('Invalid startDate or endDate value')
+    day_count = (end_date - start_date).days + 1
+    if day_count < 1:
+        raise BadRequestError('startDate must not be later than endDate')
+    max_days = app.config['SCHEDULED_APPOINTMENT_OPENINGS_MAX_DAYS']
+    if day_count > max_days:
+        raise BadRequestError(f'Openings can be requested for at most {max_days} days at a time')
+    scheduled = Appointment.get_scheduled_for_date_range(dept_code, start_date, end_date)
+    dates = [start_date + timedelta(days=i) for i in range(day_count)]
+    openings = AppointmentAvailability.get_openings(dept_code, dates, [(a.advisor_uid, a.scheduled_time) for a in scheduled])
+    return tolerant_jsonify(openings)
+
+
 @app.route('/api/appointments/<appointment_id>')
 @advising_data_access_required
 def get_appointment(appointment_id):
@@ -290,6 +344,16 @@ def mark_appointment_read(appointment_id):
     return tolerant_jsonify(AppointmentRead.find_or_create(current_user.get_id(), appointment_id).to_api_json())
 
 
+@app.route('/api/appointments/mark_read', methods=['POST'])
+@advising_data_access_required
+def mark_appointments_read():
+    appointment_ids = (request.get_json() or {}).get('appointmentIds')
+    if not isinstance(appointment_ids, list) or not appointment_ids:
+        raise BadRequestError('Requires \'appointmentIds\' param')
+    AppointmentRead.mark_read(current_user.get_id(), appointment_ids)
+    return tolerant_jsonify({'status': 'created'}, status=201)
+
+
 @app.route('/api/appointments/attachment/<attachment_id>', methods=['GET'])
 @advising_data_access_required
 def download_legacy_appointment_attachment(attachment_id):
@@ -345,3 +409,29 @@ def _put_student_profile_per_appointment(waitlist):
             sid = student['sid']
             for appointment in appointments_by_sid[sid]:
                 appointment['student'] = student
+
+
+def _wait_for_change(dept_code, get_version):
+    # Front-desk screens poll; the caller skips the rebuild when nothing has changed since the client's last fetch. If the
+    # client asks to wait, hold the request open until a change is committed or the wait times out.
+    wait = min(to_int_or_none(request.args.get('wait', 0)) or 0, app.config['APPT_DESK_LONG_POLL_TIMEOUT'])
+    if wait > 0 and _long_poll_slots.acquire(blocking=False):
+        try:
+            return _wait_for_version_change(dept_code, get_version, deadline=time.time() + wait)
+        finally:
+            _long_poll_slots.release()
+    # Not asked to wait, or every long-poll slot in this process is taken.
+    return get_version()
+
+
+def _wait_for_version_change(dept_code, get_version, deadline):
+    while True:
+        since = appointment_changes.sequence(dept_code)
+        version = get_version()
+        remaining = deadline - time.time()
+        if not request.if_none_match.contains(version) or remaining <= 0:
+            return version
+        # Release the database connection while idle.
+        std_commit()
+        if not appointment_changes.wait(dept_code, since, timeout=remaining):
+            return version
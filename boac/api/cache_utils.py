@@ -28,7 +28,6 @@ import re
 from threading import Thread
 
 from boac import std_commit
-from boac.externals import data_loch
 from boac.merged.sis_terms import all_term_ids, current_term_id
 from boac.models.alert import Alert
 from boac.models.curated_group import CuratedGroupStudent
@@ -112,33 +111,47 @@ def load_all_terms():
             app.logger.error(f'Unexpected terms_done value; stopping load: {terms_done}')
             return
         term_id = next(t for t in all_terms if t not in terms_done)
-        load_term(term_id)
+        load_term(term_id, recount_alerts=False)
         terms_done.append(term_id)
         JobProgress().update(f'Term {term_id} loaded', properties={'terms_done': terms_done})
+    JobProgress().update('About to recount alerts')
+    Alert.refresh_alert_counts()
 
 
-def load_term(term_id=current_term_id(use_cache=False)):
+def load_term(term_id=current_term_id(use_cache=False), recount_alerts=True):
     if term_id == 'all':
         load_all_terms()
         return
 
     JobProgress().update(f'About to refresh alerts for term {term_id}')
-    refresh_alerts(term_id)
+    refresh_alerts(term_id, recount=recount_alerts)
 
     if term_id == current_term_id():
+        JobProgress().update('About to clear cached enrollment histories')
+        clear_merged_enrollment_terms()
         JobProgress().update('About to refresh department memberships')
         refresh_department_memberships()
         JobProgress().update('About to refresh CalNet attributes for active users')
         refresh_calnet_attributes()
+        JobProgress().update('About to refresh typeahead index of student and advisor names')
+        refresh_typeahead_index()
+        JobProgress().update(f'About to refresh index of enrolled primary sections for term {term_id}')
+        refresh_enrolled_primary_section_index(term_id)
         JobProgress().update('About to load filtered cohort counts')
         load_filtered_cohort_counts()
         JobProgress().update('About to update curated group memberships')
         update_curated_group_lists()
 
 
-def refresh_alerts(term_id):
-    Alert.deactivate_all_for_term(term_id)
-    Alert.update_all_for_term(term_id)
+def refresh_alerts(term_id, recount=True):
+    Alert.deactivate_all_for_term(term_id, recount=False)
+    Alert.update_all_for_term(term_id, recount=recount)
+
+
+def clear_merged_enrollment_terms():
+    from boac.models import json_cache
+    json_cache.clear('merged_enrollment_terms_%')
+    std_commit()
 
 
 def refresh_calnet_attributes():
@@ -151,6 +164,18 @@ def refresh_calnet_attributes():
     app.logger.info(f'Cached {len(new_attrs)} CalNet records for {len(active_uids)} active users')
 
 
+def refresh_enrolled_primary_section_index(term_id):
+    from boac.merged import sis_sections
+    index = sis_sections.refresh_enrolled_primary_section_index(term_id)
+    app.logger.info(f'Indexed {len(index.sections)} enrolled primary sections for term {term_id}')
+
+
+def refresh_typeahead_index():
+    from boac.merged import typeahead
+    index = typeahead.refresh_typeahead_index()
+    app.logger.info(f'Indexed {len(index.current_students.entries)} current students for typeahead')
+
+
 def refresh_current_term_index():
     from boac.merged import sis_terms
     from boac.models import json_cache
@@ -196,17 +221,20 @@ def load_filtered_cohort_counts():
     for cohort in CohortFilter.query.all():
         # Remove!
         cohort.clear_sids_and_student_count()
-        cohort.update_alert_count(None)
         # Reload!
-        cohort.to_api_json(include_students=False, include_alerts_for_user_id=cohort.owner_id)
+        cohort.to_api_json(include_students=False)
 
 
 def update_curated_group_lists():
-    """Remove no-longer-accessible students from curated group lists."""
+    """Remove no-longer-accessible students from curated group lists and refresh membership sort keys."""
     from boac.models.curated_group import CuratedGroup
     for curated_group in CuratedGroup.query.all():
         all_sids = CuratedGroupStudent.get_sids(curated_group.id)
-        available_students = [s['sid'] for s in data_loch.get_student_profiles(all_sids)]
+        sort_keys = curated_group.index_students(all_sids)
+        if sort_keys is None:
+            continue
+        # Non-current students are removed, along with SIDs unknown to the loch.
+        available_students = [row['sid'] for row in sort_keys if not row['historical']]
         if len(all_sids) > len(available_students):
             unavailable_sids = set(all_sids) - set(available_students)
             app.logger.info(f'Deleting inaccessible SIDs from curated group {curated_group.id}: {unavailable_sids}')
@@ -32,6 +32,7 @@ from boac.lib.berkeley import dept_codes_where_advising
 from boac.lib.http import tolerant_jsonify
 from boac.lib.util import get as get_param, get_benchmarker, to_bool_or_none as to_bool
 from boac.merged import calnet
+from boac.merged.alert_badges import get_alert_badges
 from boac.merged.cohort_filter_options import CohortFilterOptions
 from boac.merged.student import get_student_query_scope as get_query_scope, get_summary_student_profiles
 from boac.models.authorized_user import AuthorizedUser
@@ -48,7 +49,10 @@ def my_cohorts():
     if is_unauthorized_domain(domain):
         raise ForbiddenRequestError(f'You are unauthorized to query the \'{domain}\' domain')
     cohorts = []
+    alert_counts = get_alert_badges(current_user.get_id())['cohorts'] if domain == 'default' else {}
     for cohort in CohortFilter.get_cohorts_of_user_id(current_user.get_id(), domain=domain):
+        if domain == 'default':
+            cohort['alertCount'] = alert_counts.get(cohort['id'], 0)
         cohort['isOwnedByCurrentUser'] = True
         cohorts.append(cohort)
     return tolerant_jsonify(cohorts)
@@ -42,6 +42,7 @@ from flask_login import current_user
 def app_config():
     return tolerant_jsonify({
         'academicStandingDescriptions': ACADEMIC_STANDING_DESCRIPTIONS,
+        'apptDeskLongPollTimeout': app.config['APPT_DESK_LONG_POLL_TIMEOUT'],
         'apptDeskRefreshInterval': app.config['APPT_DESK_REFRESH_INTERVAL'],
         'boacEnv': app.config['BOAC_ENV'],
         'currentEnrollmentTerm': current_term_name(),
@@ -26,9 +26,10 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from boac.api.errors import BadRequestError, ResourceNotFoundError
 from boac.lib.background import bg_execute
 from boac.lib.berkeley import dept_codes_where_advising
-from boac.models.degree_progress_category import DegreeProgressCategory
+from boac.lib.util import is_int
+from boac.models.degree_check_batch_job import DegreeCheckBatchJob
 from boac.models.degree_progress_template import DegreeProgressTemplate
-from boac.models.degree_progress_unit_requirement import DegreeProgressUnitRequirement
+from flask import current_app as app
 from flask_login import current_user
 
 
@@ -45,71 +46,42 @@ def clone_degree_template(template_id, name=None, sid=None):
 
 
 def create_batch_degree_checks(template_id, sids):
-    created_by = current_user.get_id()
-    advisor_dept_codes = dept_codes_where_advising(current_user)
-    results_by_sid = {}
+    template = fetch_degree_template(template_id)
+    job = DegreeCheckBatchJob.create(
+        advisor_dept_codes=dept_codes_where_advising(current_user),
+        created_by=current_user.get_id(),
+        sids=sids,
+        template_id=template.id,
+    )
+    _run_batch_job(job.id)
+    return job.to_api_json()
+
+
+def fetch_batch_job(job_id):
+    job = is_int(job_id) and DegreeCheckBatchJob.find_by_id(job_id)
+    if not job:
+        raise ResourceNotFoundError(f'No batch job found with id={job_id}.')
+    return job
 
-    def _create(db_session):
-        template = fetch_degree_template(template_id)
-        if template_id and not template:
-            raise ResourceNotFoundError(f'No template found with id={template_id}.')
-        for sid in sids:
-            degree_check = clone(template, created_by, advisor_dept_codes, sid=sid, db_session=db_session)
-            results_by_sid[sid] = degree_check.id
 
-    bg_execute(_create)
-    return {'percentComplete': 0}
+def resume_batch_job(job_id):
+    job = fetch_batch_job(job_id)
+    if not DegreeCheckBatchJob.claim(job_id=job.id, retry_failed=True):
+        raise BadRequestError(f'Batch job {job_id} is still running.')
+    _run_batch_job(job.id)
+    return job.to_api_json()
 
 
 def clone(template, created_by, advisor_dept_codes, name=None, sid=None, db_session=None):
-    clone = DegreeProgressTemplate.create(
-        advisor_dept_codes=advisor_dept_codes,
+    clone_ids = DegreeProgressTemplate.create_clones(
+        template_id=template.id,
         created_by=created_by,
-        degree_name=name or template.degree_name,
-        parent_template_id=template.id if sid else None,
-        student_sid=sid,
+        advisor_dept_codes=advisor_dept_codes,
+        sids=[sid],
+        degree_name=name,
         db_session=db_session,
     )
-    unit_requirements_by_source_id = {}
-    for unit_requirement in template.unit_requirements:
-        source_id = unit_requirement.id
-        unit_requirements_by_source_id[source_id] = DegreeProgressUnitRequirement.create(
-            created_by=created_by,
-            min_units=unit_requirement.min_units,
-            name=unit_requirement.name,
-            template_id=clone.id,
-            db_session=db_session,
-        )
-
-    def _create_category(category_, parent_id):
-        unit_requirement_ids = []
-        for u in category_['unitRequirements']:
-            source_id_ = u['id']
-            cross_reference = unit_requirements_by_source_id[source_id_]
-            unit_requirement_ids.append(cross_reference.id)
-        return DegreeProgressCategory.create(
-            category_type=category_['categoryType'],
-            name=category_['name'],
-            position=category_['position'],
-            template_id=clone.id,
-            course_units_lower=category_['unitsLower'],
-            course_units_upper=category_['unitsUpper'],
-            description=category_['description'],
-            parent_category_id=parent_id,
-            unit_requirement_ids=unit_requirement_ids,
-            db_session=db_session,
-        )
-    for category in DegreeProgressCategory.get_categories(template_id=template.id):
-        c = _create_category(category_=category, parent_id=None)
-        for course in category['courseRequirements']:
-            _create_category(category_=course, parent_id=c.id)
-        for subcategory in category['subcategories']:
-            s = _create_category(category_=subcategory, parent_id=c.id)
-            for course in subcategory['courseRequirements']:
-                _create_category(category_=course, parent_id=s.id)
-
-    # TODO: Unit requirements?
-    return DegreeProgressTemplate.find_by_id(clone.id)
+    return DegreeProgressTemplate.find_by_id(clone_ids[sid])
 
 
 def fetch_degree_template(template_id):
@@ -127,3 +99,7 @@ def validate_template_upsert(name, template_id=None):
     if template and (template_id is None or template_id != template.id):
         raise BadRequestError(f'A degree named <strong>{name}</strong> already exists. Please choose a different name.')
     return template
+
+
+def _run_batch_job(job_id):
+    bg_execute(DegreeCheckBatchJob.run, job_id=job_id, batch_size=app.config['DEGREE_CHECK_BATCH_SIZE'])
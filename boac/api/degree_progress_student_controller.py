@@ -23,7 +23,12 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
-from boac.api.degree_progress_api_utils import clone_degree_template, create_batch_degree_checks
+from boac.api.degree_progress_api_utils import (
+    clone_degree_template,
+    create_batch_degree_checks,
+    fetch_batch_job,
+    resume_batch_job,
+)
 from boac.api.errors import BadRequestError, ResourceNotFoundError
 from boac.api.util import can_edit_degree_progress, can_read_degree_progress
 from boac.externals.data_loch import get_basic_student_data, get_sid_by_uid
@@ -49,6 +54,19 @@ def batch_degree_checks():
     return tolerant_jsonify(create_batch_degree_checks(template_id=template_id, sids=sids))
 
 
+@app.route('/api/degree/check/batch/<job_id>')
+@can_read_degree_progress
+def get_batch_degree_check_job(job_id):
+    job = fetch_batch_job(job_id)
+    return tolerant_jsonify(job.to_api_json(include_students=True))
+
+
+@app.route('/api/degree/check/batch/<job_id>/resume', methods=['POST'])
+@can_edit_degree_progress
+def resume_batch_degree_check_job(job_id):
+    return tolerant_jsonify(resume_batch_job(job_id))
+
+
 @app.route('/api/degree/check/<sid>/create', methods=['POST'])
 @can_edit_degree_progress
 def create_degree_check(sid):
@@ -70,6 +70,16 @@ def mark_note_read(note_id):
         raise BadRequestError(f'Failed to mark note {note_id} as read by user {current_user.get_uid()}')
 
 
+@app.route('/api/notes/mark_read', methods=['POST'])
+@advising_data_access_required
+def mark_notes_read():
+    note_ids = (request.get_json() or {}).get('noteIds')
+    if not isinstance(note_ids, list) or not note_ids:
+        raise BadRequestError('Requires \'noteIds\' param')
+    NoteRead.mark_read(current_user.get_id(), note_ids)
+    return tolerant_jsonify({'status': 'created'}, status=201)
+
+
 @app.route('/api/notes/create', methods=['POST'])
 @advising_data_access_required
 def create_notes():
@@ -213,6 +223,7 @@ def download_notes_and_attachments(sid):
     if not stream_data or not stream_data['stream']:
         return Response('Notes not available.', mimetype='text/html', status=404)
     r = Response(stream_data['stream'])
+    r.call_on_close(stream_data['close'])
     r.headers['Content-Type'] = 'application/zip'
     r.headers['Content-Disposition'] = f"attachment; filename={stream_data['filename']}"
     return r
@@ -24,20 +24,22 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 
 from datetime import timedelta
-from itertools import islice
+from functools import partial
 
 from boac import db
 from boac.api.errors import BadRequestError, ForbiddenRequestError
 from boac.api.util import add_alert_counts, advising_data_access_required, advisor_required, ce3_required, is_unauthorized_search
-from boac.externals.data_loch import get_enrolled_primary_sections, get_enrolled_primary_sections_for_parsed_code, match_advising_note_authors_by_name
 from boac.lib import util
+from boac.lib.background import concurrent_execute
 from boac.lib.http import tolerant_jsonify
 from boac.merged.admitted_student import search_for_admitted_students
 from boac.merged.advising_appointment import search_advising_appointments
 from boac.merged.advising_note import search_advising_notes
 from boac.merged.calnet import get_uid_for_csid
+from boac.merged.sis_sections import search_enrolled_primary_sections, search_enrolled_primary_sections_for_parsed_code
 from boac.merged.sis_terms import current_term_id
 from boac.merged.student import search_for_students
+from boac.merged.typeahead import match_advising_note_authors_by_name
 from boac.models.alert import Alert
 from boac.models.authorized_user import AuthorizedUser
 from flask import current_app as app, request
@@ -67,20 +69,24 @@ def search():
     if (domain['notes'] or domain['appointments']) and not current_user.can_access_advising_data:
         raise ForbiddenRequestError('Unauthorized to search notes and appointments')
 
-    feed = {}
-
+    # Domains are searched concurrently. A domain that misses its deadline is reported in 'timedOut' and its results
+    # are left out of the feed.
+    tasks = {}
     if domain['appointments']:
-        feed.update(_appointments_search(search_phrase, params))
-
+        tasks['appointments'] = partial(_appointments_search, search_phrase, params)
     if len(search_phrase) and domain['students']:
-        feed.update(_student_search(search_phrase, params, order_by))
-
+        tasks['students'] = partial(_student_search, search_phrase, params, order_by)
     if len(search_phrase) and domain['courses']:
-        feed.update(_course_search(search_phrase))
-
+        tasks['courses'] = partial(_course_search, search_phrase)
     if domain['notes']:
-        feed.update(_notes_search(search_phrase, params))
+        tasks['notes'] = partial(_notes_search, search_phrase, params)
+    results, latency, timed_out = concurrent_execute(tasks, timeouts=app.config['SEARCH_DOMAIN_TIMEOUTS'])
 
+    feed = {}
+    for domain_feed in results.values():
+        feed.update(domain_feed)
+    feed['latency'] = latency
+    feed['timedOut'] = timed_out
     return tolerant_jsonify(feed)
 
 
@@ -251,6 +257,7 @@ def _student_search(search_phrase, params, order_by):
 def _course_search(search_phrase):
     term_id = current_term_id()
     course_rows = []
+    total_course_count = 0
 
     def _compress_to_alphanumeric(s):
         return ''.join(e for e in s if e.isalnum())
@@ -267,28 +274,27 @@ def _course_search(search_phrase):
     if any(c.isdigit() for c in candidate_catalog_id):
         subject_area = candidate_subject_area and _compress_to_alphanumeric(candidate_subject_area).upper()
         catalog_id = candidate_catalog_id.upper()
-        course_rows = get_enrolled_primary_sections_for_parsed_code(term_id, subject_area, catalog_id)
+        course_rows, total_course_count = search_enrolled_primary_sections_for_parsed_code(term_id, subject_area, catalog_id, limit=50)
     # Otherwise just compress the search phrase to alphanumeric characters and look for a simple match.
     else:
         compressed_search_phrase = _compress_to_alphanumeric(search_phrase)
         if compressed_search_phrase:
-            course_rows = get_enrolled_primary_sections(term_id, compressed_search_phrase.upper())
+            course_rows, total_course_count = search_enrolled_primary_sections(term_id, compressed_search_phrase.upper(), limit=50)
 
     courses = []
-    if course_rows:
-        for row in islice(course_rows, 50):
-            courses.append({
-                'termId': row['term_id'],
-                'sectionId': row['sis_section_id'],
-                'courseName': row['sis_course_name'],
-                'courseTitle': row['sis_course_title'],
-                'instructionFormat': row['sis_instruction_format'],
-                'sectionNum': row['sis_section_num'],
-                'instructors': row['instructors'],
-            })
+    for row in course_rows:
+        courses.append({
+            'termId': row['term_id'],
+            'sectionId': row['sis_section_id'],
+            'courseName': row['sis_course_name'],
+            'courseTitle': row['sis_course_title'],
+            'instructionFormat': row['sis_instruction_format'],
+            'sectionNum': row['sis_section_num'],
+            'instructors': row['instructors'],
+        })
     return {
         'courses': courses,
-        'totalCourseCount': len(course_rows),
+        'totalCourseCount': total_course_count,
     }
 
 
@@ -24,12 +24,22 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 
 from boac.api.errors import BadRequestError, ResourceNotFoundError
-from boac.api.util import advisor_required, put_notifications
-from boac.externals.data_loch import get_students_by_sids, match_students_by_name_or_sid, query_historical_sids
+from boac.api.util import (
+    advising_data_access_required,
+    advisor_required,
+    decode_timeline_cursor,
+    get_timeline,
+    put_notifications,
+    put_timeline,
+    TIMELINE_TYPES,
+)
+from boac.externals.data_loch import get_students_by_sids, query_historical_sids
 from boac.lib.http import tolerant_jsonify
 from boac.lib.util import to_bool_or_none
+from boac.merged.advising_note import get_advising_note
 from boac.merged.student import get_distinct_sids, get_student_and_terms_by_sid, get_student_and_terms_by_uid, \
     query_students
+from boac.merged.typeahead import match_students_by_name_or_sid
 from boac.models.degree_progress_template import DegreeProgressTemplate
 from flask import current_app as app, request
 from flask_login import current_user, login_required
@@ -43,7 +53,7 @@ def get_student_by_sid(sid):
     if not student:
         raise ResourceNotFoundError('Unknown student')
     if not profile_only:
-        put_notifications(student)
+        _put_timeline_json(student)
         _put_degree_checks_json(student)
     return tolerant_jsonify(student)
 
@@ -56,11 +66,42 @@ def get_student_by_uid(uid):
     if not student:
         raise ResourceNotFoundError('Unknown student')
     if not profile_only:
-        put_notifications(student)
+        _put_timeline_json(student)
         _put_degree_checks_json(student)
     return tolerant_jsonify(student)
 
 
+@app.route('/api/student/<sid>/timeline')
+@advisor_required
+def get_student_timeline(sid):
+    types = request.args.get('types')
+    types = types.split(',') if types else TIMELINE_TYPES
+    if next((t for t in types if t not in TIMELINE_TYPES), None):
+        raise BadRequestError(f'Timeline types must be among {TIMELINE_TYPES}')
+    cursor = request.args.get('cursor')
+    cursor = decode_timeline_cursor(cursor) if cursor else None
+    limit = request.args.get('limit')
+    if limit is not None and (not limit.isdigit() or int(limit) < 1):
+        raise BadRequestError('Limit must be a positive integer')
+    if 'requirement' in types:
+        # Degree requirements come from the SIS profile.
+        student = get_student_and_terms_by_sid(sid)
+        if not student:
+            raise ResourceNotFoundError('Unknown student')
+    else:
+        student = {'sid': sid}
+    return tolerant_jsonify(get_timeline(student, types=types, cursor=cursor, limit=limit and int(limit)))
+
+
+@app.route('/api/student/<sid>/timeline/note/<note_id>')
+@advising_data_access_required
+def get_student_timeline_note(sid, note_id):
+    note = get_advising_note(sid, note_id, legacy_source=request.args.get('legacySource'))
+    if not note:
+        raise ResourceNotFoundError('Note not found')
+    return tolerant_jsonify(note)
+
+
 @app.route('/api/students/distinct_sids', methods=['POST'])
 @login_required
 def distinct_student_count():
@@ -139,5 +180,13 @@ def _student_search_result(s):
     }
 
 
+def _put_timeline_json(student):
+    # With a paged timeline, the profile carries counts and the first page; the rest is fetched on demand.
+    if to_bool_or_none(request.args.get('pagedTimeline')):
+        put_timeline(student)
+    else:
+        put_notifications(student)
+
+
 def _put_degree_checks_json(student):
     student['degreeChecks'] = DegreeProgressTemplate.find_by_sid(student_sid=student['sid']) if current_user.can_read_degree_progress else []
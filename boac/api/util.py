@@ -23,8 +23,12 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+import base64
+from collections import OrderedDict
 from functools import wraps
 import json
+from threading import Lock
+import time
 
 from boac.api.errors import BadRequestError, ResourceNotFoundError
 from boac.externals.data_loch import get_admitted_students_by_sids, get_sis_holds, get_student_profiles
@@ -34,11 +38,13 @@ from boac.lib.util import join_if_present
 from boac.merged import calnet
 from boac.merged.advising_appointment import get_advising_appointments
 from boac.merged.advising_note import get_advising_notes
+from boac.merged.alert_badges import get_alert_badges
 from boac.merged.sis_terms import current_term_id
-from boac.merged.student import get_academic_standing_by_sid, get_historical_student_profiles, get_term_gpas_by_sid
+from boac.merged.student import get_academic_standing_by_sid, get_term_gpas_by_sid
 from boac.models.alert import Alert
-from boac.models.authorized_user_extension import DropInAdvisor
+from boac.models.authorized_user_extension import DropInAdvisor, SameDayAdvisor
 from boac.models.curated_group import CuratedGroup
+from boac.models.university_dept_member import UniversityDeptMember
 from boac.models.user_login import UserLogin
 from dateutil.tz import tzutc
 from flask import current_app as app, request
@@ -226,7 +232,14 @@ def add_alert_counts(alert_counts, students):
 def authorized_users_api_feed(users, sort_by=None, sort_descending=False):
     if not users:
         return ()
-    calnet_users = calnet.get_calnet_users_for_uids(app, [u.uid for u in users])
+    # Fetch departments, advisor statuses, logins and CalNet profiles for all users in bulk, rather than per user.
+    user_ids = [u.id for u in users]
+    uids = [u.uid for u in users]
+    calnet_users = calnet.get_calnet_users_for_uids(app, uids)
+    memberships_per_user_id = UniversityDeptMember.get_memberships_per_user_id(user_ids)
+    drop_in_departments_per_user_id = DropInAdvisor.get_all_per_user_id(user_ids)
+    same_day_departments_per_user_id = SameDayAdvisor.get_all_per_user_id(user_ids)
+    last_login_per_uid = UserLogin.last_login_per_uid(uids)
     profiles = []
     for user in users:
         profile = calnet_users[user.uid]
@@ -246,19 +259,11 @@ def authorized_users_api_feed(users, sort_by=None, sort_descending=False):
             'canReadDegreeProgress': degree_progress_permission in ['read', 'read_write'] or user.is_admin,
             'degreeProgressPermission': degree_progress_permission,
             'deletedAt': _isoformat(user.deleted_at),
-            'departments': [],
+            'departments': memberships_per_user_id.get(user.id, []),
+            'dropInAdvisorStatus': [d.to_api_json() for d in drop_in_departments_per_user_id.get(user.id, [])],
+            'sameDayAdvisorStatus': [d.to_api_json() for d in same_day_departments_per_user_id.get(user.id, [])],
+            'lastLogin': _isoformat(last_login_per_uid.get(user.uid)),
         })
-        for m in user.department_memberships:
-            profile['departments'].append({
-                'code': m.university_dept.dept_code,
-                'name': m.university_dept.dept_name,
-                'role': m.role,
-                'automateMembership': m.automate_membership,
-            })
-        profile['dropInAdvisorStatus'] = [d.to_api_json() for d in user.drop_in_departments]
-        profile['sameDayAdvisorStatus'] = [d.to_api_json() for d in user.same_day_departments]
-        user_login = UserLogin.last_login(user.uid)
-        profile['lastLogin'] = _isoformat(user_login.created_at) if user_login else None
         profiles.append(profile)
     sort_by = sort_by or 'lastName'
     return sorted(profiles, key=lambda p: (p.get(sort_by) is None, p.get(sort_by)), reverse=sort_descending)
@@ -267,71 +272,84 @@ def authorized_users_api_feed(users, sort_by=None, sort_descending=False):
 def drop_in_advisors_for_dept_code(dept_code):
     dept_code = dept_code.upper()
     advisor_assignments = DropInAdvisor.advisors_for_dept_code(dept_code)
+    feeds_per_user_id = {f['id']: f for f in authorized_users_api_feed([a.authorized_user for a in advisor_assignments])}
     advisors = []
     for a in advisor_assignments:
-        advisor = authorized_users_api_feed([a.authorized_user])[0]
-        if advisor['canAccessAdvisingData']:
+        advisor = feeds_per_user_id.get(a.authorized_user_id)
+        if advisor and advisor['canAccessAdvisingData']:
             advisor['available'] = a.is_available
             advisor['status'] = a.status
             advisors.append(advisor)
     return sorted(advisors, key=lambda u: ((u.get('firstName') or '').upper(), (u.get('lastName') or '').upper(), u.get('id')))
 
 
+TIMELINE_TYPES = ['alert', 'appointment', 'hold', 'note', 'requirement']
+
+# Sorted timeline items, without note bodies, per viewer, student and types. A snapshot is taken with the first page
+# and serves later pages from worker memory for up to TIMELINE_CACHE_TTL seconds, so that paging does not query every
+# source again. A page that finds no snapshot, as when served by another worker process, takes a new one.
+_timeline_snapshots = OrderedDict()
+_timeline_snapshots_lock = Lock()
+
+
 def put_notifications(student):
+    student['notifications'] = get_notifications(student)
+
+
+def get_notifications(student, types=None, include_note_bodies=True):
     sid = student['sid']
-    student['notifications'] = {
-        'alert': [],
-        'hold': [],
-        'requirement': [],
-    }
-    if current_user.can_access_advising_data:
-        student['notifications']['appointment'] = []
-        student['notifications']['note'] = []
+    types = TIMELINE_TYPES if types is None else types
+    if not current_user.can_access_advising_data:
+        types = [t for t in types if t not in ['appointment', 'note']]
+    notifications = {t: [] for t in types}
+    if 'appointment' in types:
         for appointment in get_advising_appointments(sid) or []:
             message = appointment['details']
-            student['notifications']['appointment'].append({
+            notifications['appointment'].append({
                 **appointment,
                 **{
                     'message': message.strip() if message else None,
                     'type': 'appointment',
                 },
             })
-
+    if 'note' in types:
         # The front-end requires 'type', 'message' and 'read'. Optional fields: id, status, createdAt, updatedAt.
-        for note in get_advising_notes(sid) or []:
+        for note in get_advising_notes(sid, include_bodies=include_note_bodies) or []:
             message = note['body']
-            student['notifications']['note'].append({
+            notifications['note'].append({
                 **note,
                 **{
                     'message': message.strip() if message else None,
                     'type': 'note',
                 },
             })
-    for alert in Alert.current_alerts_for_sid(viewer_id=current_user.get_id(), sid=sid):
-        student['notifications']['alert'].append({
-            **alert,
-            **{
-                'id': alert['id'],
-                'read': alert['dismissed'],
-                'type': 'alert',
-            },
-        })
-    for row in get_sis_holds(sid):
-        hold = json.loads(row['feed'])
-        reason = hold.get('reason', {})
-        student['notifications']['hold'].append({
-            **hold,
-            **{
-                'createdAt': hold.get('fromDate'),
-                'message': join_if_present('. ', [reason.get('description'), reason.get('formalDescription')]),
-                'read': True,
-                'type': 'hold',
-            },
-        })
+    if 'alert' in types:
+        for alert in Alert.current_alerts_for_sid(viewer_id=current_user.get_id(), sid=sid):
+            notifications['alert'].append({
+                **alert,
+                **{
+                    'id': alert['id'],
+                    'read': alert['dismissed'],
+                    'type': 'alert',
+                },
+            })
+    if 'hold' in types:
+        for row in get_sis_holds(sid):
+            hold = json.loads(row['feed'])
+            reason = hold.get('reason', {})
+            notifications['hold'].append({
+                **hold,
+                **{
+                    'createdAt': hold.get('fromDate'),
+                    'message': join_if_present('. ', [reason.get('description'), reason.get('formalDescription')]),
+                    'read': True,
+                    'type': 'hold',
+                },
+            })
     degree_progress = student.get('sisProfile', {}).get('degreeProgress', {})
-    if degree_progress:
+    if 'requirement' in types and degree_progress:
         for key, requirement in degree_progress.get('requirements', {}).items():
-            student['notifications']['requirement'].append({
+            notifications['requirement'].append({
                 **requirement,
                 **{
                     'type': 'requirement',
@@ -339,6 +357,90 @@ def put_notifications(student):
                     'read': True,
                 },
             })
+    return notifications
+
+
+def put_timeline(student):
+    student['timeline'] = get_timeline(student, types=TIMELINE_TYPES)
+
+
+def get_timeline(student, types, cursor=None, limit=None):
+    snapshot_key = (current_user.get_id(), current_user.can_access_advising_data, student['sid'], tuple(sorted(types)))
+    snapshot = _get_timeline_snapshot(snapshot_key) if cursor else None
+    if snapshot is None:
+        notifications = get_notifications(student, types=types, include_note_bodies=False)
+        snapshot = {
+            'counts': {t: len(items) for t, items in notifications.items()},
+            'keyedItems': _keyed_timeline_items(notifications),
+        }
+        _put_timeline_snapshot(snapshot_key, snapshot)
+    return {
+        'counts': snapshot['counts'],
+        **_timeline_page(snapshot['keyedItems'], cursor=cursor, limit=limit or app.config['TIMELINE_PAGE_SIZE']),
+    }
+
+
+def decode_timeline_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if isinstance(key, list) and len(key) == 4 and isinstance(key[0], int) and all(isinstance(k, str) for k in key[1:]):
+            return tuple(key)
+    except (TypeError, ValueError):
+        pass
+    raise BadRequestError(f'Invalid timeline cursor: {cursor}')
+
+
+def _get_timeline_snapshot(snapshot_key):
+    with _timeline_snapshots_lock:
+        snapshot = _timeline_snapshots.get(snapshot_key)
+    if snapshot and time.time() - snapshot['cachedAt'] < app.config['TIMELINE_CACHE_TTL']:
+        return snapshot
+    return None
+
+
+def _put_timeline_snapshot(snapshot_key, snapshot):
+    ttl = app.config['TIMELINE_CACHE_TTL']
+    if not ttl:
+        return
+    now = time.time()
+    with _timeline_snapshots_lock:
+        _timeline_snapshots.pop(snapshot_key, None)
+        _timeline_snapshots[snapshot_key] = {**snapshot, 'cachedAt': now}
+        # Snapshots are kept in the order taken, so the oldest go first.
+        while _timeline_snapshots:
+            oldest = next(iter(_timeline_snapshots.values()))
+            if now - oldest['cachedAt'] < ttl and len(_timeline_snapshots) <= app.config['TIMELINE_CACHE_MAX_SIZE']:
+                break
+            _timeline_snapshots.popitem(last=False)
+
+
+def _keyed_timeline_items(notifications):
+    # Newest first, per the sort order of the academic timeline. Items without a date go last.
+    keyed_items = []
+    for item_type, items in notifications.items():
+        for index, item in enumerate(items):
+            if item_type in ['appointment', 'note']:
+                date = item.get('createdAt')
+            else:
+                date = item.get('updatedAt') or item.get('createdAt')
+            timeline_id = f"{item_type}-{item.get('id') or index}"
+            item = {**item, 'timelineId': timeline_id}
+            keyed_items.append(((1 if date else 0, str(date or ''), item_type, timeline_id), item))
+    keyed_items.sort(key=lambda k: k[0], reverse=True)
+    return keyed_items
+
+
+def _timeline_page(keyed_items, cursor, limit):
+    if cursor:
+        keyed_items = [k for k in keyed_items if k[0] < cursor]
+    page = keyed_items[0:limit]
+    next_cursor = None
+    if len(keyed_items) > limit:
+        next_cursor = base64.urlsafe_b64encode(json.dumps(page[-1][0]).encode()).decode()
+    return {
+        'items': [item for key, item in page],
+        'nextCursor': next_cursor,
+    }
 
 
 def get_note_attachments_from_http_post(tolerate_none=False):
@@ -378,16 +480,11 @@ def get_note_topics_from_http_post():
 def get_my_curated_groups():
     curated_groups = []
     user_id = current_user.get_id()
+    alert_counts = get_alert_badges(user_id)['curatedGroups']
     for curated_group in CuratedGroup.get_curated_groups_by_owner_id(user_id):
         api_json = curated_group.to_api_json(include_students=False)
-        students = [{'sid': sid} for sid in CuratedGroup.get_all_sids(curated_group.id)]
-        students_with_alerts = Alert.include_alert_counts_for_students(
-            viewer_user_id=user_id,
-            group={'students': students},
-            count_only=True,
-        )
-        api_json['alertCount'] = sum(s['alertCount'] for s in students_with_alerts)
-        api_json['totalStudentCount'] = len(students)
+        api_json['alertCount'] = alert_counts.get(curated_group.id, 0)
+        api_json['totalStudentCount'] = curated_group.student_count
         curated_groups.append(api_json)
     return curated_groups
 
@@ -477,15 +574,10 @@ def response_with_students_csv_download(sids, fieldnames, benchmark):
             row[fieldname] = getters[fieldname](student_profile)
         rows.append(row)
 
-    students = get_student_profiles(sids=sids)
-    for student in students:
+    for student in get_student_profiles(sids=sids, include_historical=True):
         profile = student.get('profile')
         if profile:
             _add_row(json.loads(profile))
-    remaining_sids = list(set(sids) - set([s.get('sid') for s in students]))
-    if remaining_sids:
-        for profile in get_historical_student_profiles(remaining_sids):
-            _add_row(profile)
 
     benchmark('end')
 
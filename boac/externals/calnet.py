@@ -23,11 +23,17 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import os
+import queue
 import ssl
+import threading
 
 from boac.lib import mockingbird
+from flask import current_app
 import ldap3
+from ldap3.core.exceptions import LDAPCommunicationError
 
 SCHEMA_DICT = {
     'berkeleyEduAffiliations': 'affiliations',
@@ -46,6 +52,14 @@ SCHEMA_DICT = {
 
 BATCH_QUERY_MAXIMUM = 500
 
+CONNECTION_POOL_MAXIMUM = 5
+
+SEARCH_BASE = 'dc=berkeley,dc=edu'
+
+# Bound connections are kept open for reuse across requests, pooled per LDAP server and bind.
+_connection_pools = {}
+_connection_pools_lock = threading.Lock()
+
 
 def client(app):
     if mockingbird._environment_supports_mocks():
@@ -70,25 +84,97 @@ class Client:
         return conn
 
     def search_csids(self, csids, search_expired=False):
-        all_out = []
-        for i in range(0, len(csids), BATCH_QUERY_MAXIMUM):
-            csids_batch = csids[i:i + BATCH_QUERY_MAXIMUM]
-            with self.connect() as conn:
-                search_filter = self._ldap_search_filter(csids_batch, 'berkeleyeducsid', search_expired)
-                conn.search('dc=berkeley,dc=edu', search_filter, attributes=ldap3.ALL_ATTRIBUTES)
-                all_out += [_attributes_to_dict(entry, search_expired) for entry in conn.entries]
-        return all_out
+        return self._search('berkeleyeducsid', csids, search_expired)
 
     def search_uids(self, uids, search_expired=False):
+        return self._search('uid', uids, search_expired)
+
+    def search_csids_including_expired(self, csids):
+        return self._search_including_expired('berkeleyeducsid', 'csid', csids)
+
+    def search_uids_including_expired(self, uids):
+        return self._search_including_expired('uid', 'uid', uids)
+
+    def _search(self, id_type, ids, search_expired=False):
+        try:
+            return self._search_with_pooled_connection(id_type, ids, search_expired)
+        except LDAPCommunicationError as e:
+            # Pooled connections may have been dropped by the server while idle. Start over with fresh connections.
+            self.app.logger.warn(f'LDAP connection failed, will retry with a new connection: {e}')
+            self._clear_connection_pool()
+            return self._search_with_pooled_connection(id_type, ids, search_expired)
+
+    def _search_with_pooled_connection(self, id_type, ids, search_expired):
+        ids = list(ids)
         all_out = []
-        for i in range(0, len(uids), BATCH_QUERY_MAXIMUM):
-            uids_batch = uids[i:i + BATCH_QUERY_MAXIMUM]
-            with self.connect() as conn:
-                search_filter = self._ldap_search_filter(uids_batch, 'uid', search_expired)
-                conn.search('dc=berkeley,dc=edu', search_filter, attributes=ldap3.ALL_ATTRIBUTES)
-                all_out += [_attributes_to_dict(entry, search_expired) for entry in conn.entries]
+        with self._pooled_connection() as conn:
+            for i in range(0, len(ids), BATCH_QUERY_MAXIMUM):
+                search_filter = self._ldap_search_filter(ids[i:i + BATCH_QUERY_MAXIMUM], id_type, search_expired)
+                # Request only the attributes we map, in pages, rather than every attribute in one response.
+                responses = conn.extend.standard.paged_search(
+                    SEARCH_BASE,
+                    search_filter,
+                    attributes=list(SCHEMA_DICT.keys()),
+                    paged_size=BATCH_QUERY_MAXIMUM,
+                    generator=True,
+                )
+                all_out += [_attributes_to_dict(r['attributes'], search_expired) for r in responses if r['type'] == 'searchResEntry']
         return all_out
 
+    def _search_including_expired(self, id_type, result_key, ids):
+        """Search active and expired accounts concurrently. Expired accounts are returned only for IDs not found active."""
+        ids = list(ids)
+        app = current_app._get_current_object()
+
+        def _search_in_app_context(search_expired):
+            with app.app_context():
+                return self._search(id_type, ids, search_expired)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            active_search = executor.submit(_search_in_app_context, False)
+            expired_search = executor.submit(_search_in_app_context, True)
+            results = active_search.result()
+            active_ids = {r[result_key] for r in results}
+            return results + [r for r in expired_search.result() if r[result_key] not in active_ids]
+
+    @contextmanager
+    def _pooled_connection(self):
+        pool = self._connection_pool()
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = self.connect()
+        try:
+            if not conn.bound:
+                conn.bind()
+            yield conn
+        except Exception:
+            conn.unbind()
+            raise
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.unbind()
+
+    def _connection_pool(self):
+        key = (type(self).__name__, self.host, self.bind)
+        with _connection_pools_lock:
+            if key not in _connection_pools:
+                _connection_pools[key] = queue.LifoQueue(maxsize=CONNECTION_POOL_MAXIMUM)
+            return _connection_pools[key]
+
+    def _clear_connection_pool(self):
+        pool = self._connection_pool()
+        while True:
+            try:
+                conn = pool.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.unbind()
+            except LDAPCommunicationError:
+                pass
+
     @classmethod
     def _ldap_search_filter(cls, ids, id_type, search_expired=False):
         ids_filter = ''.join(f'({id_type}={_id})' for _id in ids)
@@ -119,13 +205,16 @@ class MockClient(Client):
         return conn
 
 
-def _attributes_to_dict(entry, expired_per_ldap):
+def _attributes_to_dict(attributes, expired_per_ldap):
     out = dict.fromkeys(SCHEMA_DICT.values(), None)
     out['expired'] = expired_per_ldap
-    # ldap3's entry.entry_attributes_as_dict would work for us, except that it wraps a single value as a list.
+    # Search responses wrap multi-valued attributes as lists, even when empty or single-valued. Unwrap them as
+    # ldap3's Entry.value would.
     for attr in SCHEMA_DICT:
-        if attr in entry.entry_attributes:
-            out[SCHEMA_DICT[attr]] = entry[attr].value
+        value = attributes.get(attr)
+        if isinstance(value, list):
+            value = value[0] if len(value) == 1 else (value or None)
+        out[SCHEMA_DICT[attr]] = value
     return out
 
 
@@ -150,32 +150,13 @@ def get_undergraduate_term(term_id):
     return safe_execute_rds(sql)
 
 
-def get_enrolled_primary_sections(term_id, course_name):
-    sql = f"""SELECT * FROM {sis_schema()}.enrolled_primary_sections
+def get_enrolled_primary_sections_for_term(term_id):
+    sql = f"""SELECT term_id, sis_section_id, sis_course_name, sis_course_name_compressed, sis_subject_area_compressed,
+              sis_catalog_id, sis_course_title, sis_instruction_format, sis_section_num, instructors
+              FROM {sis_schema()}.enrolled_primary_sections
               WHERE term_id = :term_id
-              AND sis_course_name_compressed LIKE :course_name
-              ORDER BY sis_course_name_compressed, sis_instruction_format, sis_section_num
            """
-    return safe_execute_rds(sql, term_id=term_id, course_name=f'{course_name}%')
-
-
-def get_enrolled_primary_sections_for_parsed_code(term_id, subject_area, catalog_id):
-    params = {
-        'term_id': term_id,
-        'catalog_id': f'{catalog_id}%',
-    }
-    if subject_area:
-        subject_area_clause = 'AND sis_subject_area_compressed LIKE :subject_area'
-        params.update({'subject_area': f'{subject_area}%'})
-    else:
-        subject_area_clause = ''
-    sql = f"""SELECT * FROM {sis_schema()}.enrolled_primary_sections
-              WHERE term_id = :term_id
-              {subject_area_clause}
-              AND sis_catalog_id LIKE :catalog_id
-              ORDER BY sis_course_name_compressed, sis_instruction_format, sis_section_num
-           """
-    return safe_execute_rds(sql, **params)
+    return safe_execute_rds(sql, term_id=term_id)
 
 
 def get_sis_holds(sid):
@@ -324,18 +305,37 @@ def get_basic_student_data(sids):
     return safe_execute_rds(sql, sids=sids)
 
 
-def get_student_profiles(sids=None):
-    sql = f"""SELECT p.sid, p.profile, d.gender, d.minority
+def get_student_profiles(sids=None, include_historical=False):
+    sql = f"""SELECT p.sid, p.profile, d.gender, d.minority, FALSE AS historical
         FROM {student_schema()}.student_profiles p
         LEFT JOIN {student_schema()}.demographics d ON d.sid = p.sid
         """
     if sids is not None:
         sql += 'WHERE p.sid = ANY(:sids)'
+        if include_historical:
+            # Students without a current profile are resolved from historical profiles in the same query.
+            sql += f"""
+                UNION ALL
+                SELECT h.sid, h.profile, NULL AS gender, NULL AS minority, TRUE AS historical
+                FROM {student_schema()}.student_profiles_hist_enr h
+                WHERE h.sid = ANY(:sids)
+                AND NOT EXISTS (SELECT 1 FROM {student_schema()}.student_profiles p WHERE p.sid = h.sid)"""
         return safe_execute_rds(sql, sids=sids)
     else:
         return safe_execute_rds(sql)
 
 
+def get_student_sort_keys(sids):
+    sql = f"""SELECT DISTINCT ON (sid)
+        sid, hist_enr AS historical,
+        {_naturalize_order('first_name')} AS first_name_key,
+        {_naturalize_order('last_name')} AS last_name_key
+        FROM {student_schema()}.student_profile_index
+        WHERE sid = ANY(:sids)
+        ORDER BY sid, hist_enr"""
+    return safe_execute_rds(sql, sids=sids)
+
+
 def query_historical_sids(sids):
     sql = f'SELECT sid FROM {student_schema()}.student_profiles_hist_enr WHERE sid = ANY(:sids) ORDER BY sid'
     return safe_execute_rds(sql, sids=sids)
@@ -403,17 +403,29 @@ def get_term_gpas(sids):
     return safe_execute_rds(sql, sids=sids)
 
 
-def get_enrollments_for_sid(sid, latest_term_id=None):
+def get_enrollments_for_sid(sid, latest_term_id=None, first_term_id=None):
     sql = f"""SELECT term_id, enrollment_term
         FROM {student_schema()}.student_enrollment_terms
         WHERE sid = :sid
-        AND term_id >= '{earliest_term_id()}'"""
+        AND term_id >= '{first_term_id or earliest_term_id()}'"""
     if latest_term_id:
         sql += f""" AND term_id <= '{latest_term_id}'"""
     sql += ' ORDER BY term_id DESC'
     return safe_execute_rds(sql, sid=sid)
 
 
+def get_enrollments_version_for_sid(sid, latest_term_id=None):
+    # A fingerprint of the rows that get_enrollments_for_sid would return, computed without transferring them.
+    sql = f"""SELECT md5(COALESCE(string_agg(term_id || ':' || md5(enrollment_term), ',' ORDER BY term_id), '')) AS version
+        FROM {student_schema()}.student_enrollment_terms
+        WHERE sid = :sid
+        AND term_id >= '{earliest_term_id()}'"""
+    if latest_term_id:
+        sql += f""" AND term_id <= '{latest_term_id}'"""
+    rows = safe_execute_rds(sql, sid=sid)
+    return rows[0]['version'] if rows else None
+
+
 def get_enrollments_for_term(term_id, sids=None):
     sql = f"""SELECT sid, enrollment_term
         FROM {student_schema()}.student_enrollment_terms
@@ -457,98 +469,73 @@ def match_appointment_advisors_by_name(prefixes, limit=None):
     return safe_execute_rds(sql, **prefix_kwargs)
 
 
-def match_advising_note_authors_by_name(prefixes, limit=None):
-    prefix_conditions = []
-    prefix_kwargs = {}
-    for idx, prefix in enumerate(prefixes):
-        prefix_conditions.append(
-            f"""JOIN {advising_notes_schema()}.advising_note_author_names an{idx}
-            ON an{idx}.name LIKE :prefix_{idx}
-            AND an{idx}.uid = a.uid""",
-        )
-        prefix_kwargs[f'prefix_{idx}'] = f'{prefix}%'
-    sql = f"""SELECT DISTINCT a.first_name, a.last_name, a.sid, a.uid
+def get_advising_note_author_names():
+    sql = f"""SELECT DISTINCT a.first_name, a.last_name, a.sid, a.uid, an.name
         FROM {advising_notes_schema()}.advising_note_authors a
-        {' '.join(prefix_conditions)}
-        ORDER BY a.first_name, a.last_name"""
-    if limit:
-        sql += f' LIMIT {limit}'
-    return safe_execute_rds(sql, **prefix_kwargs)
-
+        JOIN {advising_notes_schema()}.advising_note_author_names an ON an.uid = a.uid"""
+    return safe_execute_rds(sql)
 
-def match_students_by_name_or_sid(prefixes, limit=None):
-    current_student_conditions = []
-    non_current_student_conditions = []
-    prefix_kwargs = {}
-    for idx, prefix in enumerate(prefixes):
-        current_student_conditions.append(
-            f"""JOIN {student_schema()}.student_names sn{idx}
-            ON (sn{idx}.name LIKE :prefix_{idx} OR sn{idx}.sid LIKE :prefix_{idx})
-            AND sn{idx}.sid = sas.sid""",
-        )
-        if not prefix.isalpha():
-            non_current_student_conditions.append(
-                f"""JOIN {student_schema()}.student_name_index_hist_enr sn{idx}
-                ON sn{idx}.sid LIKE :prefix_{idx}
-                AND sn{idx}.sid = s.sid""",
-            )
-        prefix_kwargs[f'prefix_{idx}'] = f'{prefix}%'
 
-    inner_sql = f"""SELECT sas.first_name, sas.last_name, sas.sid, sas.uid
+def get_student_names():
+    sql = f"""SELECT sas.first_name, sas.last_name, sas.sid, sas.uid, sn.name
         FROM {student_schema()}.student_academic_status sas
-        {' '.join(current_student_conditions)}"""
-    if len(non_current_student_conditions) > 0:
-        inner_sql += f"""\nUNION
-            SELECT s.first_name, s.last_name, s.sid, s.uid
-            FROM {student_schema()}.student_names_hist_enr s
-            {' '.join(non_current_student_conditions)}"""
-    sql = f"""SELECT DISTINCT q.*
-        FROM ({inner_sql}) q
-        ORDER BY q.first_name, q.last_name"""
-    if limit:
-        sql += f' LIMIT {limit}'
-    return safe_execute_rds(sql, **prefix_kwargs)
+        JOIN {student_schema()}.student_names sn ON sn.sid = sas.sid"""
+    return safe_execute_rds(sql)
+
+
+def get_student_names_hist_enr():
+    sql = f"""SELECT DISTINCT s.first_name, s.last_name, s.sid, s.uid
+        FROM {student_schema()}.student_names_hist_enr s
+        JOIN {student_schema()}.student_name_index_hist_enr sn ON sn.sid = s.sid"""
+    return safe_execute_rds(sql)
 
 
-def get_asc_advising_notes(sid):
+def get_asc_advising_notes(sid, note_id=None, include_body=True):
+    note_id_clause = 'AND id=:note_id' if note_id else ''
     sql = f"""
         SELECT
             id, sid, advisor_uid AS author_uid,
             advisor_first_name || ' ' || advisor_last_name AS author_name,
-            subject, body,
+            subject, {'body' if include_body else 'NULL AS body'},
             created_at, updated_at
         FROM {asc_schema()}.advising_notes
         WHERE sid=:sid
+        {note_id_clause}
         ORDER BY created_at, updated_at, id"""
-    return safe_execute_rds(sql, sid=sid)
+    return safe_execute_rds(sql, sid=sid, note_id=note_id)
 
 
 def get_asc_advising_note_count():
     return safe_execute_rds(f'SELECT COUNT(id) FROM {asc_schema()}.advising_notes')[0]['count']
 
 
-def get_asc_advising_note_topics(sid):
+def get_asc_advising_note_topics(sid, note_id=None):
+    note_id_clause = 'AND id=:note_id' if note_id else ''
     sql = f"""SELECT id, topic
         FROM {asc_schema()}.advising_note_topics
         WHERE sid=:sid
+        {note_id_clause}
         ORDER BY id"""
-    return safe_execute_rds(sql, sid=sid)
+    return safe_execute_rds(sql, sid=sid, note_id=note_id)
 
 
-def get_data_science_advising_notes(sid):
+def get_data_science_advising_notes(sid, note_id=None, include_body=True):
+    note_id_clause = 'AND n.id=:note_id' if note_id else ''
     sql = f"""
         SELECT
             n.id, n.sid, n.advisor_sid AS author_sid, n.advisor_uid AS author_uid,
             n.advisor_first_name || ' ' || n.advisor_last_name AS author_name, dsn.advisor_email,
-            dsn.reason_for_appointment, n.note_body, n.created_at
+            dsn.reason_for_appointment, {'n.note_body' if include_body else 'NULL AS note_body'}, n.created_at
         FROM {data_science_advising_schema()}.advising_notes dsn
         JOIN {advising_notes_schema()}.advising_notes n ON dsn.id = n.id
         WHERE n.sid=:sid
+        {note_id_clause}
         ORDER BY n.created_at, n.id"""
-    return safe_execute_rds(sql, sid=sid)
+    return safe_execute_rds(sql, sid=sid, note_id=note_id)
 
 
-def get_e_i_advising_notes(sid):
+def get_e_i_advising_notes(sid, note_id=None):
+    note_id_clause = 'AND id=:note_id' if note_id else ''
     sql = f"""
         SELECT
             id, sid, advisor_uid AS author_uid,
@@ -557,8 +544,9 @@ def get_e_i_advising_notes(sid):
         FROM {e_i_schema()}.advising_notes
         WHERE sid=:sid
         AND advisor_last_name <> 'Front Desk'
+        {note_id_clause}
         ORDER BY created_at, updated_at, id"""
-    return safe_execute_rds(sql, sid=sid)
+    return safe_execute_rds(sql, sid=sid, note_id=note_id)
 
 
 def get_e_and_i_advising_note_count():
@@ -569,12 +557,14 @@ def get_e_and_i_advising_note_count():
     return safe_execute_rds(sql)[0]['count']
 
 
-def get_e_i_advising_note_topics(sid):
+def get_e_i_advising_note_topics(sid, note_id=None):
+    note_id_clause = 'AND id=:note_id' if note_id else ''
     sql = f"""SELECT id, topic
         FROM {e_i_schema()}.advising_note_topics
         WHERE sid=:sid
+        {note_id_clause}
         ORDER BY id"""
-    return safe_execute_rds(sql, sid=sid)
+    return safe_execute_rds(sql, sid=sid, note_id=note_id)
 
 
 def get_admitted_student_by_sid(sid):
@@ -602,15 +592,17 @@ def get_admitted_students_by_sids(sids):
     return safe_execute_rds(sql, sids=sids)
 
 
-def get_sis_advising_notes(sid):
+def get_sis_advising_notes(sid, note_id=None, include_body=True):
+    note_id_clause = 'AND id=:note_id' if note_id else ''
     sql = f"""
         SELECT
             id, sid, advisor_sid, appointment_id, note_category, note_subcategory,
-            created_by, updated_by, note_body, created_at, updated_at
+            created_by, updated_by, {'note_body' if include_body else 'NULL AS note_body'}, created_at, updated_at
         FROM {sis_advising_notes_schema()}.advising_notes
         WHERE sid=:sid
+        {note_id_clause}
         ORDER BY created_at, updated_at, id"""
-    return safe_execute_rds(sql, sid=sid)
+    return safe_execute_rds(sql, sid=sid, note_id=note_id)
 
 
 def get_sis_advising_note_count():
@@ -40,9 +40,9 @@ def get_signed_urls(bucket, keys, expiration):
     return {key: _get_signed_url(client, bucket, key, expiration) for key in keys}
 
 
-def stream_object(bucket, key):
+def stream_object(bucket, key, credentials=None):
     s3_url = build_s3_url(bucket, key)
-    session = _get_session()
+    session = _get_session(credentials)
     try:
         return smart_open.open(s3_url, 'rb', transport_params=dict(session=session))
     except Exception as e:
@@ -59,7 +59,7 @@ def put_binary_data_to_s3(bucket, key, binary_data):
     _get_client().put_object(Body=binary_data, Bucket=bucket, Key=key, ServerSideEncryption=app.config['DATA_LOCH_S3_ENCRYPTION'])
 
 
-def _get_sts_credentials():
+def get_sts_credentials():
     sts_client = boto3.client('sts')
     role_arn = app.config['AWS_APP_ROLE_ARN']
     assumed_role_object = sts_client.assume_role(
@@ -70,8 +70,9 @@ def _get_sts_credentials():
     return assumed_role_object['Credentials']
 
 
-def _get_session():
-    credentials = _get_sts_credentials()
+def _get_session(credentials=None):
+    # Callers opening many objects can assume the app role once and pass in the resulting credentials.
+    credentials = credentials or get_sts_credentials()
     return boto3.Session(
         aws_access_key_id=credentials['AccessKeyId'],
         aws_secret_access_key=credentials['SecretAccessKey'],
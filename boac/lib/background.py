@@ -23,7 +23,9 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+import concurrent.futures
 from threading import Thread
+import time
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import scoped_session, sessionmaker
@@ -49,6 +51,75 @@ def bg_execute(method, **kwargs):
         method(db_session=db.session, **kwargs)
 
 
+def concurrent_execute(tasks, timeouts=None):
+    """Run named callables concurrently, each in its own copy of the current app and request context.
+
+    Returns a tuple (results, latency, timed_out). Results and latency (in milliseconds) are keyed by task name;
+    timed_out lists the names of tasks that missed their deadline, as given in seconds by the optional timeouts dict.
+    Exceptions raised by a task are re-raised. If background tasks are disabled, tasks run in sequence in the foreground.
+    """
+    from flask import current_app as app
+    timeouts = timeouts or {}
+    results = {}
+    latency = {}
+    timed_out = []
+    if not app.config['BACKGROUND_TASKS'] or len(tasks) < 2:
+        for name, task in tasks.items():
+            results[name], latency[name] = _timed_executor(task)
+        return results, latency, timed_out
+
+    start = time.time()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(tasks))
+    try:
+        futures = {}
+        for name, task in tasks.items():
+            futures[name] = executor.submit(
+                _context_executor,
+                app=app._get_current_object(),
+                request_context=_copy_request_context(),
+                task=task,
+            )
+        for name, future in futures.items():
+            timeout = timeouts.get(name)
+            remaining = None if timeout is None else max(0, timeout - (time.time() - start))
+            try:
+                results[name], latency[name] = future.result(timeout=remaining)
+            except concurrent.futures.TimeoutError:
+                app.logger.warn(f'Concurrent task {name} did not finish within {timeout} seconds')
+                latency[name] = round((time.time() - start) * 1000)
+                timed_out.append(name)
+    finally:
+        # Do not block on stragglers; their results are discarded.
+        executor.shutdown(wait=False)
+    return results, latency, timed_out
+
+
+def _context_executor(app, request_context, task):
+    if request_context is None:
+        with app.app_context():
+            return _timed_executor(task)
+    with request_context:
+        return _timed_executor(task)
+
+
+def _copy_request_context():
+    from flask import _request_ctx_stack
+    top = _request_ctx_stack.top
+    if top is None:
+        return None
+    request_context = top.copy()
+    # Carry over the user already loaded by Flask-Login so that worker threads do not reload it.
+    if hasattr(top, 'user'):
+        request_context.user = top.user
+    return request_context
+
+
+def _timed_executor(task):
+    start = time.time()
+    result = task()
+    return result, round((time.time() - start) * 1000)
+
+
 # Database engine and session factory for background threads, distinct from the request-bound Flask-SQLAlchemy db object.
 engine = None
 session_factory = None
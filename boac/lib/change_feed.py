@@ -0,0 +1,110 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+import select
+from threading import Condition, Lock, Thread
+import time
+
+from boac.lib.background import get_engine
+from flask import current_app as app
+from sqlalchemy import text
+
+"""Postgres LISTEN/NOTIFY channels, letting requests block until a change is committed rather than poll for it."""
+
+
+class ChangeFeed:
+
+    def __init__(self, channel):
+        self.channel = channel
+        self._condition = Condition()
+        self._listener = None
+        self._listener_lock = Lock()
+        self._sequence_per_key = {}
+
+    def publish(self, key):
+        # Postgres delivers the notification when, and only if, the current transaction commits.
+        from boac import db
+        db.session.execute(text('SELECT pg_notify(:channel, :key)'), {'channel': self.channel, 'key': key})
+
+    def sequence(self, key):
+        with self._condition:
+            return self._sequence_per_key.get(key, 0)
+
+    def start_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = Thread(
+                    target=self._listen,
+                    daemon=True,
+                    kwargs={'app': app._get_current_object()},
+                )
+                self._listener.start()
+
+    def wait(self, key, since, timeout):
+        """Block until a change to key is received after sequence number 'since'. Return False on timeout."""
+        self.start_listener()
+        with self._condition:
+            return self._condition.wait_for(lambda: self._sequence_per_key.get(key, 0) != since, timeout=timeout)
+
+    def _dispatch(self, key):
+        with self._condition:
+            self._sequence_per_key[key] = self._sequence_per_key.get(key, 0) + 1
+            self._condition.notify_all()
+
+    def _listen(self, app):
+        while True:
+            connection = None
+            try:
+                # Detach a dedicated connection from the pool; it stays open for as long as the worker process lives.
+                connection = get_engine(app).raw_connection()
+                connection.detach()
+                connection.connection.set_session(autocommit=True)
+                cursor = connection.cursor()
+                cursor.execute(f'LISTEN {self.channel}')
+                app.logger.info(f'Listening for notifications on channel {self.channel}')
+                while True:
+                    if select.select([connection.connection], [], [], 60) == ([], [], []):
+                        continue
+                    connection.connection.poll()
+                    while connection.connection.notifies:
+                        self._dispatch(connection.connection.notifies.pop(0).payload)
+            except Exception as e:
+                app.logger.error(f'Lost connection listening on channel {self.channel}; will reconnect')
+                app.logger.exception(e)
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                time.sleep(5)
+
+
+# Keyed by viewer id, or '*' when alert counts change for all viewers.
+alert_badge_changes = ChangeFeed('alert_badge_changes')
+appointment_changes = ChangeFeed('appointment_changes')
+# Keyed by index name, published when the job process has rebuilt an in-memory search index from the loch.
+search_index_changes = ChangeFeed('search_index_changes')
+# Keyed by user id.
+user_session_changes = ChangeFeed('user_session_changes')
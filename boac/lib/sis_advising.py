@@ -58,12 +58,13 @@ def get_sis_advising_attachments(ids):
     return attachments_by_id
 
 
+def get_legacy_attachment_s3_key(filename):
+    sid = _get_sid_prefix(filename)
+    return sid and '/'.join([app.config['DATA_LOCH_S3_ADVISING_NOTE_ATTACHMENT_PATH'], sid, filename])
+
+
 def get_legacy_attachment_stream(filename):
-    # Filenames come prefixed with SID by convention.
-    for i, c in enumerate(filename):
-        if not c.isdigit():
-            break
-    sid = filename[:i]
+    sid = _get_sid_prefix(filename)
     if not sid:
         return None
     # Ensure that the file exists.
@@ -74,7 +75,7 @@ def get_legacy_attachment_stream(filename):
         display_filename = filename
     else:
         display_filename = attachment_result[0].get('user_file_name')
-    s3_key = '/'.join([app.config['DATA_LOCH_S3_ADVISING_NOTE_ATTACHMENT_PATH'], sid, filename])
+    s3_key = get_legacy_attachment_s3_key(filename)
     return {
         'filename': display_filename,
         'stream': s3.stream_object(app.config['DATA_LOCH_S3_ADVISING_NOTE_BUCKET'], s3_key),
@@ -108,3 +109,11 @@ def _isoformat(obj, key):
 
 def _tzinfo(_datetime):
     return _datetime and _datetime.tzinfo
+
+
+def _get_sid_prefix(filename):
+    # Filenames come prefixed with SID by convention.
+    for i, c in enumerate(filename):
+        if not c.isdigit():
+            break
+    return filename[:i]
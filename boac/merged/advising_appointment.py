@@ -31,7 +31,7 @@ from boac.lib.berkeley import BERKELEY_DEPT_CODE_TO_NAME
 from boac.lib.sis_advising import get_sis_advising_attachments, get_sis_advising_topics, resolve_sis_created_at, resolve_sis_updated_at
 from boac.lib.util import get_benchmarker, join_if_present, search_result_text_snippet, TEXT_SEARCH_PATTERN
 from boac.merged.calnet import get_calnet_users_for_csids, get_uid_for_csid
-from boac.models.appointment import Appointment, appointment_event_to_json
+from boac.models.appointment import Appointment, appointment_events_to_json
 from boac.models.appointment_read import AppointmentRead
 from boac.models.authorized_user import AuthorizedUser
 from dateutil.tz import tzutc
@@ -51,13 +51,13 @@ def get_advising_appointments(sid):
     appointments_by_id.update(get_non_legacy_advising_appointments(sid))
     if not appointments_by_id.values():
         return None
-    appointments_read = AppointmentRead.get_appointments_read_by_user(current_user.get_id(), appointments_by_id.keys())
-    for appointment_read in appointments_read:
-        appointment_feed = appointments_by_id.get(appointment_read.appointment_id)
+    appointment_ids_read = AppointmentRead.get_appointment_ids_read_by_user(current_user.get_id(), list(appointments_by_id.keys()))
+    for appointment_id in appointment_ids_read:
+        appointment_feed = appointments_by_id.get(appointment_id)
         if appointment_feed:
             appointment_feed['read'] = True
         else:
-            app.logger.error(f'DB query mismatch for appointment id {appointment_read.appointment_id}')
+            app.logger.error(f'DB query mismatch for appointment id {appointment_id}')
     benchmark('end')
     return list(appointments_by_id.values())
 
@@ -81,10 +81,12 @@ def get_sis_advising_appointments(sid):
 
 def get_non_legacy_advising_appointments(sid):
     appointments_by_id = {}
-    for row in Appointment.get_appointments_per_sid(sid):
+    rows = Appointment.get_appointments_per_sid(sid)
+    event_json_per_id = appointment_events_to_json(rows)
+    for row in rows:
         appointment = row.__dict__
         appointment_id = appointment['id']
-        event = appointment_event_to_json(appointment_id, row.status)
+        event = event_json_per_id[appointment_id]
         appointments_by_id[str(appointment_id)] = appointment_to_compatible_json(
             appointment=appointment,
             topics=[t.to_api_json() for t in row.topics if not t.deleted_at],
@@ -23,18 +23,24 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+from collections import deque
+import concurrent.futures
 import csv
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import partial
 import io
 from itertools import groupby
 from operator import itemgetter
 from os import path
 import re
+from threading import Lock
 
+from boac.api.errors import InternalServerError
 from boac.externals import data_loch, s3
+from boac.lib.background import concurrent_execute
 from boac.lib.berkeley import BERKELEY_DEPT_CODE_TO_NAME
 from boac.lib.sis_advising import (
-    get_legacy_attachment_stream,
+    get_legacy_attachment_s3_key,
     get_sis_advising_attachments,
     get_sis_advising_topics,
     resolve_sis_created_at,
@@ -63,36 +69,51 @@ import zipstream
 """Provide advising note data from local and external sources."""
 
 
-def get_advising_notes(sid):
+def get_advising_notes(sid, include_bodies=True):
     benchmark = get_benchmarker(f'get_advising_notes {sid}')
     benchmark('begin')
+    # Sources are queried concurrently and merged in a fixed order.
+    tasks = {
+        'SIS': partial(get_sis_advising_notes, sid, include_body=include_bodies),
+        'ASC': partial(get_asc_advising_notes, sid, include_body=include_bodies),
+        'Data Science': partial(get_data_science_advising_notes, sid, include_body=include_bodies),
+        'E&I': partial(get_e_i_advising_notes, sid),
+        'non legacy': partial(get_non_legacy_advising_notes, sid, include_body=include_bodies),
+    }
+    results, latency, _ = concurrent_execute(tasks)
     notes_by_id = {}
-    benchmark('begin SIS advising notes query')
-    notes_by_id.update(get_sis_advising_notes(sid))
-    benchmark('begin ASC advising notes query')
-    notes_by_id.update(get_asc_advising_notes(sid))
-    benchmark('begin Data Science advising notes query')
-    notes_by_id.update(get_data_science_advising_notes(sid))
-    benchmark('begin E&I advising notes query')
-    notes_by_id.update(get_e_i_advising_notes(sid))
-    benchmark('begin non legacy advising notes query')
-    notes_by_id.update(get_non_legacy_advising_notes(sid))
+    for source in tasks.keys():
+        benchmark(f'{source} advising notes query took {latency[source]} ms')
+        notes_by_id.update(results[source])
     if not notes_by_id.values():
         return None
-    notes_read = NoteRead.get_notes_read_by_user(current_user.get_id(), notes_by_id.keys())
-    for note_read in notes_read:
-        note_feed = notes_by_id.get(note_read.note_id)
+    for note_id in NoteRead.get_note_ids_read_by_user(current_user.get_id(), list(notes_by_id.keys())):
+        note_feed = notes_by_id.get(note_id)
         if note_feed:
             note_feed['read'] = True
         else:
-            app.logger.error(f'DB query mismatch for note id {note_read.note_id}')
+            app.logger.error(f'DB query mismatch for note id {note_id}')
     benchmark('end')
     return list(notes_by_id.values())
 
 
-def get_sis_advising_notes(sid):
+def get_advising_note(sid, note_id, legacy_source=None):
+    get_notes_by_source = {
+        'ASC': get_asc_advising_notes,
+        'CE3': get_e_i_advising_notes,
+        'Data Science': get_data_science_advising_notes,
+        'SIS': get_sis_advising_notes,
+    }
+    get_notes = get_notes_by_source.get(legacy_source, get_non_legacy_advising_notes)
+    note = get_notes(sid, note_id=note_id).get(note_id)
+    if note:
+        note['read'] = bool(NoteRead.when_user_read_note(current_user.get_id(), note_id))
+    return note
+
+
+def get_sis_advising_notes(sid, note_id=None, include_body=True):
     notes_by_id = {}
-    legacy_notes = data_loch.get_sis_advising_notes(sid)
+    legacy_notes = data_loch.get_sis_advising_notes(sid, note_id=note_id, include_body=include_body)
     note_ids = [n['id'] for n in legacy_notes]
     legacy_topics = get_sis_advising_topics(note_ids)
     legacy_attachments = get_sis_advising_attachments(note_ids)
@@ -107,10 +128,10 @@ def get_sis_advising_notes(sid):
     return notes_by_id
 
 
-def get_asc_advising_notes(sid):
+def get_asc_advising_notes(sid, note_id=None, include_body=True):
     notes_by_id = {}
-    legacy_topics = _get_asc_advising_note_topics(sid)
-    for legacy_note in data_loch.get_asc_advising_notes(sid):
+    legacy_topics = _get_asc_advising_note_topics(sid, note_id=note_id)
+    for legacy_note in data_loch.get_asc_advising_notes(sid, note_id=note_id, include_body=include_body):
         note_id = legacy_note['id']
         legacy_note['dept_code'] = ['UWASC']
         notes_by_id[note_id] = note_to_compatible_json(
@@ -121,9 +142,9 @@ def get_asc_advising_notes(sid):
     return notes_by_id
 
 
-def get_data_science_advising_notes(sid):
+def get_data_science_advising_notes(sid, note_id=None, include_body=True):
     notes_by_id = {}
-    for legacy_note in data_loch.get_data_science_advising_notes(sid):
+    for legacy_note in data_loch.get_data_science_advising_notes(sid, note_id=note_id, include_body=include_body):
         note_id = legacy_note['id']
         legacy_note['dept_code'] = ['DSDDO']
         notes_by_id[note_id] = note_to_compatible_json(
@@ -134,10 +155,10 @@ def get_data_science_advising_notes(sid):
     return notes_by_id
 
 
-def get_e_i_advising_notes(sid):
+def get_e_i_advising_notes(sid, note_id=None):
     notes_by_id = {}
-    legacy_topics = _get_e_i_advising_note_topics(sid)
-    for legacy_note in data_loch.get_e_i_advising_notes(sid):
+    legacy_topics = _get_e_i_advising_note_topics(sid, note_id=note_id)
+    for legacy_note in data_loch.get_e_i_advising_notes(sid, note_id=note_id):
         note_id = legacy_note['id']
         legacy_note['dept_code'] = ['ZCEEE']
         notes_by_id[note_id] = note_to_compatible_json(
@@ -148,9 +169,14 @@ def get_e_i_advising_notes(sid):
     return notes_by_id
 
 
-def get_non_legacy_advising_notes(sid):
+def get_non_legacy_advising_notes(sid, note_id=None, include_body=True):
     notes_by_id = {}
-    for row in Note.get_notes_by_sid(sid):
+    if note_id is None:
+        rows = Note.get_notes_by_sid(sid, include_body=include_body)
+    else:
+        note = Note.find_by_id(note_id) if is_int(note_id) else None
+        rows = [note] if note and note.sid == sid else []
+    for row in rows:
         note = row.__dict__
         note_id = note['id']
         notes_by_id[str(note_id)] = note_to_compatible_json(
@@ -311,13 +337,14 @@ def get_zip_stream_for_sid(sid):
     else:
         student_name = ''
     filename = '_'.join([filename, localize_datetime(utc_now()).strftime('%Y%m%d')])
-
+    attachment_s3_keys = _get_attachment_s3_keys(notes)
     supplemental_calnet_advisor_feeds = get_calnet_users_for_csids(
         app,
         list(set([note['author']['sid'] for note in notes if note['author']['sid'] and not note['author']['name']])),
     )
 
     app_timezone = pytz.timezone(app.config['TIMEZONE'])
+    notes = deque(notes)
 
     def iter_csv():
         def csv_line(_list):
@@ -338,7 +365,9 @@ def get_zip_stream_for_sid(sid):
             'attachments',
             'body',
         ])
-        for note in notes:
+        # Release each note once its row is written.
+        while notes:
+            note = notes.popleft()
             calnet_author = supplemental_calnet_advisor_feeds.get(note['author']['sid'])
             if calnet_author:
                 calnet_author_name =\
@@ -367,22 +396,18 @@ def get_zip_stream_for_sid(sid):
 
     all_attachment_filenames = set()
     all_attachment_filenames.add(f'{filename}.csv')
-    for note in notes:
-        for attachment in note['attachments'] or []:
-            is_legacy_attachment = not is_int(attachment['id'])
-            id_ = attachment['id'] if is_legacy_attachment else int(attachment['id'])
-            stream_data = get_legacy_attachment_stream(id_) if is_legacy_attachment else get_boa_attachment_stream(id_)
-            if stream_data:
-                attachment_filename = stream_data['filename']
-                basename, extension = path.splitext(attachment_filename)
-                suffix = 1
-                while attachment_filename in all_attachment_filenames:
-                    attachment_filename = f'{basename} ({suffix}){extension}'
-                    suffix += 1
-                all_attachment_filenames.add(attachment_filename)
-                z.write_iter(attachment_filename, stream_data['stream'])
+    attachment_streams = _AttachmentStreams(attachment_s3_keys)
+    for index, (attachment_filename, _) in enumerate(attachment_streams.attachments):
+        basename, extension = path.splitext(attachment_filename)
+        suffix = 1
+        while attachment_filename in all_attachment_filenames:
+            attachment_filename = f'{basename} ({suffix}){extension}'
+            suffix += 1
+        all_attachment_filenames.add(attachment_filename)
+        z.write_iter(attachment_filename, attachment_streams.iter_stream(index))
 
     return {
+        'close': attachment_streams.close,
         'filename': f'{filename}.zip',
         'stream': z,
     }
@@ -424,16 +449,16 @@ def note_to_compatible_json(note, topics=(), attachments=None, note_read=False):
     }
 
 
-def _get_asc_advising_note_topics(sid):
-    topics = data_loch.get_asc_advising_note_topics(sid)
+def _get_asc_advising_note_topics(sid, note_id=None):
+    topics = data_loch.get_asc_advising_note_topics(sid, note_id=note_id)
     topics_by_id = {}
     for advising_note_id, topics in groupby(topics, key=itemgetter('id')):
         topics_by_id[advising_note_id] = [topic['topic'] for topic in topics]
     return topics_by_id
 
 
-def _get_e_i_advising_note_topics(sid):
-    topics = data_loch.get_e_i_advising_note_topics(sid)
+def _get_e_i_advising_note_topics(sid, note_id=None):
+    topics = data_loch.get_e_i_advising_note_topics(sid, note_id=note_id)
     topics_by_id = {}
     for advising_note_id, topics in groupby(topics, key=itemgetter('id')):
         topics_by_id[advising_note_id] = [topic['topic'] for topic in topics]
@@ -443,3 +468,83 @@ def _get_e_i_advising_note_topics(sid):
 def _isoformat(obj, key):
     value = obj.get(key)
     return value and value.astimezone(tzutc()).isoformat()
+
+
+def _get_attachment_s3_keys(notes):
+    # (user filename, S3 key) per attachment, in note order. BOA attachment paths are looked up in a single query.
+    boa_attachment_ids = [a['id'] for note in notes for a in (note['attachments'] or []) if is_int(a['id'])]
+    boa_attachments = {a.id: a for a in NoteAttachment.find_by_ids(boa_attachment_ids)} if boa_attachment_ids else {}
+    s3_keys = []
+    for note in notes:
+        for attachment in note['attachments'] or []:
+            if is_int(attachment['id']):
+                boa_attachment = boa_attachments.get(int(attachment['id']))
+                if boa_attachment:
+                    s3_keys.append((boa_attachment.get_user_filename(), boa_attachment.path_to_attachment))
+            else:
+                s3_key = get_legacy_attachment_s3_key(attachment['id'])
+                if s3_key:
+                    s3_keys.append((attachment['displayName'], s3_key))
+    return s3_keys
+
+
+class _AttachmentStreams:
+    # Opens S3 streams for a zip download on a bounded thread pool, keeping a few attachments ahead of the zip writer.
+    # The zip is written as the response is sent, after the request and app contexts are gone, so the app role is
+    # assumed up front and renewed only as it nears expiry. The response must call close() when done, however the download
+    # ends.
+
+    def __init__(self, attachments):
+        self.app = app._get_current_object()
+        self.attachments = attachments
+        self.bucket = app.config['DATA_LOCH_S3_ADVISING_NOTE_BUCKET']
+        self.concurrency = app.config['NOTES_DOWNLOAD_ATTACHMENT_CONCURRENCY'] if app.config['BACKGROUND_TASKS'] else 0
+        self.credentials = s3.get_sts_credentials() if attachments else None
+        self.credentials_lock = Lock()
+        self.executor = None
+        self.futures = {}
+
+    def close(self):
+        # Streams opened ahead of an abandoned download are closed as soon as they are opened.
+        for future in self.futures.values():
+            if not future.cancel():
+                future.add_done_callback(_close_opened_stream)
+        self.futures = {}
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def iter_stream(self, index):
+        if self.concurrency:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency)
+            for i in range(index, min(index + self.concurrency, len(self.attachments))):
+                if i not in self.futures:
+                    self.futures[i] = self.executor.submit(self._open, self.attachments[i][1])
+            stream = self.futures.pop(index).result()
+            if index == len(self.attachments) - 1:
+                self.executor.shutdown(wait=False)
+        else:
+            stream = self._open(self.attachments[index][1])
+        with stream:
+            yield from stream
+
+    def _get_credentials(self):
+        # Assumed-role credentials last fifteen minutes, which a large download can outrun.
+        with self.credentials_lock:
+            if self.credentials['Expiration'] - datetime.now(tzutc()) < timedelta(minutes=5):
+                self.credentials = s3.get_sts_credentials()
+            return self.credentials
+
+    def _open(self, s3_key):
+        with self.app.app_context():
+            stream = s3.stream_object(self.bucket, s3_key, credentials=self._get_credentials())
+        if not stream:
+            # Abort the download rather than send a zip with an empty entry in place of the attachment.
+            raise InternalServerError(f'Failed to open attachment for zip download (key={s3_key})')
+        return stream
+
+
+def _close_opened_stream(future):
+    stream = future.exception() is None and future.result()
+    if stream:
+        stream.close()
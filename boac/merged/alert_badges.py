@@ -0,0 +1,72 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+import time
+
+from boac.lib.change_feed import alert_badge_changes
+from flask import current_app as app
+
+"""Per-viewer alert counts shown beside cohorts and curated groups in the sidebar, cached in worker memory."""
+
+# Entries are keyed by viewer id. An entry is stale once alert_badge_changes has published its viewer id, or '*',
+# since the entry was computed; ALERT_BADGE_CACHE_TTL bounds its age should a notification be missed.
+_badges_per_viewer = {}
+
+
+def evict_alert_badges(viewer_id=None):
+    # The worker that published a change evicts its own entries once the change is committed, rather than serve them
+    # until its notification arrives. Without a viewer id, all entries are evicted.
+    if viewer_id is None:
+        _badges_per_viewer.clear()
+    else:
+        _badges_per_viewer.pop(viewer_id, None)
+
+
+def get_alert_badges(viewer_id):
+    # Models evict badges through this module, so they are imported here rather than at module level.
+    from boac.models.cohort_filter import CohortFilter
+    from boac.models.curated_group import CuratedGroup
+    ttl = app.config['ALERT_BADGE_CACHE_TTL']
+    if ttl:
+        alert_badge_changes.start_listener()
+    version = _version(viewer_id)
+    cached = _badges_per_viewer.get(viewer_id)
+    if cached and cached['version'] == version and time.time() - cached['cachedAt'] < ttl:
+        return cached['badges']
+    badges = {
+        'cohorts': CohortFilter.get_alert_counts_per_cohort(viewer_id),
+        'curatedGroups': CuratedGroup.get_alert_counts_per_group(viewer_id),
+    }
+    if ttl:
+        _badges_per_viewer[viewer_id] = {
+            'badges': badges,
+            'cachedAt': time.time(),
+            'version': version,
+        }
+    return badges
+
+
+def _version(viewer_id):
+    return alert_badge_changes.sequence('*'), alert_badge_changes.sequence(str(viewer_id))
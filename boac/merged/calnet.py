@@ -26,7 +26,8 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from boac.api.errors import InternalServerError
 from boac.externals import calnet
 from boac.lib.berkeley import BERKELEY_DEPT_CODE_TO_NAME
-from boac.models.json_cache import fetch_bulk, insert_row, stow
+from boac.lib.util import get_benchmarker
+from boac.models.json_cache import fetch_bulk, stow, upsert_rows
 
 
 @stow('calnet_user_for_uid_{uid}')
@@ -34,10 +35,7 @@ def get_calnet_user_for_uid(app, uid, force_feed=True, skip_expired_users=False)
     if skip_expired_users:
         persons = calnet.client(app).search_uids([uid])
     else:
-        for search_expired in (False, True):
-            persons = calnet.client(app).search_uids([uid], search_expired)
-            if persons:
-                break
+        persons = calnet.client(app).search_uids_including_expired([uid])
     if not persons and not force_feed:
         return None
     return {
@@ -48,10 +46,7 @@ def get_calnet_user_for_uid(app, uid, force_feed=True, skip_expired_users=False)
 
 @stow('calnet_user_for_csid_{csid}')
 def get_calnet_user_for_csid(app, csid):
-    for search_expired in (False, True):
-        persons = calnet.client(app).search_csids([csid], search_expired)
-        if persons:
-            break
+    persons = calnet.client(app).search_csids_including_expired([csid])
     return {
         **_calnet_user_api_feed(persons[0] if len(persons) else None),
         **{'csid': csid},
@@ -79,9 +74,12 @@ def get_uid_for_csid(app, csid):
 
 
 def _get_calnet_users(app, id_type, ids):
+    benchmark = get_benchmarker(f'get_calnet_users ({len(ids)} {id_type}s)')
+    benchmark('begin')
     cached_users = fetch_bulk([f'calnet_user_for_{id_type}_{_id}' for _id in ids])
     users_by_id = {k.replace(f'calnet_user_for_{id_type}_', ''): v for k, v in cached_users.items()}
     uncached_ids = [c for c in ids if c not in users_by_id]
+    benchmark(f'fetched {len(users_by_id)} cached users; will search CalNet for {len(uncached_ids)}')
     calnet_client = calnet.client(app)
     if id_type == 'uid':
         calnet_results = calnet_client.search_uids(uncached_ids)
@@ -89,15 +87,20 @@ def _get_calnet_users(app, id_type, ids):
         calnet_results = calnet_client.search_csids(uncached_ids)
     else:
         raise InternalServerError(f'get_calnet_users: {id_type} is an invalid id type')
-    # Cache rows individually so that an isolated conflict doesn't sink the rest of the update.
+    benchmark(f'got {len(calnet_results)} CalNet results')
+    calnet_results_by_id = {}
+    for calnet_result in calnet_results:
+        calnet_results_by_id.setdefault(calnet_result[id_type], calnet_result)
+    feeds_by_key = {}
     for _id in uncached_ids:
-        calnet_result = next((r for r in calnet_results if r[id_type] == _id), None)
         feed = {
-            **_calnet_user_api_feed(calnet_result),
+            **_calnet_user_api_feed(calnet_results_by_id.get(_id)),
             **{id_type: _id},
         }
-        insert_row(f'calnet_user_for_{id_type}_{_id}', feed)
+        feeds_by_key[f'calnet_user_for_{id_type}_{_id}'] = feed
         users_by_id[_id] = feed
+    upsert_rows(feeds_by_key)
+    benchmark(f'cached {len(feeds_by_key)} CalNet feeds')
     return users_by_id
 
 
@@ -24,10 +24,22 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 
 
+from bisect import bisect_left
+import heapq
 import re
+import threading
+import time
 
+from boac import std_commit
 from boac.externals import data_loch
+from boac.lib.change_feed import search_index_changes
 from boac.models.json_cache import stow
+from flask import current_app as app
+
+# Per-term indexes of enrolled primary sections, keyed by term ID. The dict is replaced wholesale on refresh. As with the
+# typeahead index, worker processes rebuild a term's index when search_index_changes announces a refresh.
+_section_indexes = {}
+_refresh_lock = threading.Lock()
 
 
 @stow('sis_section_{sis_section_id}', for_term=True)
@@ -61,6 +73,111 @@ def get_sis_section(term_id, sis_section_id):
     return section
 
 
+class EnrolledPrimarySectionIndex:
+    """Enrolled primary sections of a term, sorted by compressed course name, instruction format and section number.
+
+    Sections matching a course name prefix are contiguous in sort order. Subject area and catalog ID prefixes are
+    looked up in separate sorted arrays of (value, position) pairs.
+    """
+
+    def __init__(self, term_id, rows, version=0):
+        self.term_id = term_id
+        self.sections = sorted(
+            rows,
+            key=lambda r: (r['sis_course_name_compressed'] or '', r['sis_instruction_format'] or '', r['sis_section_num'] or ''),
+        )
+        self.course_names = [s['sis_course_name_compressed'] or '' for s in self.sections]
+        self.catalog_ids = sorted((s['sis_catalog_id'] or '', position) for position, s in enumerate(self.sections))
+        self.subject_areas = sorted((s['sis_subject_area_compressed'] or '', position) for position, s in enumerate(self.sections))
+        self.created_at = time.time()
+        self.version = version
+
+    def __repr__(self):
+        return f'<EnrolledPrimarySectionIndex term_id={self.term_id}, sections={len(self.sections)}, created_at={self.created_at}>'
+
+    def search_by_course_name(self, course_name, limit=None):
+        start = bisect_left(self.course_names, course_name)
+        end = start
+        while end < len(self.course_names) and self.course_names[end].startswith(course_name):
+            end += 1
+        stop = end if limit is None else min(end, start + limit)
+        return self.sections[start:stop], end - start
+
+    def search_by_parsed_code(self, subject_area, catalog_id, limit=None):
+        positions = _positions_for_prefix(self.catalog_ids, catalog_id)
+        if subject_area:
+            positions &= _positions_for_prefix(self.subject_areas, subject_area)
+        matches = sorted(positions) if limit is None else heapq.nsmallest(limit, positions)
+        return [self.sections[p] for p in matches], len(positions)
+
+
+def get_enrolled_primary_section_index(term_id):
+    if app.config['BACKGROUND_TASKS']:
+        search_index_changes.start_listener()
+    index = _section_indexes.get(term_id)
+    if index is None:
+        with _refresh_lock:
+            index = _section_indexes.get(term_id) or _refresh(term_id)
+    elif _is_stale(index) and _refresh_lock.acquire(blocking=False):
+        try:
+            index = _refresh(term_id)
+        finally:
+            _refresh_lock.release()
+    return index
+
+
+def refresh_enrolled_primary_section_index(term_id):
+    with _refresh_lock:
+        previous_index = _section_indexes.get(term_id)
+        index = _refresh(term_id)
+    if index is not previous_index:
+        search_index_changes.publish(_index_key(term_id))
+        std_commit()
+    return index
+
+
+def search_enrolled_primary_sections(term_id, course_name, limit=None):
+    """Return sections matching a compressed course name prefix, up to limit, and a count of all matches."""
+    return get_enrolled_primary_section_index(term_id).search_by_course_name(course_name, limit=limit)
+
+
+def search_enrolled_primary_sections_for_parsed_code(term_id, subject_area, catalog_id, limit=None):
+    """Return sections matching subject area and catalog ID prefixes, up to limit, and a count of all matches."""
+    return get_enrolled_primary_section_index(term_id).search_by_parsed_code(subject_area, catalog_id, limit=limit)
+
+
+def _index_key(term_id):
+    return f'enrolled_primary_sections_{term_id}'
+
+
+def _is_stale(index):
+    version = search_index_changes.sequence(_index_key(index.term_id))
+    return index.version != version or time.time() - index.created_at > app.config['SEARCH_INDEX_MAX_AGE']
+
+
+def _positions_for_prefix(sorted_pairs, prefix):
+    positions = set()
+    idx = bisect_left(sorted_pairs, (prefix,))
+    while idx < len(sorted_pairs) and sorted_pairs[idx][0].startswith(prefix):
+        positions.add(sorted_pairs[idx][1])
+        idx += 1
+    return positions
+
+
+def _refresh(term_id):
+    global _section_indexes
+    version = search_index_changes.sequence(_index_key(term_id))
+    rows = data_loch.get_enrolled_primary_sections_for_term(term_id)
+    if rows is None:
+        # Keep serving the previous index, if any, rather than swap in an empty one.
+        app.logger.error(f'Failed to load enrolled primary sections for term {term_id}; section index not refreshed')
+        return _section_indexes.get(term_id) or EnrolledPrimarySectionIndex(term_id, [])
+    index = EnrolledPrimarySectionIndex(term_id, rows, version=version)
+    _section_indexes = {**_section_indexes, term_id: index}
+    app.logger.info(f'Refreshed section index: {index}')
+    return index
+
+
 def _get_meetings(section_rows):
     meetings = {}
     for row in section_rows:
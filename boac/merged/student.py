@@ -34,6 +34,7 @@ from boac.lib import analytics
 from boac.lib.berkeley import academic_year_for_term_name, dept_codes_where_advising, term_name_for_sis_id
 from boac.lib.util import get_benchmarker
 from boac.merged.sis_terms import current_term_id, current_term_name, future_term_id
+from boac.models.json_cache import fetch, upsert_rows
 from boac.models.manually_added_advisee import ManuallyAddedAdvisee
 from flask import current_app as app
 from flask_login import current_user
@@ -69,33 +70,33 @@ def get_distilled_student_profiles(sids):
         if profile.get('coeProfile'):
             distilled['coeProfile'] = profile['coeProfile']
         return distilled
-    profiles = get_full_student_profiles(sids)
-    remaining_sids = list(set(sids) - set([p.get('sid') for p in profiles]))
-    if remaining_sids:
-        historical_profiles = get_historical_student_profiles(remaining_sids)
-        profiles += historical_profiles
+    profiles = get_full_student_profiles(sids, include_historical=True)
     return [distill_profile(profile) for profile in profiles]
 
 
-def get_full_student_profiles(sids):
+def get_full_student_profiles(sids, include_historical=False):
     benchmark = get_benchmarker('get_full_student_profiles')
     benchmark('begin')
     if not sids:
         return []
     benchmark('begin SIS profile query')
-    profile_results = data_loch.get_student_profiles(sids)
+    profile_results = data_loch.get_student_profiles(sids, include_historical=include_historical)
     benchmark('end SIS profile query')
     if not profile_results:
         return []
-    profiles_by_sid = _get_profiles_by_sid(profile_results)
+    profiles_by_sid = _get_profiles_by_sid([row for row in profile_results if not row['historical']])
     profiles = []
     for sid in sids:
         profile = profiles_by_sid.get(sid)
         if profile:
             profiles.append(profile)
+    historical_profiles_by_sid = {row['sid']: _historicize_profile(row) for row in profile_results if row['historical']}
+    historical_profiles = [historical_profiles_by_sid[sid] for sid in sids if sid in historical_profiles_by_sid]
 
     benchmark('begin photo merge')
-    _merge_photo_urls(profiles)
+    # We don't expect photo information to show for historical profiles, but we still need a placeholder element
+    # in the feed so the front end can show the proper fallback.
+    _merge_photo_urls(profiles + historical_profiles)
     benchmark('end photo merge')
 
     scope = get_student_query_scope()
@@ -116,7 +117,7 @@ def get_full_student_profiles(sids):
                 sid = coe_profile['sid']
                 _merge_coe_student_profile_data(profiles_by_sid.get(sid), coe_profile)
         benchmark('end COE profile merge')
-    return profiles
+    return profiles + historical_profiles
 
 
 def get_course_student_profiles(term_id, section_id, offset=None, limit=None, featured=None):
@@ -206,12 +207,13 @@ def get_course_student_profiles(term_id, section_id, offset=None, limit=None, fe
 def get_distinct_sids(sids=(), cohort_ids=(), curated_group_ids=()):
     all_sids = sids
     query = text("""
-        SELECT sids
-        FROM cohort_filters
-        WHERE id = ANY(:cohort_ids) AND owner_id = :current_user_id
+        SELECT distinct(m.sid)
+        FROM cohort_filter_members m
+        JOIN cohort_filters c ON c.id = m.cohort_filter_id
+        WHERE m.cohort_filter_id = ANY(:cohort_ids) AND c.owner_id = :current_user_id
     """)
     for row in db.session.execute(query, {'cohort_ids': cohort_ids, 'current_user_id': current_user.get_id()}):
-        all_sids.extend(row['sids'])
+        all_sids.append(row['sid'])
     query = text("""
         SELECT distinct(m.sid)
         FROM student_group_members m
@@ -237,7 +239,7 @@ def get_summary_student_profiles(sids, include_historical=False, term_id=None):
     benchmark('begin')
     # TODO It's probably more efficient to store summary profiles in the loch, rather than distilling them
     # on the fly from full profiles.
-    profiles = get_full_student_profiles(sids)
+    profiles = get_full_student_profiles(sids, include_historical=include_historical)
     # TODO Many views require no term enrollment information other than a units count. This datum too should be
     # stored in the loch without BOAC having to crunch it.
     if not term_id:
@@ -253,15 +255,13 @@ def get_summary_student_profiles(sids, include_historical=False, term_id=None):
     term_gpas = get_term_gpas_by_sid(sids)
     benchmark('end term GPA query')
 
-    remaining_sids = list(set(sids) - set([p.get('sid') for p in profiles]))
-    if len(remaining_sids) and include_historical:
-        benchmark('begin historical profile supplement')
-        historical_profiles = get_historical_student_profiles(remaining_sids)
-        profiles += historical_profiles
-        historical_enrollments_for_term = data_loch.get_historical_enrollments_for_term(str(term_id), remaining_sids)
+    historical_sids = [p['sid'] for p in profiles if p.get('fullProfilePending')]
+    if historical_sids:
+        benchmark('begin historical enrollments query')
+        historical_enrollments_for_term = data_loch.get_historical_enrollments_for_term(str(term_id), historical_sids)
         for row in historical_enrollments_for_term:
             enrollments_by_sid[row['sid']] = json.loads(row['enrollment_term'])
-        benchmark('end historical profile supplement')
+        benchmark('end historical enrollments query')
 
     benchmark('begin profile transformation')
     for profile in profiles:
@@ -326,17 +326,6 @@ def get_academic_standing_by_sid(sids, as_dicts=False):
     return academic_standing_feed
 
 
-def get_historical_student_profiles(sids):
-    historical_profile_rows = data_loch.get_historical_student_profiles_for_sids(sids)
-    historical_profiles = [_historicize_profile(row) for row in historical_profile_rows]
-    # We don't expect photo information to show for historical profiles, but we still need a placeholder element
-    # in the feed so the front end can show the proper fallback.
-    _merge_photo_urls(historical_profiles)
-    for historical_profile in historical_profiles:
-        ManuallyAddedAdvisee.find_or_create(historical_profile['sid'])
-    return historical_profiles
-
-
 def get_student_and_terms_by_sid(sid):
     student = data_loch.get_student_by_sid(sid)
     if student:
@@ -609,24 +598,49 @@ def get_student_query_scope(user=None):
 
 
 def merge_enrollment_terms(enrollment_results, academic_standing=None):
-    current_term_found = False
+    return _finalize_enrollment_terms(_filter_enrollment_terms(enrollment_results), academic_standing)
+
+
+def get_merged_enrollment_terms(sid, academic_standing=None):
+    # Past terms are merged once and cached until the next refresh of loch data. Current and future terms are merged
+    # on each view.
+    term_id = current_term_id()
+    cache_key = f'merged_enrollment_terms_{term_id}_{sid}'
+    past_terms = fetch(cache_key)
+    if past_terms is None:
+        enrollment_results = data_loch.get_enrollments_for_sid(sid, latest_term_id=future_term_id())
+        enrollment_terms = _filter_enrollment_terms(enrollment_results)
+        upsert_rows({cache_key: [term for term in enrollment_terms if term['termId'] < term_id]})
+    else:
+        enrollment_results = data_loch.get_enrollments_for_sid(sid, latest_term_id=future_term_id(), first_term_id=term_id)
+        enrollment_terms = _filter_enrollment_terms(enrollment_results) + past_terms
+    return _finalize_enrollment_terms(enrollment_terms, academic_standing)
+
+
+def _filter_enrollment_terms(enrollment_results):
+    term_id_current = current_term_id()
     filtered_enrollment_terms = []
     for row in enrollment_results:
         term = json.loads(row['enrollment_term'])
+        if term['termId'] < term_id_current:
+            # Skip past terms with no enrollments or drops.
+            if not term.get('enrollments') and not term.get('droppedSections'):
+                continue
+            # Filter out old waitlisted enrollments from past terms.
+            if term.get('enrollments'):
+                _omit_zombie_waitlisted_enrollments(term)
+        term['academicYear'] = academic_year_for_term_name(term.get('termName'))
+        filtered_enrollment_terms.append(term)
+    return filtered_enrollment_terms
+
+
+def _finalize_enrollment_terms(enrollment_terms, academic_standing=None):
+    term_id_current = current_term_id()
+    current_term_found = False
+    for term in enrollment_terms:
         term_id = term['termId']
-        if term_id == current_term_id():
+        if term_id == term_id_current:
             current_term_found = True
-        else:
-            if term_id < current_term_id():
-                # Skip past terms with no enrollments or drops.
-                if not term.get('enrollments') and not term.get('droppedSections'):
-                    continue
-                # Filter out old waitlisted enrollments from past terms.
-                if term.get('enrollments'):
-                    _omit_zombie_waitlisted_enrollments(term)
-
-        term_name = term.get('termName')
-        term['academicYear'] = academic_year_for_term_name(term_name)
         if academic_standing:
             term['academicStanding'] = {
                 'status': academic_standing.get(term_id),
@@ -634,17 +648,16 @@ def merge_enrollment_terms(enrollment_results, academic_standing=None):
             }
         if not current_user.can_access_canvas_data:
             _suppress_canvas_sites(term)
-        filtered_enrollment_terms.append(term)
     if not current_term_found:
         current_term = {
             'academicYear': academic_year_for_term_name(current_term_name()),
             'enrolledUnits': 0,
             'enrollments': [],
-            'termId': current_term_id(),
+            'termId': term_id_current,
             'termName': current_term_name(),
         }
-        filtered_enrollment_terms.append(current_term)
-    return filtered_enrollment_terms
+        enrollment_terms.append(current_term)
+    return enrollment_terms
 
 
 def scope_for_criteria(**kwargs):
@@ -746,8 +759,7 @@ def _construct_student_profile(student):
         profile['academicStanding'] = academic_standing.get(student['sid'])
         academic_standing = {term['termId']: term['status'] for term in profile['academicStanding']}
 
-    enrollment_results = data_loch.get_enrollments_for_sid(student['sid'], latest_term_id=future_term_id())
-    profile['enrollmentTerms'] = merge_enrollment_terms(enrollment_results, academic_standing=academic_standing)
+    profile['enrollmentTerms'] = get_merged_enrollment_terms(student['sid'], academic_standing=academic_standing)
 
     if sis_profile and sis_profile.get('withdrawalCancel'):
         profile['withdrawalCancel'] = sis_profile['withdrawalCancel']
@@ -0,0 +1,182 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from bisect import bisect_left
+import threading
+import time
+
+from boac import std_commit
+from boac.externals import data_loch
+from boac.lib.change_feed import search_index_changes
+from flask import current_app as app
+
+"""In-memory prefix indexes of student and advisor names, answering typeahead queries without a trip to the loch."""
+
+# The live index is replaced wholesale on refresh; readers holding the previous index are unaffected. Worker processes
+# rebuild their own copy when search_index_changes announces a refresh, or when it reaches SEARCH_INDEX_MAX_AGE.
+_typeahead_index = None
+_refresh_lock = threading.Lock()
+
+
+class PrefixIndex:
+    """Sorted array of (token, entry position) pairs. Entries are kept in result order, by first and last name."""
+
+    def __init__(self, tokens_by_entry):
+        self.entries = sorted(tokens_by_entry.keys(), key=_sort_key)
+        pairs = []
+        for position, entry in enumerate(self.entries):
+            pairs.extend((token, position) for token in tokens_by_entry[entry] if token)
+        pairs.sort()
+        self.tokens = [p[0] for p in pairs]
+        self.positions = [p[1] for p in pairs]
+
+    def match(self, prefixes):
+        """Return positions of entries having, for each prefix, at least one token which starts with that prefix."""
+        matched = None
+        for prefix in prefixes:
+            positions = set()
+            idx = bisect_left(self.tokens, prefix)
+            while idx < len(self.tokens) and self.tokens[idx].startswith(prefix):
+                positions.add(self.positions[idx])
+                idx += 1
+            matched = positions if matched is None else matched & positions
+            if not matched:
+                return set()
+        return set(range(len(self.entries))) if matched is None else matched
+
+
+class TypeaheadIndex:
+
+    def __init__(self, advising_note_author_rows, student_rows, historical_student_rows, version=0):
+        self.advising_note_authors = PrefixIndex(_tokens_by_entry(advising_note_author_rows))
+        # Current students match on name or SID; non-current students match on SID only.
+        self.current_students = PrefixIndex(_tokens_by_entry(student_rows, include_sid=True))
+        self.historical_students = PrefixIndex(_tokens_by_entry(historical_student_rows, include_sid=True, include_name=False))
+        self.created_at = time.time()
+        self.version = version
+
+    def __repr__(self):
+        return f"""<TypeaheadIndex advising_note_authors={len(self.advising_note_authors.entries)},
+                    current_students={len(self.current_students.entries)},
+                    historical_students={len(self.historical_students.entries)},
+                    created_at={self.created_at}>
+                """
+
+
+def match_advising_note_authors_by_name(prefixes, limit=None):
+    index = get_typeahead_index()
+    authors = _entries(index.advising_note_authors, prefixes)
+    return _to_api_json(authors, limit)
+
+
+def match_students_by_name_or_sid(prefixes, limit=None):
+    prefixes = list(prefixes)
+    index = get_typeahead_index()
+    students = _entries(index.current_students, prefixes)
+    sid_prefixes = [p for p in prefixes if not p.isalpha()]
+    if sid_prefixes:
+        students = sorted(set(students + _entries(index.historical_students, sid_prefixes)), key=_sort_key)
+    return _to_api_json(students, limit)
+
+
+def get_typeahead_index():
+    if app.config['BACKGROUND_TASKS']:
+        search_index_changes.start_listener()
+    index = _typeahead_index
+    if index is None:
+        with _refresh_lock:
+            index = _typeahead_index or _refresh()
+    elif _is_stale(index) and _refresh_lock.acquire(blocking=False):
+        # Stale indexes are rebuilt by one request at a time; concurrent requests make do with the stale index.
+        try:
+            index = _refresh()
+        finally:
+            _refresh_lock.release()
+    return index
+
+
+def refresh_typeahead_index():
+    with _refresh_lock:
+        previous_index = _typeahead_index
+        index = _refresh()
+    if index is not previous_index:
+        search_index_changes.publish('typeahead')
+        std_commit()
+    return index
+
+
+def _is_stale(index):
+    return index.version != search_index_changes.sequence('typeahead') or time.time() - index.created_at > app.config['SEARCH_INDEX_MAX_AGE']
+
+
+def _refresh():
+    global _typeahead_index
+    version = search_index_changes.sequence('typeahead')
+    rows = [
+        data_loch.get_advising_note_author_names(),
+        data_loch.get_student_names(),
+        data_loch.get_student_names_hist_enr(),
+    ]
+    if any(r is None for r in rows):
+        # Keep serving the previous index, if any, rather than swap in an empty one.
+        app.logger.error('Failed to load names from the loch; typeahead index not refreshed')
+        return _typeahead_index or TypeaheadIndex([], [], [])
+    _typeahead_index = TypeaheadIndex(*rows, version=version)
+    app.logger.info(f'Refreshed typeahead index: {_typeahead_index}')
+    return _typeahead_index
+
+
+def _entries(prefix_index, prefixes):
+    return [prefix_index.entries[position] for position in sorted(prefix_index.match(prefixes))]
+
+
+def _sort_key(entry):
+    first_name, last_name, sid, uid = entry
+    return (first_name or '').upper(), (last_name or '').upper(), sid or '', uid or ''
+
+
+def _to_api_json(entries, limit=None):
+    if limit:
+        entries = entries[:int(limit)]
+    return [
+        {
+            'first_name': first_name,
+            'last_name': last_name,
+            'sid': sid,
+            'uid': uid,
+        } for first_name, last_name, sid, uid in entries
+    ]
+
+
+def _tokens_by_entry(rows, include_name=True, include_sid=False):
+    tokens_by_entry = {}
+    for row in rows:
+        entry = (row['first_name'], row['last_name'], row['sid'], row['uid'])
+        tokens = tokens_by_entry.setdefault(entry, set())
+        if include_name:
+            tokens.add(row['name'])
+        if include_sid:
+            tokens.add(row['sid'])
+    return tokens_by_entry
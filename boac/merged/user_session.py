@@ -23,13 +23,22 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+import time
+
 from boac.lib.berkeley import BERKELEY_DEPT_CODE_TO_NAME
+from boac.lib.change_feed import user_session_changes
 from boac.merged import calnet
 from boac.models.authorized_user import AuthorizedUser
 from boac.models.json_cache import clear, stow
 from flask import current_app as app
 from flask_login import UserMixin
 
+# Flask-Login loads the user on every request. To spare the database, session profiles are also cached in worker
+# memory, keyed by user ID. Flushing a user's cached session publishes the user ID on user_session_changes, and every
+# worker process treats its copy as stale once that ID has been published since the copy was cached.
+# USER_SESSION_CACHE_TTL bounds the age of a copy should a notification be missed.
+_cached_api_json = {}
+
 
 class UserSession(UserMixin):
 
@@ -72,10 +81,13 @@ class UserSession(UserMixin):
 
     @classmethod
     def flush_cache_for_id(cls, user_id):
+        if user_id:
+            _cached_api_json.pop(int(user_id), None)
+            user_session_changes.publish(str(user_id))
         clear(f'boa_user_session_{user_id}')
 
     def flush_cached(self):
-        clear(f'boa_user_session_{self.user_id}')
+        self.flush_cache_for_id(self.user_id)
 
     def get_csid(self):
         return self.api_json.get('csid')
@@ -121,9 +133,22 @@ class UserSession(UserMixin):
             return False
 
     @classmethod
-    @stow('boa_user_session_{user_id}')
     def load_user(cls, user_id):
-        return cls._get_api_json(user=AuthorizedUser.find_by_id(user_id))
+        ttl = app.config['USER_SESSION_CACHE_TTL']
+        if ttl:
+            user_session_changes.start_listener()
+        version = user_session_changes.sequence(str(user_id))
+        cached = _cached_api_json.get(user_id)
+        if cached and cached['version'] == version and time.time() - cached['cachedAt'] < ttl:
+            return cached['apiJson']
+        api_json = cls._load_user(user_id)
+        if ttl and api_json:
+            _cached_api_json[user_id] = {
+                'apiJson': api_json,
+                'cachedAt': time.time(),
+                'version': version,
+            }
+        return api_json
 
     @property
     def same_day_advisor_departments(self):
@@ -132,6 +157,11 @@ class UserSession(UserMixin):
     def to_api_json(self):
         return self.api_json
 
+    @classmethod
+    @stow('boa_user_session_{user_id}')
+    def _load_user(cls, user_id):
+        return cls._get_api_json(user=AuthorizedUser.find_by_id(user_id))
+
     @classmethod
     def _get_api_json(cls, user=None):
         calnet_profile = None
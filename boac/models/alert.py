@@ -32,7 +32,9 @@ from boac import db, std_commit
 from boac.api.errors import BadRequestError
 from boac.externals import data_loch
 from boac.lib.berkeley import ACADEMIC_STANDING_DESCRIPTIONS, section_is_eligible_for_alerts, term_name_for_sis_id
+from boac.lib.change_feed import alert_badge_changes
 from boac.lib.util import camelize, unix_timestamp_to_localtime, utc_timestamp_to_localtime
+from boac.merged.alert_badges import evict_alert_badges
 from boac.merged.sis_terms import current_term_id
 from boac.merged.student import get_academic_standing_by_sid
 from boac.models.base import Base
@@ -113,56 +115,95 @@ class Alert(Base):
         alert = cls.query.filter_by(id=alert_id).first()
         if alert:
             alert_view = AlertView.query.filter_by(viewer_id=viewer_id, alert_id=alert_id).first()
+            is_new_dismissal = not (alert_view and alert_view.dismissed_at)
             if alert_view:
                 alert_view.dismissed_at = datetime.now()
             else:
                 db.session.add(AlertView(viewer_id=viewer_id, alert_id=alert_id, dismissed_at=datetime.now()))
+            counts_changed = is_new_dismissal and alert.deleted_at is None and alert.key[4:5] == '_'
+            if counts_changed:
+                query = text("""
+                    INSERT INTO alert_view_counts (viewer_id, sid, term_id, dismissed_count)
+                    VALUES (:viewer_id, :sid, :term_id, 1)
+                    ON CONFLICT (viewer_id, sid, term_id)
+                    DO UPDATE SET dismissed_count = alert_view_counts.dismissed_count + 1
+                """)
+                db.session.execute(query, {'viewer_id': viewer_id, 'sid': alert.sid, 'term_id': alert.key[0:4]})
+                alert_badge_changes.publish(str(viewer_id))
             std_commit()
+            if counts_changed:
+                evict_alert_badges(viewer_id)
+            return alert
         else:
             raise BadRequestError(f'No alert found for id {alert_id}')
 
     @classmethod
     def current_alert_counts_for_viewer(cls, viewer_id):
-        query = """
-            SELECT alerts.sid, count(*) as alert_count
-            FROM alerts LEFT JOIN alert_views
-                ON alert_views.alert_id = alerts.id
-                AND alert_views.viewer_id = :viewer_id
-            WHERE alerts.deleted_at IS NULL
-                AND alerts.key LIKE :key
-                AND alert_views.dismissed_at IS NULL
-            GROUP BY alerts.sid
-        """
-        params = {'viewer_id': viewer_id, 'key': current_term_id() + '_%'}
+        query = _current_alert_counts_query()
+        params = {'viewer_id': viewer_id, 'term_id': current_term_id()}
         return cls.alert_counts_by_query(query, params)
 
     @classmethod
     def current_alert_counts_for_sids(cls, viewer_id, sids, count_only=False, offset=None, limit=None):
-        query = """
-            SELECT alerts.sid, count(*) as alert_count
-            FROM alerts LEFT JOIN alert_views
-                ON alert_views.alert_id = alerts.id
-                AND alert_views.viewer_id = :viewer_id
-            WHERE alerts.deleted_at IS NULL
-                AND alerts.key LIKE :key
-                AND alerts.sid = ANY(:sids)
-                AND alert_views.dismissed_at IS NULL
-            GROUP BY alerts.sid
-            ORDER BY alert_count DESC, alerts.sid
-        """
-        if offset:
-            query += ' OFFSET :offset'
-        if limit:
-            query += ' LIMIT :limit'
+        query = _current_alert_counts_query(sid_filter='AND c.sid = ANY(:sids)', offset=offset, limit=limit)
         params = {
             'viewer_id': viewer_id,
-            'key': current_term_id() + '_%',
+            'term_id': current_term_id(),
             'sids': sids,
             'offset': offset,
             'limit': limit,
         }
         return cls.alert_counts_by_query(query, params, count_only=count_only)
 
+    @classmethod
+    def current_alert_counts_for_cohort(cls, viewer_id, cohort_filter_id, count_only=False, offset=None, limit=None):
+        query = _current_alert_counts_query(
+            membership_join='JOIN cohort_filter_members m ON m.sid = c.sid AND m.cohort_filter_id = :cohort_filter_id',
+            offset=offset,
+            limit=limit,
+        )
+        params = {
+            'viewer_id': viewer_id,
+            'term_id': current_term_id(),
+            'cohort_filter_id': cohort_filter_id,
+            'offset': offset,
+            'limit': limit,
+        }
+        return cls.alert_counts_by_query(query, params, count_only=count_only)
+
+    @classmethod
+    def refresh_alert_counts(cls, sids=None):
+        # Counts of active alerts per SID and term, and of dismissals per viewer, SID and term, are kept so that
+        # alert badges need not aggregate the alerts table.
+        sid_filter = 'sid = ANY(:sids)' if sids is not None else 'TRUE'
+        params = {'sids': sids}
+        db.session.execute(text(f'DELETE FROM student_alert_counts WHERE {sid_filter}'), params)
+        db.session.execute(
+            text(f"""
+                INSERT INTO student_alert_counts (sid, term_id, alert_count)
+                SELECT sid, substr(key, 1, 4), count(*)
+                FROM alerts
+                WHERE deleted_at IS NULL AND substr(key, 5, 1) = '_' AND {sid_filter}
+                GROUP BY sid, substr(key, 1, 4)
+            """),
+            params,
+        )
+        db.session.execute(text(f'DELETE FROM alert_view_counts WHERE {sid_filter}'), params)
+        db.session.execute(
+            text(f"""
+                INSERT INTO alert_view_counts (viewer_id, sid, term_id, dismissed_count)
+                SELECT alert_views.viewer_id, sid, substr(key, 1, 4), count(*)
+                FROM alerts
+                JOIN alert_views ON alert_views.alert_id = alerts.id
+                WHERE deleted_at IS NULL AND dismissed_at IS NOT NULL AND substr(key, 5, 1) = '_' AND {sid_filter}
+                GROUP BY alert_views.viewer_id, sid, substr(key, 1, 4)
+            """),
+            params,
+        )
+        alert_badge_changes.publish('*')
+        std_commit()
+        evict_alert_badges()
+
     @classmethod
     def alert_counts_by_query(cls, query, params, count_only=False):
         results = db.session.execute(text(query), params)
@@ -226,6 +267,7 @@ class Alert(Base):
     def deactivate(self):
         self.deleted_at = datetime.now()
         std_commit()
+        self.refresh_alert_counts([self.sid])
 
     @classmethod
     def create_or_activate(
@@ -266,6 +308,7 @@ class Alert(Base):
         )
         results = query.update({cls.deleted_at: datetime.now()}, synchronize_session='fetch')
         std_commit()
+        cls.refresh_alert_counts([sid])
         return results
 
     @classmethod
@@ -295,7 +338,9 @@ class Alert(Base):
         return days_into_session >= app.config['ALERT_NO_ACTIVITY_DAYS_INTO_SESSION']
 
     @classmethod
-    def deactivate_all_for_term(cls, term_id):
+    def deactivate_all_for_term(cls, term_id, recount=True):
+        # Callers about to reactivate alerts for the term pass recount=False, leaving badges as they were until the
+        # recount at the end, rather than zeroed in the meantime.
         query = (
             cls.query.
             filter(cls.key.startswith(f'{term_id}_%')).
@@ -303,10 +348,12 @@ class Alert(Base):
         )
         results = query.update({cls.deleted_at: datetime.now()}, synchronize_session='fetch')
         std_commit()
+        if recount:
+            cls.refresh_alert_counts()
         return results
 
     @classmethod
-    def update_all_for_term(cls, term_id):
+    def update_all_for_term(cls, term_id, recount=True):
         app.logger.info('Starting alert update')
         enrollments_for_term = data_loch.get_enrollments_for_term(str(term_id))
         no_activity_alerts_enabled = cls.no_activity_alerts_enabled()
@@ -338,6 +385,9 @@ class Alert(Base):
                     status=standing['status'],
                     term_id=term_id,
                 )
+        # Alerts created or reactivated above are counted in one pass.
+        if recount:
+            cls.refresh_alert_counts()
         app.logger.info('Alert update complete')
 
     @classmethod
@@ -440,12 +490,42 @@ class Alert(Base):
         cls.create_or_activate(sid=sid, alert_type='withdrawal', key=key, message=message, preserve_creation_date=True)
 
     @classmethod
-    def include_alert_counts_for_students(cls, viewer_user_id, group, count_only=False, offset=None, limit=None):
-        sids = group.get('sids') if 'sids' in group else [s['sid'] for s in group.get('students', [])]
-        alert_counts = cls.current_alert_counts_for_sids(viewer_user_id, sids, count_only=count_only, offset=offset, limit=limit)
+    def include_alert_counts_for_students(cls, viewer_user_id, group, count_only=False, offset=None, limit=None, cohort_filter_id=None):
+        if cohort_filter_id:
+            alert_counts = cls.current_alert_counts_for_cohort(
+                viewer_user_id,
+                cohort_filter_id,
+                count_only=count_only,
+                offset=offset,
+                limit=limit,
+            )
+        else:
+            sids = group.get('sids') if 'sids' in group else [s['sid'] for s in group.get('students', [])]
+            alert_counts = cls.current_alert_counts_for_sids(viewer_user_id, sids, count_only=count_only, offset=offset, limit=limit)
         if 'students' in group:
             counts_per_sid = {s.get('sid'): s.get('alertCount') for s in alert_counts}
             for student in group.get('students'):
                 sid = student['sid']
                 student['alertCount'] = counts_per_sid.get(sid) if sid in counts_per_sid else 0
         return alert_counts
+
+
+def _current_alert_counts_query(membership_join='', sid_filter='', offset=None, limit=None):
+    query = f"""
+        SELECT c.sid, c.alert_count - COALESCE(v.dismissed_count, 0) AS alert_count
+        FROM student_alert_counts c
+        {membership_join}
+        LEFT JOIN alert_view_counts v
+            ON v.viewer_id = :viewer_id
+            AND v.sid = c.sid
+            AND v.term_id = c.term_id
+        WHERE c.term_id = :term_id
+            AND c.alert_count > COALESCE(v.dismissed_count, 0)
+            {sid_filter}
+        ORDER BY alert_count DESC, c.sid
+    """
+    if offset:
+        query += ' OFFSET :offset'
+    if limit:
+        query += ' LIMIT :limit'
+    return query
@@ -31,6 +31,7 @@ from boac import db, std_commit
 from boac.externals import data_loch
 from boac.lib.background import bg_execute
 from boac.lib.berkeley import BERKELEY_DEPT_CODE_TO_NAME
+from boac.lib.change_feed import appointment_changes
 from boac.lib.util import (
     camelize, localize_datetime, localized_timestamp_to_utc,
     search_result_text_snippet, TEXT_SEARCH_PATTERN, titleize, utc_now, vacuum_whitespace,
@@ -45,6 +46,7 @@ from dateutil.tz import tzutc
 from flask import current_app as app
 from sqlalchemy import and_
 from sqlalchemy.dialects.postgresql import ARRAY, ENUM
+from sqlalchemy.orm import selectinload
 from sqlalchemy.sql import text
 
 
@@ -130,30 +132,115 @@ class Appointment(Base):
 
     @classmethod
     def get_appointments_per_sid(cls, sid):
-        return cls.query.filter(and_(cls.student_sid == sid, cls.deleted_at == None)).order_by(cls.updated_at, cls.id).all()  # noqa: E711
+        query = cls.query.filter(and_(cls.student_sid == sid, cls.deleted_at == None))  # noqa: E711
+        return query.options(selectinload(cls.topics)).order_by(cls.updated_at, cls.id).all()
 
     @classmethod
     def get_drop_in_waitlist(cls, dept_code, statuses=()):
-        local_today = localize_datetime(datetime.now()).strftime('%Y-%m-%d')
-        start_of_today = localized_timestamp_to_utc(f'{local_today}T00:00:00')
         criterion = and_(
-            cls.created_at >= start_of_today,
+            cls.created_at >= _start_of_today(),
             cls.appointment_type == 'Drop-in',
             cls.status.in_(statuses),
             cls.deleted_at == None,  # noqa: E711
             cls.dept_code == dept_code,
         )
-        return cls.query.filter(criterion).order_by(cls.created_at).all()
+        return cls.query.options(selectinload(cls.topics)).filter(criterion).order_by(cls.created_at).all()
+
+    @classmethod
+    def get_drop_in_waitlist_version(cls, dept_code, viewer_id, statuses=()):
+        # Fingerprint of everything the waitlist feed depends on, cheap enough to compute on every poll.
+        sql = text("""
+            SELECT md5(concat_ws('|',
+                :dept_code,
+                :statuses,
+                :start_of_today,
+                (
+                    SELECT string_agg(concat_ws(':', a.id, a.status, a.updated_at, r.created_at), ',' ORDER BY a.id)
+                    FROM appointments a
+                    LEFT JOIN appointments_read r ON r.appointment_id = a.id::varchar AND r.viewer_id = :viewer_id
+                    WHERE a.created_at >= :start_of_today
+                        AND a.appointment_type = 'Drop-in'
+                        AND a.status::varchar = ANY(:statuses_array)
+                        AND a.deleted_at IS NULL
+                        AND a.dept_code = :dept_code
+                ),
+                (
+                    SELECT string_agg(
+                        concat_ws(':', d.authorized_user_id, d.is_available, d.status, d.updated_at, u.updated_at),
+                        ',' ORDER BY d.authorized_user_id
+                    )
+                    FROM drop_in_advisors d
+                    JOIN authorized_users u ON u.id = d.authorized_user_id
+                    WHERE d.dept_code = :dept_code
+                )
+            )) AS version
+        """)
+        statuses = sorted(statuses)
+        params = {
+            'dept_code': dept_code,
+            'start_of_today': _start_of_today(),
+            'statuses': ','.join(statuses),
+            'statuses_array': statuses,
+            'viewer_id': viewer_id,
+        }
+        return db.session.execute(sql, params).scalar()
 
     @classmethod
     def get_scheduled(cls, dept_code, local_date, advisor_uid=None):
+        return cls.get_scheduled_for_date_range(dept_code, local_date, local_date, advisor_uid)
+
+    @classmethod
+    def get_scheduled_version(cls, dept_code, local_date, viewer_id, advisor_uid=None):
+        # Fingerprint of the day's scheduled appointments and the advisor availability from which openings are computed.
+        advisor_clause = 'AND a.advisor_uid = :advisor_uid' if advisor_uid else ''
+        sql = text(f"""
+            SELECT md5(concat_ws('|',
+                :dept_code,
+                :advisor_uid,
+                :local_date,
+                (
+                    SELECT string_agg(concat_ws(':', a.id, a.status, a.updated_at, r.created_at), ',' ORDER BY a.id)
+                    FROM appointments a
+                    LEFT JOIN appointments_read r ON r.appointment_id = a.id::varchar AND r.viewer_id = :viewer_id
+                    WHERE a.scheduled_time >= :start_of_day
+                        AND a.scheduled_time <= :end_of_day
+                        AND a.appointment_type = 'Scheduled'
+                        AND a.deleted_at IS NULL
+                        AND a.dept_code = :dept_code
+                        {advisor_clause}
+                ),
+                (
+                    SELECT string_agg(
+                        concat_ws(':', v.id, v.authorized_user_id, v.date_override, v.start_time, v.end_time),
+                        ',' ORDER BY v.id
+                    )
+                    FROM appointment_availability v
+                    WHERE v.dept_code = :dept_code
+                        AND v.weekday::text = :weekday
+                        AND (v.date_override IS NULL OR v.date_override = CAST(:local_date AS date))
+                )
+            )) AS version
+        """)
         date_str = local_date.strftime('%Y-%m-%d')
-        start_of_today = localized_timestamp_to_utc(f'{date_str}T00:00:00')
-        end_of_today = localized_timestamp_to_utc(f'{date_str}T23:59:59')
+        params = {
+            'advisor_uid': advisor_uid or '',
+            'dept_code': dept_code,
+            'end_of_day': localized_timestamp_to_utc(f'{date_str}T23:59:59'),
+            'local_date': date_str,
+            'start_of_day': localized_timestamp_to_utc(f'{date_str}T00:00:00'),
+            'viewer_id': viewer_id,
+            'weekday': local_date.strftime('%a'),
+        }
+        return db.session.execute(sql, params).scalar()
+
+    @classmethod
+    def get_scheduled_for_date_range(cls, dept_code, start_date, end_date, advisor_uid=None):
+        start_of_range = localized_timestamp_to_utc(f"{start_date.strftime('%Y-%m-%d')}T00:00:00")
+        end_of_range = localized_timestamp_to_utc(f"{end_date.strftime('%Y-%m-%d')}T23:59:59")
         query = cls.query.filter(
             and_(
-                cls.scheduled_time >= start_of_today,
-                cls.scheduled_time <= end_of_today,
+                cls.scheduled_time >= start_of_range,
+                cls.scheduled_time <= end_of_range,
                 cls.appointment_type == 'Scheduled',
                 cls.deleted_at == None,  # noqa: E711
                 cls.dept_code == dept_code,
@@ -161,7 +248,7 @@ class Appointment(Base):
         )
         if advisor_uid:
             query = query.filter(cls.advisor_uid == advisor_uid)
-        return query.order_by(cls.scheduled_time).all()
+        return query.options(selectinload(cls.topics)).order_by(cls.scheduled_time).all()
 
     @classmethod
     def create(
@@ -207,6 +294,7 @@ class Appointment(Base):
             )
         db.session.add(appointment)
         std_commit()
+        appointment_changes.publish(dept_code)
         AppointmentEvent.create(
             appointment_id=appointment.id,
             advisor_id=advisor_attrs and advisor_attrs['id'],
@@ -228,6 +316,7 @@ class Appointment(Base):
             appointment.updated_by = checked_in_by
             std_commit()
             db.session.refresh(appointment)
+            appointment_changes.publish(appointment.dept_code)
             AppointmentEvent.create(
                 appointment_id=appointment.id,
                 user_id=checked_in_by,
@@ -249,6 +338,7 @@ class Appointment(Base):
             appointment.advisor_name = None
             appointment.advisor_role = None
             appointment.advisor_dept_codes = None
+            appointment_changes.publish(appointment.dept_code)
             AppointmentEvent.create(
                 appointment_id=appointment.id,
                 user_id=cancelled_by,
@@ -274,6 +364,7 @@ class Appointment(Base):
             appointment.advisor_name = advisor_attrs['name']
             appointment.advisor_role = advisor_attrs['role']
             appointment.advisor_dept_codes = advisor_attrs['deptCodes']
+            appointment_changes.publish(appointment.dept_code)
             AppointmentEvent.create(
                 appointment_id=appointment.id,
                 user_id=reserved_by,
@@ -294,6 +385,7 @@ class Appointment(Base):
         self.advisor_name = None
         self.advisor_role = None
         self.advisor_dept_codes = None
+        appointment_changes.publish(self.dept_code)
         AppointmentEvent.create(
             appointment_id=self.id,
             user_id=updated_by,
@@ -318,6 +410,8 @@ class Appointment(Base):
                 user_id=updated_by,
                 event_type=event_type,
             )
+        for dept_code in set(a.dept_code for a in appointments):
+            appointment_changes.publish(dept_code)
         std_commit()
 
     @classmethod
@@ -402,6 +496,7 @@ class Appointment(Base):
         self.student_contact_info = student_contact_info
         self.student_contact_type = student_contact_type
         _update_appointment_topics(self, topics, updated_by)
+        appointment_changes.publish(self.dept_code)
         std_commit()
         db.session.refresh(self)
         self.refresh_search_index()
@@ -422,6 +517,7 @@ class Appointment(Base):
             appointment.deleted_at = now
             for topic in appointment.topics:
                 topic.deleted_at = now
+            appointment_changes.publish(appointment.dept_code)
             std_commit()
             cls.refresh_search_index()
 
@@ -429,40 +525,53 @@ class Appointment(Base):
         return self.status in ['reserved', 'waiting']
 
     def to_api_json(self, current_user_id):
-        topics = [t.to_api_json() for t in self.topics if not t.deleted_at]
-        departments = None
-        if self.advisor_dept_codes:
-            departments = [{'code': c, 'name': BERKELEY_DEPT_CODE_TO_NAME.get(c, c)} for c in self.advisor_dept_codes]
-        api_json = {
-            'id': self.id,
-            'advisorId': AuthorizedUser.get_id_per_uid(self.advisor_uid),
-            'advisorName': self.advisor_name,
-            'advisorRole': self.advisor_role,
-            'advisorUid': self.advisor_uid,
-            'advisorDepartments': departments,
-            'appointmentType': self.appointment_type,
-            'createdAt': _isoformat(self.created_at),
-            'createdBy': self.created_by,
-            'deptCode': self.dept_code,
-            'details': self.details,
-            'read': AppointmentRead.was_read_by(current_user_id, self.id),
-            'student': {
-                'sid': self.student_sid,
-            },
-            'topics': topics,
-            'updatedAt': _isoformat(self.updated_at),
-            'updatedBy': self.updated_by,
-        }
-        if self.appointment_type == 'Scheduled':
-            api_json.update({
-                'scheduledTime': _isoformat(self.scheduled_time),
-                'studentContactInfo': self.student_contact_info,
-                'studentContactType': self.student_contact_type,
-            })
-        return {
+        return appointments_to_api_json([self], current_user_id)[0]
+
+
+def appointments_to_api_json(appointments, current_user_id):
+    # Advisor ids, read status, status events and CalNet profiles are fetched for all appointments at once.
+    appointment_ids = [a.id for a in appointments]
+    advisor_id_per_uid = AuthorizedUser.get_id_per_uids(set(a.advisor_uid for a in appointments if a.advisor_uid))
+    read_appointment_ids = AppointmentRead.get_appointment_ids_read_by_user(current_user_id, appointment_ids)
+    event_json_per_id = appointment_events_to_json(appointments)
+    results = []
+    for appointment in appointments:
+        api_json = _to_api_json(
+            appointment,
+            advisor_id=advisor_id_per_uid.get(appointment.advisor_uid),
+            read=str(appointment.id) in read_appointment_ids,
+        )
+        results.append({
             **api_json,
-            **appointment_event_to_json(self.id, self.status),
+            **event_json_per_id[appointment.id],
+        })
+    return results
+
+
+def appointment_events_to_json(appointments):
+    events = AppointmentEvent.get_most_recent_per_appointment_and_type([a.id for a in appointments])
+    uid_per_user_id = AuthorizedUser.get_uid_per_ids(set(e.user_id for e in events.values() if e.user_id))
+    uids = list(set(uid_per_user_id.values()))
+    calnet_users = calnet.get_calnet_users_for_uids(app, uids) if uids else {}
+
+    def _status_by_user(event):
+        uid = uid_per_user_id.get(event.user_id)
+        # Events recorded without a known user have no CalNet profile to look up.
+        return {
+            'id': event.user_id,
+            **(calnet_users[uid] if uid else {'uid': None}),
+        }
+    event_json_per_id = {}
+    for appointment in appointments:
+        event = events.get((appointment.id, appointment.status)) if appointment.status else None
+        event_json_per_id[appointment.id] = {
+            'cancelReason': event and event.cancel_reason,
+            'cancelReasonExplained': event and event.cancel_reason_explained,
+            'status': appointment.status,
+            'statusBy': event and _status_by_user(event),
+            'statusDate': event and _isoformat(event.created_at),
         }
+    return event_json_per_id
 
 
 def appointment_event_to_json(appointment_id, event_type):
@@ -486,6 +595,40 @@ def appointment_event_to_json(appointment_id, event_type):
     }
 
 
+def _to_api_json(appointment, advisor_id, read):
+    topics = [t.to_api_json() for t in appointment.topics if not t.deleted_at]
+    departments = None
+    if appointment.advisor_dept_codes:
+        departments = [{'code': c, 'name': BERKELEY_DEPT_CODE_TO_NAME.get(c, c)} for c in appointment.advisor_dept_codes]
+    api_json = {
+        'id': appointment.id,
+        'advisorId': advisor_id,
+        'advisorName': appointment.advisor_name,
+        'advisorRole': appointment.advisor_role,
+        'advisorUid': appointment.advisor_uid,
+        'advisorDepartments': departments,
+        'appointmentType': appointment.appointment_type,
+        'createdAt': _isoformat(appointment.created_at),
+        'createdBy': appointment.created_by,
+        'deptCode': appointment.dept_code,
+        'details': appointment.details,
+        'read': read,
+        'student': {
+            'sid': appointment.student_sid,
+        },
+        'topics': topics,
+        'updatedAt': _isoformat(appointment.updated_at),
+        'updatedBy': appointment.updated_by,
+    }
+    if appointment.appointment_type == 'Scheduled':
+        api_json.update({
+            'scheduledTime': _isoformat(appointment.scheduled_time),
+            'studentContactInfo': appointment.student_contact_info,
+            'studentContactType': appointment.student_contact_type,
+        })
+    return api_json
+
+
 def _to_json(search_terms, search_result):
     appointment_id = search_result['id']
     sid = search_result['student_sid']
@@ -547,5 +690,10 @@ def _update_appointment_topics(appointment, topics, updated_by):
         appointment.updated_by = updated_by
 
 
+def _start_of_today():
+    local_today = localize_datetime(datetime.now()).strftime('%Y-%m-%d')
+    return localized_timestamp_to_utc(f'{local_today}T00:00:00')
+
+
 def _isoformat(value):
     return value and value.astimezone(tzutc()).isoformat()
@@ -27,6 +27,7 @@ from datetime import date, datetime, time, timedelta
 from itertools import groupby
 
 from boac import db, std_commit
+from boac.lib.change_feed import appointment_changes
 from boac.models.base import Base
 from dateutil.tz import tzutc
 from flask import current_app as app
@@ -93,6 +94,7 @@ class AppointmentAvailability(Base):
         )
         db.session.add(slot)
         std_commit()
+        appointment_changes.publish(dept_code)
         cls._merge_overlaps(slot.authorized_user_id, slot.dept_code, slot.weekday, slot.date_override)
         return True
 
@@ -104,12 +106,15 @@ class AppointmentAvailability(Base):
         slot.end_time = end_time
         std_commit()
         db.session.refresh(slot)
+        appointment_changes.publish(slot.dept_code)
         cls._merge_overlaps(slot.authorized_user_id, slot.dept_code, slot.weekday, slot.date_override)
         return True
 
     @classmethod
     def delete(cls, id_):
-        db.session.execute(cls.__table__.delete().where(cls.id == id_))
+        dept_code = db.session.execute(cls.__table__.delete().where(cls.id == id_).returning(cls.dept_code)).scalar()
+        if dept_code:
+            appointment_changes.publish(dept_code)
         std_commit()
         return True
 
@@ -133,7 +138,7 @@ class AppointmentAvailability(Base):
 
     @classmethod
     def daily_availability_for_department(cls, dept_code, date_):
-        results = cls._query_availability(dept_code, date_)
+        results = cls._query_availability(dept_code, [date_])
         availability = {}
         for uid, group_by_uid in groupby(results, lambda x: x.uid):
             availability_for_uid = [cls.to_api_json(a['id'], a['start_time'], a['end_time']) for a in group_by_uid if a['start_time']]
@@ -142,46 +147,53 @@ class AppointmentAvailability(Base):
         return availability
 
     @classmethod
-    def get_openings(cls, dept_code, date_, appointments):
-        results = cls._query_availability(dept_code, date_)
+    def get_openings(cls, dept_code, dates, booked_times):
+        # Dates are local. Booked times are (advisor_uid, scheduled_time) pairs, indexed as a set so that each candidate
+        # opening is checked for conflict in constant time.
+        appointment_length = timedelta(minutes=app.config['SCHEDULED_APPOINTMENT_LENGTH'])
+        booked = set((uid, scheduled_time.astimezone(pytz.utc)) for uid, scheduled_time in booked_times)
+        local_tz = pytz.timezone(app.config['TIMEZONE'])
         openings = []
-        for uid, group_by_uid in groupby(results, lambda x: x.uid):
-            for a in group_by_uid:
-                if a['start_time'] and a['end_time']:
-                    start_opening = datetime.combine(date_, a['start_time']).replace(tzinfo=date_.tzinfo).astimezone(pytz.utc)
-                    end_availability = datetime.combine(date_, a['end_time']).replace(tzinfo=date_.tzinfo).astimezone(pytz.utc)
-                    while (end_availability - start_opening).total_seconds() >= app.config['SCHEDULED_APPOINTMENT_LENGTH'] * 60:
-                        end_opening = start_opening + timedelta(minutes=app.config['SCHEDULED_APPOINTMENT_LENGTH'])
-                        start_time_str = _isoformat(start_opening)
-                        if next((a for a in appointments if a['scheduledTime'] == start_time_str and a['advisorUid'] == uid), None) is None:
-                            openings.append({
-                                'uid': uid,
-                                'startTime': start_time_str,
-                                'endTime': str(end_opening),
-                            })
-                        start_opening = end_opening
+        for a in cls._query_availability(dept_code, dates):
+            if a['start_time'] and a['end_time']:
+                start_opening = local_tz.localize(datetime.combine(a['date_'], a['start_time'])).astimezone(pytz.utc)
+                end_availability = local_tz.localize(datetime.combine(a['date_'], a['end_time'])).astimezone(pytz.utc)
+                while end_availability - start_opening >= appointment_length:
+                    end_opening = start_opening + appointment_length
+                    if (a['uid'], start_opening) not in booked:
+                        openings.append({
+                            'uid': a['uid'],
+                            'startTime': _isoformat(start_opening),
+                            'endTime': str(end_opening),
+                        })
+                    start_opening = end_opening
         return sorted(openings, key=lambda i: (i['startTime'], i['uid']))
 
     @classmethod
-    def _query_availability(cls, dept_code, date_):
-        # Per distinct UID, select availability slots for the provided date if present as date_override; otherwise
+    def _query_availability(cls, dept_code, dates):
+        # Per date and distinct UID, select availability slots for the date if present as date_override; otherwise
         # fall back to slots with null date_override, indicating recurring per-weekday values.
-        sql = """SELECT u.uid, a.id, a.start_time, a.end_time FROM appointment_availability a
-                 JOIN (
-                    SELECT authorized_user_id, weekday, dept_code, MAX(date_override) AS date_override
-                    FROM appointment_availability
-                    WHERE weekday = :weekday
-                        AND dept_code = :dept_code
-                        AND (date_override = :date_ OR date_override IS NULL)
-                    GROUP BY authorized_user_id, weekday, dept_code
-                ) t
-                ON a.authorized_user_id = t.authorized_user_id
-                AND a.weekday = t.weekday
-                AND a.dept_code = t.dept_code
-                AND (a.date_override = t.date_override OR (a.date_override IS NULL AND t.date_override IS NULL))
-                JOIN authorized_users u on a.authorized_user_id = u.id
-                ORDER BY uid, start_time"""
-        return db.session.execute(text(sql), {'date_': str(date_), 'weekday': date_.strftime('%a'), 'dept_code': dept_code})
+        sql = """WITH dates AS (
+                    SELECT d::date AS date_, to_char(d, 'Dy') AS weekday
+                    FROM unnest(CAST(:dates AS date[])) AS d
+                 )
+                 SELECT dates.date_, u.uid, a.id, a.start_time, a.end_time
+                 FROM dates
+                 JOIN appointment_availability a
+                    ON a.weekday::text = dates.weekday
+                    AND a.dept_code = :dept_code
+                    AND (a.date_override = dates.date_ OR a.date_override IS NULL)
+                 JOIN authorized_users u on a.authorized_user_id = u.id
+                 WHERE a.date_override IS NOT NULL OR NOT EXISTS (
+                    SELECT 1 FROM appointment_availability o
+                    WHERE o.authorized_user_id = a.authorized_user_id
+                        AND o.weekday = a.weekday
+                        AND o.dept_code = a.dept_code
+                        AND o.date_override = dates.date_
+                 )
+                 ORDER BY dates.date_, uid, start_time"""
+        dates = sorted(set(date_.strftime('%Y-%m-%d') for date_ in dates))
+        return db.session.execute(text(sql), {'dates': dates, 'dept_code': dept_code})
 
     @classmethod
     def to_api_json(cls, id_, start_time, end_time):
@@ -98,6 +98,16 @@ class AppointmentEvent(db.Model):
             cls.event_type == event_type,
         ).order_by(desc(cls.created_at)).limit(1).first()
 
+    @classmethod
+    def get_most_recent_per_appointment_and_type(cls, appointment_ids):
+        if not appointment_ids:
+            return {}
+        events = cls.query.filter(cls.appointment_id.in_(appointment_ids)).distinct(
+            cls.appointment_id,
+            cls.event_type,
+        ).order_by(cls.appointment_id, cls.event_type, desc(cls.created_at)).all()
+        return {(e.appointment_id, e.event_type): e for e in events}
+
     def to_api_json(self):
         return {
             'advisorId': self.advisor_id,
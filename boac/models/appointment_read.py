@@ -28,6 +28,7 @@ from datetime import datetime
 from boac import db, std_commit
 from dateutil.tz import tzutc
 from sqlalchemy import and_
+from sqlalchemy.sql import text
 
 
 class AppointmentRead(db.Model):
@@ -56,6 +57,16 @@ class AppointmentRead(db.Model):
             std_commit()
         return appointment_read
 
+    @classmethod
+    def mark_read(cls, viewer_id, appointment_ids):
+        if appointment_ids:
+            sql = text("""
+                INSERT INTO appointments_read (viewer_id, appointment_id, created_at)
+                SELECT :viewer_id, appointment_id, now() FROM unnest(CAST(:appointment_ids AS VARCHAR[])) AS appointment_id
+                ON CONFLICT DO NOTHING""")
+            db.session.execute(sql, {'viewer_id': viewer_id, 'appointment_ids': [str(_id) for _id in appointment_ids]})
+            std_commit()
+
     @classmethod
     def was_read_by(cls, viewer_id, appointment_id):
         appointment_read = cls.query.filter(
@@ -65,8 +76,14 @@ class AppointmentRead(db.Model):
         return appointment_read is not None
 
     @classmethod
-    def get_appointments_read_by_user(cls, viewer_id, appointment_ids):
-        return cls.query.filter(AppointmentRead.viewer_id == viewer_id, AppointmentRead.appointment_id.in_(appointment_ids)).all()
+    def get_appointment_ids_read_by_user(cls, viewer_id, appointment_ids):
+        if not appointment_ids:
+            return set()
+        sql = text("""
+            SELECT appointment_id FROM appointments_read
+            WHERE viewer_id = :viewer_id AND appointment_id = ANY(:appointment_ids)""")
+        results = db.session.execute(sql, {'viewer_id': viewer_id, 'appointment_ids': [str(_id) for _id in appointment_ids]})
+        return set(row['appointment_id'] for row in results)
 
     @classmethod
     def when_user_read_appointment(cls, viewer_id, appointment_id):
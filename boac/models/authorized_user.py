@@ -209,6 +209,24 @@ class AuthorizedUser(Base):
         result = db.session.execute(query, {'user_id': user_id}).first()
         return result and result['uid']
 
+    @classmethod
+    def get_id_per_uids(cls, uids, include_deleted=False):
+        if not uids:
+            return {}
+        sql = 'SELECT id, uid FROM authorized_users WHERE uid = ANY(:uids)'
+        if not include_deleted:
+            sql += ' AND deleted_at IS NULL'
+        results = db.session.execute(text(sql), {'uids': list(uids)})
+        return {row['uid']: row['id'] for row in results}
+
+    @classmethod
+    def get_uid_per_ids(cls, user_ids):
+        if not user_ids:
+            return {}
+        query = text('SELECT id, uid FROM authorized_users WHERE id = ANY(:user_ids) AND deleted_at IS NULL')
+        results = db.session.execute(query, {'user_ids': list(user_ids)})
+        return {row['id']: row['uid'] for row in results}
+
     @classmethod
     def find_by_id(cls, user_id, include_deleted=False):
         query = cls.query.filter_by(id=user_id) if include_deleted else cls.query.filter_by(id=user_id, deleted_at=None)
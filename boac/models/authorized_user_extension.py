@@ -24,6 +24,7 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 
 from boac import db, std_commit
+from boac.lib.change_feed import appointment_changes
 from boac.models.base import Base
 from sqlalchemy.ext.declarative import declared_attr
 
@@ -49,6 +50,16 @@ class AuthorizedUserExtension(Base):
     def get_all(cls, authorized_user_id):
         return cls.query.filter_by(authorized_user_id=authorized_user_id).all()
 
+    @classmethod
+    def get_all_per_user_id(cls, authorized_user_ids):
+        extensions_per_user_id = {}
+        if not authorized_user_ids:
+            return extensions_per_user_id
+        query = cls.query.filter(cls.authorized_user_id.in_(authorized_user_ids)).order_by(cls.authorized_user_id, cls.dept_code)
+        for extension in query.all():
+            extensions_per_user_id.setdefault(extension.authorized_user_id, []).append(extension)
+        return extensions_per_user_id
+
     @classmethod
     def delete(cls, authorized_user_id, dept_code):
         row = cls.query.filter_by(authorized_user_id=authorized_user_id, dept_code=dept_code).first()
@@ -114,8 +125,13 @@ class DropInAdvisor(Advisor):
 
     status = db.Column(db.String(255))
 
+    def update_availability(self, available):
+        appointment_changes.publish(self.dept_code)
+        super().update_availability(available)
+
     def update_status(self, status):
         self.status = status
+        appointment_changes.publish(self.dept_code)
         std_commit()
 
     def to_api_json(self):
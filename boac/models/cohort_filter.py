@@ -28,9 +28,11 @@ import json
 from boac import db, std_commit
 from boac.api.errors import InternalServerError
 from boac.lib import util
+from boac.lib.change_feed import alert_badge_changes
 from boac.lib.util import get_benchmarker
 from boac.merged import athletics
 from boac.merged.admitted_student import query_admitted_students
+from boac.merged.alert_badges import evict_alert_badges
 from boac.merged.calnet import get_csid_for_uid
 from boac.merged.cohort_filter_options import CohortFilterOptions
 from boac.merged.sis_terms import current_term_id
@@ -42,8 +44,7 @@ from boac.models.cohort_filter_event import CohortFilterEvent
 from flask import current_app as app
 from flask_login import current_user
 from sqlalchemy import text
-from sqlalchemy.dialects.postgresql import ARRAY, ENUM, JSONB
-from sqlalchemy.orm import deferred, undefer
+from sqlalchemy.dialects.postgresql import ENUM, JSONB
 
 
 cohort_domain_type = ENUM(
@@ -57,17 +58,13 @@ cohort_domain_type = ENUM(
 class CohortFilter(Base):
 
     __tablename__ = 'cohort_filters'
-    __transient_sids = []
 
     id = db.Column(db.Integer, nullable=False, primary_key=True)  # noqa: A003
     domain = db.Column(cohort_domain_type, nullable=False)
     owner_id = db.Column(db.Integer, db.ForeignKey('authorized_users.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
     filter_criteria = db.Column(JSONB, nullable=False)
-    # Fetching a large array literal from Postgres can be expensive. We defer until invoking code demands it.
-    sids = deferred(db.Column(ARRAY(db.String(80))))
     student_count = db.Column(db.Integer)
-    alert_count = db.Column(db.Integer)
 
     owner = db.relationship('AuthorizedUser', back_populates='cohort_filters')
 
@@ -82,9 +79,7 @@ class CohortFilter(Base):
             name={self.name},
             owner_id={self.owner_id},
             filter_criteria={self.filter_criteria},
-            sids={self.sids},
             student_count={self.student_count},
-            alert_count={self.alert_count},
             updated_at={self.updated_at},
             created_at={self.created_at}>"""
 
@@ -100,26 +95,20 @@ class CohortFilter(Base):
         return cohort.to_api_json(**kwargs)
 
     @classmethod
-    def update(cls, cohort_id, name=None, filter_criteria=None, alert_count=None, **kwargs):
+    def update(cls, cohort_id, name=None, filter_criteria=None, **kwargs):
         cohort = cls.query.filter_by(id=cohort_id).first()
         if name:
             cohort.name = name
         if filter_criteria:
             cohort.filter_criteria = filter_criteria
         cohort.clear_sids_and_student_count()
-        if alert_count is not None:
-            cohort.alert_count = alert_count
-        else:
-            # Alert count will be refreshed
-            cohort.update_alert_count(None)
         std_commit()
         return cohort.to_api_json(**kwargs)
 
     @classmethod
     def get_sids(cls, cohort_id):
-        query = db.session.query(cls).options(undefer('sids'))
-        cohort = query.filter_by(id=cohort_id).first()
-        return cohort and cohort.sids
+        query = text('SELECT sid FROM cohort_filter_members WHERE cohort_filter_id = :cohort_id')
+        return [row['sid'] for row in db.session.execute(query, {'cohort_id': cohort_id})]
 
     @classmethod
     def get_domain_of_cohort(cls, cohort_id):
@@ -128,34 +117,59 @@ class CohortFilter(Base):
         return result and result['domain']
 
     def clear_sids_and_student_count(self):
-        self.__transient_sids = self.sids
-        self.update_sids_and_student_count(None, None)
+        # Members are kept until the next refresh, which is diffed against them.
+        self.student_count = None
+        std_commit()
 
     def update_sids_and_student_count(self, sids, student_count):
-        self.sids = sids
+        members_changed = False
+        # Track membership only if the cohort has been saved and has an id.
+        if self.id:
+            added_sids, removed_sids = self._update_members(sids)
+            if self.domain == 'default':
+                CohortFilterEvent.create_bulk(self.id, added_sids, removed_sids)
+                members_changed = bool(added_sids or removed_sids)
+                if members_changed:
+                    alert_badge_changes.publish(str(self.owner_id))
         self.student_count = student_count
         std_commit()
+        if members_changed:
+            evict_alert_badges(self.owner_id)
         return self
 
-    def update_alert_count(self, count):
-        self.alert_count = count
-        std_commit()
-        return self
-
-    def track_membership_changes(self):
-        # Track membership changes only if the cohort has been saved and has an id.
-        if self.id:
-            old_sids = set(self.__transient_sids)
-            new_sids = set(self.sids)
-            removed_sids = old_sids - new_sids
-            added_sids = new_sids - old_sids
-            CohortFilterEvent.create_bulk(self.id, added_sids, removed_sids)
-        self.__transient_sids = []
+    def _update_members(self, sids):
+        # Only added and removed members are written, and only they are returned.
+        query = text("""
+            WITH new_members AS (
+                SELECT DISTINCT sid FROM unnest(CAST(:sids AS VARCHAR[])) AS sid
+            ),
+            removed AS (
+                DELETE FROM cohort_filter_members m
+                WHERE m.cohort_filter_id = :cohort_filter_id
+                AND NOT EXISTS (SELECT 1 FROM new_members n WHERE n.sid = m.sid)
+                RETURNING m.sid
+            ),
+            added AS (
+                INSERT INTO cohort_filter_members (cohort_filter_id, sid)
+                SELECT :cohort_filter_id, sid FROM new_members
+                ON CONFLICT DO NOTHING
+                RETURNING sid
+            )
+            SELECT sid, 'added' AS event_type FROM added
+            UNION ALL
+            SELECT sid, 'removed' AS event_type FROM removed
+        """)
+        results = db.session.execute(query, {'cohort_filter_id': self.id, 'sids': list(sids or [])})
+        added_sids = []
+        removed_sids = []
+        for row in results:
+            (added_sids if row['event_type'] == 'added' else removed_sids).append(row['sid'])
+        return added_sids, removed_sids
 
     @classmethod
     def get_cohorts_of_user_id(cls, user_id, domain='default'):
         query = text("""
-            SELECT id, domain, name, filter_criteria, alert_count, student_count
+            SELECT id, domain, name, filter_criteria, student_count
             FROM cohort_filters c
             WHERE c.owner_id = :user_id AND c.domain = :domain
             ORDER BY c.name
@@ -168,7 +182,6 @@ class CohortFilter(Base):
                 'domain': row['domain'],
                 'name': row['name'],
                 'criteria': row['filter_criteria'],
-                'alertCount': row['alert_count'],
                 'totalStudentCount': row['student_count'],
             }
         return [transform(row) for row in results]
@@ -177,11 +190,11 @@ class CohortFilter(Base):
     def get_cohorts_owned_by_uids(cls, uids, domain='default'):
         query = text("""
             SELECT
-            c.id, c.domain, c.name, c.filter_criteria, c.alert_count, c.student_count, u.uid
+            c.id, c.domain, c.name, c.filter_criteria, c.student_count, u.uid
             FROM cohort_filters c
             INNER JOIN authorized_users u ON c.owner_id = u.id
             WHERE u.uid = ANY(:uids) AND c.domain = :domain
-            GROUP BY c.id, c.name, c.filter_criteria, c.alert_count, c.student_count, u.uid
+            GROUP BY c.id, c.name, c.filter_criteria, c.student_count, u.uid
         """)
         results = db.session.execute(query, {'domain': domain, 'uids': uids})
 
@@ -192,7 +205,6 @@ class CohortFilter(Base):
                 'name': row['name'],
                 'criteria': row['filter_criteria'],
                 'ownerUid': row['uid'],
-                'alertCount': row['alert_count'],
                 'totalStudentCount': row['student_count'],
             }
         return [transform(row) for row in results]
@@ -212,30 +224,23 @@ class CohortFilter(Base):
         return results.first()['count']
 
     @classmethod
-    def refresh_alert_counts_for_owner(cls, owner_id):
-        query = text("""
-            UPDATE cohort_filters
-            SET alert_count = updated_cohort_counts.alert_count
-            FROM
-            (
-                SELECT cohort_filters.id AS cohort_filter_id, count(*) AS alert_count
-                FROM alerts
-                JOIN cohort_filters
-                    ON alerts.sid = ANY(cohort_filters.sids)
-                    AND alerts.key LIKE :key
-                    AND alerts.deleted_at IS NULL
-                    AND cohort_filters.owner_id = :owner_id
-                LEFT JOIN alert_views
-                    ON alert_views.alert_id = alerts.id
-                    AND alert_views.viewer_id = :owner_id
-                WHERE alert_views.dismissed_at IS NULL
-                GROUP BY cohort_filters.id
-            ) updated_cohort_counts
-            WHERE cohort_filters.id = updated_cohort_counts.cohort_filter_id
+    def get_alert_counts_per_cohort(cls, owner_id, cohort_id=None):
+        cohort_filter = 'AND c.id = :cohort_id' if cohort_id else ''
+        query = text(f"""
+            SELECT c.id, sum(a.alert_count - COALESCE(v.dismissed_count, 0)) AS alert_count
+            FROM cohort_filters c
+            JOIN cohort_filter_members m ON m.cohort_filter_id = c.id
+            JOIN student_alert_counts a ON a.sid = m.sid AND a.term_id = :term_id
+            LEFT JOIN alert_view_counts v
+                ON v.viewer_id = :owner_id
+                AND v.sid = a.sid
+                AND v.term_id = a.term_id
+            WHERE c.owner_id = :owner_id AND c.domain = 'default' {cohort_filter}
+                AND a.alert_count > COALESCE(v.dismissed_count, 0)
+            GROUP BY c.id
         """)
-        result = db.session.execute(query, {'owner_id': owner_id, 'key': current_term_id() + '_%'})
-        std_commit()
-        return result
+        results = db.session.execute(query, {'cohort_id': cohort_id, 'owner_id': owner_id, 'term_id': current_term_id()})
+        return {row['id']: row['alert_count'] for row in results}
 
     @classmethod
     def find_by_id(cls, cohort_id, **kwargs):
@@ -278,7 +283,6 @@ class CohortFilter(Base):
             'criteria': c,
             'owner': _owner_to_json(self.owner),
             'teamGroups': athletics.get_team_groups(c.get('groupCodes')) if c.get('groupCodes') else [],
-            'alertCount': self.alert_count,
         }
 
     def to_api_json(
@@ -340,8 +344,6 @@ class CohortFilter(Base):
             # If the cohort is new or cache refresh is underway then store student_count and sids in the db.
             if self.student_count is None:
                 self.update_sids_and_student_count(results['sids'], results['totalStudentCount'])
-                if self.domain == 'default':
-                    self.track_membership_changes()
             if include_students:
                 cohort_json.update({
                     'students': results['students'],
@@ -353,17 +355,20 @@ class CohortFilter(Base):
                     group=results,
                     offset=alert_offset,
                     limit=alert_limit,
+                    cohort_filter_id=self.id,
                 )
                 benchmark('end alerts query')
                 cohort_json.update({
                     'alerts': alert_count_per_sid,
                 })
-                if self.alert_count is None:
+                if self.id:
+                    # Saved cohorts are counted as in the owner's alert badges.
+                    alert_count = self.get_alert_counts_per_cohort(self.owner_id, cohort_id=self.id).get(self.id, 0)
+                else:
                     alert_count = sum(student['alertCount'] for student in alert_count_per_sid)
-                    self.update_alert_count(alert_count)
-                    cohort_json.update({
-                        'alertCount': alert_count,
-                    })
+                cohort_json.update({
+                    'alertCount': alert_count,
+                })
         benchmark('end')
         return cohort_json
 
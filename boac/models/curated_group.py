@@ -24,11 +24,15 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 
 from boac import db, std_commit
-from boac.externals.data_loch import query_historical_sids
-from boac.merged.student import query_students
+from boac.externals.data_loch import get_student_sort_keys
+from boac.lib.change_feed import alert_badge_changes
+from boac.merged.alert_badges import evict_alert_badges
+from boac.merged.sis_terms import current_term_id
+from boac.merged.student import get_distilled_student_profiles, query_students
 from boac.models.base import Base
 from boac.models.cohort_filter import CohortFilter
 from boac.models.manually_added_advisee import ManuallyAddedAdvisee
+from flask import current_app as app
 from sqlalchemy import text
 
 
@@ -38,6 +42,7 @@ class CuratedGroup(Base):
     id = db.Column(db.Integer, nullable=False, primary_key=True)  # noqa: A003
     owner_id = db.Column(db.Integer, db.ForeignKey('authorized_users.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
+    student_count = db.Column(db.Integer, nullable=False, default=0)
 
     __table_args__ = (db.UniqueConstraint(
         'owner_id',
@@ -48,6 +53,7 @@ class CuratedGroup(Base):
     def __init__(self, name, owner_id):
         self.name = name
         self.owner_id = owner_id
+        self.student_count = 0
 
     @classmethod
     def find_by_id(cls, curated_group_id):
@@ -60,12 +66,10 @@ class CuratedGroup(Base):
     @classmethod
     def get_groups_owned_by_uids(cls, uids):
         query = text("""
-            SELECT sg.id, sg.name, count(sgm.sid) AS student_count, au.uid AS owner_uid
+            SELECT sg.id, sg.name, sg.student_count, au.uid AS owner_uid
             FROM student_groups sg
-            LEFT JOIN student_group_members sgm ON sg.id = sgm.student_group_id
             JOIN authorized_users au ON sg.owner_id = au.id
             WHERE au.uid = ANY(:uids)
-            GROUP BY sg.id, sg.name, au.id, au.uid
         """)
         results = db.session.execute(query, {'uids': uids})
 
@@ -78,6 +82,24 @@ class CuratedGroup(Base):
             }
         return [transform(row) for row in results]
 
+    @classmethod
+    def get_alert_counts_per_group(cls, owner_id):
+        query = text("""
+            SELECT g.id, sum(a.alert_count - COALESCE(v.dismissed_count, 0)) AS alert_count
+            FROM student_groups g
+            JOIN student_group_members m ON m.student_group_id = g.id
+            JOIN student_alert_counts a ON a.sid = m.sid AND a.term_id = :term_id
+            LEFT JOIN alert_view_counts v
+                ON v.viewer_id = :owner_id
+                AND v.sid = a.sid
+                AND v.term_id = a.term_id
+            WHERE g.owner_id = :owner_id
+                AND a.alert_count > COALESCE(v.dismissed_count, 0)
+            GROUP BY g.id
+        """)
+        results = db.session.execute(query, {'owner_id': owner_id, 'term_id': current_term_id()})
+        return {row['id']: row['alert_count'] for row in results}
+
     @classmethod
     def curated_group_ids_per_sid(cls, user_id, sid):
         query = text("""SELECT
@@ -104,6 +126,10 @@ class CuratedGroup(Base):
         curated_group = cls.query.filter_by(id=curated_group_id).first()
         if curated_group:
             CuratedGroupStudent.add_student(curated_group_id=curated_group_id, sid=sid)
+            alert_badge_changes.publish(str(curated_group.owner_id))
+            _add_manually_added_advisees(curated_group.index_students([sid]))
+            std_commit()
+            evict_alert_badges(curated_group.owner_id)
             _refresh_related_cohorts(curated_group)
 
     @classmethod
@@ -111,7 +137,10 @@ class CuratedGroup(Base):
         curated_group = cls.query.filter_by(id=curated_group_id).first()
         if curated_group:
             CuratedGroupStudent.add_students(curated_group_id=curated_group_id, sids=sids)
+            alert_badge_changes.publish(str(curated_group.owner_id))
+            _add_manually_added_advisees(curated_group.index_students(sids))
             std_commit()
+            evict_alert_badges(curated_group.owner_id)
             _refresh_related_cohorts(curated_group)
 
     @classmethod
@@ -119,6 +148,9 @@ class CuratedGroup(Base):
         curated_group = cls.find_by_id(curated_group_id)
         if curated_group:
             CuratedGroupStudent.remove_student(curated_group_id, sid)
+            alert_badge_changes.publish(str(curated_group.owner_id))
+            curated_group.refresh_student_count()
+            evict_alert_badges(curated_group.owner_id)
             _refresh_related_cohorts(curated_group)
 
     @classmethod
@@ -150,6 +182,26 @@ class CuratedGroup(Base):
                 cohort_filter_ids.append(row['id'])
         return cohort_filter_ids
 
+    def index_students(self, sids):
+        # Name sort keys are copied from the loch so that group pages can be ordered and sliced without a loch query.
+        # Returns sort keys of the SIDs found in the loch, or None if the loch query failed.
+        sids = list(sids)
+        sort_keys = get_student_sort_keys(sids) if sids else []
+        if sort_keys is None:
+            app.logger.error(f'Failed to get sort keys from the loch; curated group {self.id} not indexed')
+            return None
+        CuratedGroupStudent.update_sort_keys(self.id, sort_keys)
+        # SIDs missing from the loch are flagged, rather than looked up again on every view, and are neither counted nor
+        # listed. The nightly refresh removes them from the group.
+        found_sids = set(row['sid'] for row in sort_keys)
+        CuratedGroupStudent.mark_unknown(self.id, [sid for sid in sids if sid not in found_sids])
+        self.refresh_student_count()
+        return sort_keys
+
+    def refresh_student_count(self):
+        self.student_count = CuratedGroupStudent.get_student_count(self.id)
+        std_commit()
+
     def to_api_json(self, order_by='last_name', offset=0, limit=50, include_students=True):
         feed = {
             'id': self.id,
@@ -157,24 +209,31 @@ class CuratedGroup(Base):
             'name': self.name,
         }
         if include_students:
-            sids = CuratedGroupStudent.get_sids(curated_group_id=self.id)
-            if sids:
-                result = query_students(sids=sids, order_by=order_by, offset=offset, limit=limit, include_profiles=False)
-                feed['students'] = result['students']
-                feed['totalStudentCount'] = result['totalStudentCount']
-                # Attempt to supplement with historical student rows if we seem to be missing something.
-                if result['totalStudentCount'] < len(sids):
-                    remaining_sids = list(set(sids) - set(result['sids']))
-                    historical_sid_rows = query_historical_sids(remaining_sids)
-                    if len(historical_sid_rows):
-                        for row in historical_sid_rows:
-                            ManuallyAddedAdvisee.find_or_create(row['sid'])
-                        feed['totalStudentCount'] += len(historical_sid_rows)
-                        page_shortfall = max(0, limit - len(result['students']))
-                        feed['students'] += historical_sid_rows[:page_shortfall]
+            unindexed_sids = CuratedGroupStudent.get_unindexed_sids(self.id)
+            if unindexed_sids:
+                self.index_students(unindexed_sids)
+            if order_by.split(' ')[0] in ['first_name', 'last_name']:
+                members = CuratedGroupStudent.get_members_ordered(self.id, order_by=order_by, offset=offset, limit=limit)
+                feed['students'] = _distilled_students(members)
+                feed['totalStudentCount'] = self.student_count
             else:
-                feed['students'] = []
-                feed['totalStudentCount'] = 0
+                sids = CuratedGroupStudent.get_sids(curated_group_id=self.id, historical=False)
+                result = query_students(sids=sids, order_by=order_by, offset=offset, limit=limit, include_profiles=False) if sids else None
+                feed['students'] = result['students'] if result else []
+                feed['totalStudentCount'] = result['totalStudentCount'] if result else 0
+                # Historical students follow current students, in name order.
+                historical_count = self.student_count - len(sids)
+                if historical_count > 0:
+                    feed['totalStudentCount'] += historical_count
+                    page_shortfall = max(0, limit - len(feed['students']))
+                    if page_shortfall:
+                        historical_members = CuratedGroupStudent.get_members_ordered(
+                            self.id,
+                            offset=max(0, offset - len(result['sids'] if result else [])),
+                            limit=page_shortfall,
+                            historical=True,
+                        )
+                        feed['students'] += _distilled_students(historical_members)
         return feed
 
 
@@ -183,14 +242,84 @@ class CuratedGroupStudent(db.Model):
 
     curated_group_id = db.Column('student_group_id', db.Integer, db.ForeignKey('student_groups.id'), primary_key=True)
     sid = db.Column('sid', db.String(80), primary_key=True)
+    first_name_key = db.Column(db.String)
+    last_name_key = db.Column(db.String)
+    historical = db.Column(db.Boolean)
+    unknown = db.Column(db.Boolean, nullable=False, default=False)
 
     def __init__(self, curated_group_id, sid):
         self.curated_group_id = curated_group_id
         self.sid = sid
 
     @classmethod
-    def get_sids(cls, curated_group_id):
-        return [row.sid for row in cls.query.filter_by(curated_group_id=curated_group_id).all()]
+    def get_sids(cls, curated_group_id, historical=None):
+        query = cls.query.filter_by(curated_group_id=curated_group_id)
+        if historical is not None:
+            query = query.filter_by(historical=historical)
+        return [row.sid for row in query.all()]
+
+    @classmethod
+    def get_unindexed_sids(cls, curated_group_id):
+        return [row.sid for row in cls.query.filter_by(curated_group_id=curated_group_id, historical=None, unknown=False).all()]
+
+    @classmethod
+    def get_student_count(cls, curated_group_id):
+        query = text("""SELECT count(*) AS student_count
+            FROM student_group_members
+            WHERE student_group_id = :curated_group_id AND NOT unknown""")
+        return db.session.execute(query, {'curated_group_id': curated_group_id}).scalar()
+
+    @classmethod
+    def get_members_ordered(cls, curated_group_id, order_by='last_name', offset=0, limit=50, historical=None):
+        o_direction = 'ASC'
+        if order_by.endswith(' desc'):
+            order_by, o_direction = order_by.rsplit(' ', 1)
+        o, o_secondary = ('first_name_key', 'last_name_key') if order_by == 'first_name' else ('last_name_key', 'first_name_key')
+        historical_filter = 'historical IS NOT NULL' if historical is None else 'historical = :historical'
+        query = text(f"""SELECT sid, historical
+            FROM student_group_members
+            WHERE student_group_id = :curated_group_id AND {historical_filter}
+            ORDER BY historical, {o} {o_direction} NULLS FIRST, {o_secondary} NULLS FIRST, sid
+            OFFSET :offset LIMIT :limit""")
+        results = db.session.execute(query, {
+            'curated_group_id': curated_group_id,
+            'historical': historical,
+            'limit': limit,
+            'offset': offset,
+        })
+        return [{'sid': row['sid'], 'historical': row['historical']} for row in results]
+
+    @classmethod
+    def update_sort_keys(cls, curated_group_id, sort_keys):
+        if not sort_keys:
+            return
+        query = text("""UPDATE student_group_members m
+            SET first_name_key = k.first_name_key, last_name_key = k.last_name_key, historical = k.historical, unknown = FALSE
+            FROM unnest(
+                CAST(:sids AS VARCHAR[]),
+                CAST(:first_name_keys AS VARCHAR[]),
+                CAST(:last_name_keys AS VARCHAR[]),
+                CAST(:historical AS BOOLEAN[])
+            ) AS k(sid, first_name_key, last_name_key, historical)
+            WHERE m.student_group_id = :curated_group_id AND m.sid = k.sid""")
+        db.session.execute(query, {
+            'curated_group_id': curated_group_id,
+            'first_name_keys': [row['first_name_key'] for row in sort_keys],
+            'historical': [bool(row['historical']) for row in sort_keys],
+            'last_name_keys': [row['last_name_key'] for row in sort_keys],
+            'sids': [row['sid'] for row in sort_keys],
+        })
+        std_commit()
+
+    @classmethod
+    def mark_unknown(cls, curated_group_id, sids):
+        if not sids:
+            return
+        query = text("""UPDATE student_group_members
+            SET first_name_key = NULL, last_name_key = NULL, historical = NULL, unknown = TRUE
+            WHERE student_group_id = :curated_group_id AND sid = ANY(:sids)""")
+        db.session.execute(query, {'curated_group_id': curated_group_id, 'sids': sids})
+        std_commit()
 
     @classmethod
     def add_student(cls, curated_group_id, sid):
@@ -212,9 +341,19 @@ class CuratedGroupStudent(db.Model):
             std_commit()
 
 
+def _add_manually_added_advisees(sort_keys):
+    # Non-current students are registered once, when added to a group, rather than on each view of the group.
+    ManuallyAddedAdvisee.add_all([row['sid'] for row in sort_keys or [] if row['historical']])
+
+
+def _distilled_students(members):
+    current_sids = [m['sid'] for m in members if not m['historical']]
+    profiles_by_sid = {p['sid']: p for p in get_distilled_student_profiles(current_sids)}
+    return [profiles_by_sid.get(m['sid']) or {'sid': m['sid']} for m in members]
+
+
 def _refresh_related_cohorts(curated_group):
     for cohort_id in curated_group.get_referencing_cohort_ids():
         cohort = CohortFilter.query.filter_by(id=cohort_id).first()
         cohort.clear_sids_and_student_count()
-        cohort.update_alert_count(None)
-        cohort.to_api_json(include_students=False, include_alerts_for_user_id=cohort.owner_id)
+        cohort.to_api_json(include_students=False)
@@ -0,0 +1,263 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+import json
+
+from boac import db, std_commit
+from boac.models.base import Base
+from boac.models.degree_progress_template import DegreeProgressTemplate
+from dateutil.tz import tzutc
+from flask import current_app as app
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import ARRAY, ENUM
+
+degree_check_batch_job_status_type = ENUM(
+    'running',
+    'finished',
+    name='degree_check_batch_job_status_types',
+    create_type=False,
+)
+
+
+class DegreeCheckBatchJob(Base):
+    __tablename__ = 'degree_check_batch_jobs'
+
+    id = db.Column(db.Integer, nullable=False, primary_key=True)  # noqa: A003
+    advisor_dept_codes = db.Column(ARRAY(db.String), nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('authorized_users.id'), nullable=False)
+    finished_at = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    status = db.Column(degree_check_batch_job_status_type, nullable=False)
+    template_id = db.Column(db.Integer, db.ForeignKey('degree_progress_templates.id'), nullable=False)
+
+    def __init__(self, advisor_dept_codes, created_by, status, template_id):
+        self.advisor_dept_codes = advisor_dept_codes
+        self.created_by = created_by
+        self.status = status
+        self.template_id = template_id
+
+    def __repr__(self):
+        return f"""<DegreeCheckBatchJob id={self.id},
+                    template_id={self.template_id},
+                    status={self.status},
+                    started_at={self.started_at},
+                    finished_at={self.finished_at},
+                    created_at={self.created_at},
+                    created_by={self.created_by},
+                    updated_at={self.updated_at}>"""
+
+    @classmethod
+    def create(cls, advisor_dept_codes, created_by, sids, template_id):
+        job_id = db.session.execute(
+            text("""
+                INSERT INTO degree_check_batch_jobs
+                    (advisor_dept_codes, created_at, created_by, started_at, status, template_id, updated_at)
+                VALUES (CAST(:advisor_dept_codes AS VARCHAR[]), now(), :created_by, now(), 'running', :template_id, now())
+                RETURNING id
+            """),
+            {'advisor_dept_codes': advisor_dept_codes, 'created_by': created_by, 'template_id': template_id},
+        ).scalar()
+        db.session.execute(
+            text("""
+                INSERT INTO degree_check_batch_students (job_id, sid, position, status, updated_at)
+                SELECT :job_id, s.sid, s.position, 'pending', now()
+                FROM unnest(CAST(:sids AS VARCHAR[])) WITH ORDINALITY AS s(sid, position)
+            """),
+            {'job_id': job_id, 'sids': list(dict.fromkeys(sids))},
+        )
+        std_commit()
+        return cls.find_by_id(job_id)
+
+    @classmethod
+    def find_by_id(cls, job_id):
+        return cls.query.filter_by(id=job_id).first()
+
+    @classmethod
+    def claim(cls, job_id, retry_failed=False):
+        # A job is claimed by at most one runner: either it is not running, or its runner has stopped checking in.
+        # Returns False if the job is not available to claim.
+        result = db.session.execute(
+            text("""
+                UPDATE degree_check_batch_jobs
+                SET status = 'running', started_at = now(), finished_at = NULL, updated_at = now()
+                WHERE id = :job_id
+                  AND (status = 'finished' OR updated_at < now() - :timeout * interval '1 second')
+                RETURNING id
+            """),
+            {'job_id': job_id, 'timeout': app.config['DEGREE_CHECK_BATCH_JOB_TIMEOUT']},
+        ).fetchone()
+        if result and retry_failed:
+            db.session.execute(
+                text("""
+                    UPDATE degree_check_batch_students SET status = 'pending', error = NULL, updated_at = now()
+                    WHERE job_id = :job_id AND status = 'failed'
+                """),
+                {'job_id': job_id},
+            )
+        std_commit()
+        return bool(result)
+
+    @classmethod
+    def run(cls, job_id, batch_size, db_session=None):
+        # Students are processed in order, one committed chunk at a time. A chunk that is interrupted leaves no trace,
+        # so its students are still pending when the job is resumed.
+        session = db_session or db.session
+        job = session.query(cls).filter_by(id=job_id).first()
+        template_id = job.template_id
+        created_by = job.created_by
+        advisor_dept_codes = job.advisor_dept_codes
+        while True:
+            sids = [
+                row['sid'] for row in session.execute(
+                    text("""
+                        SELECT sid FROM degree_check_batch_students
+                        WHERE job_id = :job_id AND status = 'pending'
+                        ORDER BY position
+                        LIMIT :batch_size
+                    """),
+                    {'batch_size': batch_size, 'job_id': job_id},
+                )
+            ]
+            if not sids:
+                break
+
+            def _record_chunk(clone_id_per_sid):
+                _update_students(session, job_id, clone_id_per_sid, sids)
+            try:
+                clone_id_per_sid = DegreeProgressTemplate.create_clones(
+                    template_id=template_id,
+                    created_by=created_by,
+                    advisor_dept_codes=advisor_dept_codes,
+                    sids=sids,
+                    db_session=session,
+                    before_commit=_record_chunk,
+                )
+                if not clone_id_per_sid:
+                    _update_students(session, job_id, {}, sids, error=f'No template found with id={template_id}.')
+                    std_commit(session=session)
+            except Exception as e:
+                app.logger.exception(e)
+                session.rollback()
+                _update_students(session, job_id, {}, sids, error=str(e))
+                std_commit(session=session)
+        session.execute(
+            text("UPDATE degree_check_batch_jobs SET status = 'finished', finished_at = now(), updated_at = now() WHERE id = :job_id"),
+            {'job_id': job_id},
+        )
+        std_commit(session=session)
+
+    @classmethod
+    def get_students(cls, job_id):
+        results = db.session.execute(
+            text("""
+                SELECT sid, status, degree_check_id, error, updated_at
+                FROM degree_check_batch_students
+                WHERE job_id = :job_id
+                ORDER BY position
+            """),
+            {'job_id': job_id},
+        )
+        return [
+            {
+                'degreeCheckId': row['degree_check_id'],
+                'error': row['error'],
+                'sid': row['sid'],
+                'status': row['status'],
+                'updatedAt': _isoformat(row['updated_at']),
+            } for row in results
+        ]
+
+    def to_api_json(self, include_students=False):
+        # Progress is written with SQL by the job runner, so read it fresh rather than from this instance.
+        row = db.session.execute(
+            text("""
+                SELECT
+                    j.status, j.started_at, j.finished_at, j.updated_at,
+                    j.status = 'running' AND j.updated_at < now() - :timeout * interval '1 second' AS is_interrupted,
+                    extract(epoch FROM COALESCE(j.finished_at, now()) - j.started_at) AS elapsed,
+                    count(s.sid) AS total,
+                    count(s.sid) FILTER (WHERE s.status = 'created') AS created,
+                    count(s.sid) FILTER (WHERE s.status = 'failed') AS failed,
+                    count(s.sid) FILTER (WHERE s.status = 'created' AND s.updated_at >= j.started_at) AS created_in_run
+                FROM degree_check_batch_jobs j
+                LEFT JOIN degree_check_batch_students s ON s.job_id = j.id
+                WHERE j.id = :job_id
+                GROUP BY j.id
+            """),
+            {'job_id': self.id, 'timeout': app.config['DEGREE_CHECK_BATCH_JOB_TIMEOUT']},
+        ).first()
+        total = row['total']
+        elapsed = row['elapsed'] and float(row['elapsed'])
+        api_json = {
+            'id': self.id,
+            'createdAt': _isoformat(self.created_at),
+            'createdBy': self.created_by,
+            'createdCount': row['created'],
+            'elapsedSeconds': elapsed,
+            'failedCount': row['failed'],
+            'finishedAt': _isoformat(row['finished_at']),
+            'isInterrupted': row['is_interrupted'],
+            'pendingCount': total - row['created'] - row['failed'],
+            'percentComplete': round(100 * (row['created'] + row['failed']) / total) if total else 100,
+            'startedAt': _isoformat(row['started_at']),
+            'status': row['status'],
+            'studentsPerSecond': round(row['created_in_run'] / elapsed, 2) if elapsed else None,
+            'templateId': self.template_id,
+            'totalCount': total,
+            'updatedAt': _isoformat(row['updated_at']),
+        }
+        if include_students:
+            api_json['students'] = self.get_students(self.id)
+        return api_json
+
+
+def _isoformat(value):
+    return value and value.astimezone(tzutc()).isoformat()
+
+
+def _update_students(session, job_id, clone_id_per_sid, sids, error=None):
+    session.execute(
+        text("""
+            UPDATE degree_check_batch_students s
+            SET status = CAST(CASE WHEN c.id IS NULL THEN 'failed' ELSE 'created' END AS degree_check_batch_student_status_types),
+                degree_check_id = CAST(c.id AS INTEGER),
+                error = CASE WHEN c.id IS NULL THEN :error END,
+                updated_at = now()
+            FROM unnest(CAST(:sids AS VARCHAR[])) AS u(sid)
+            LEFT JOIN json_each_text(CAST(:clone_ids AS JSON)) AS c(sid, id) ON c.sid = u.sid
+            WHERE s.job_id = :job_id AND s.sid = u.sid
+        """),
+        {
+            'clone_ids': json.dumps(clone_id_per_sid),
+            'error': error or 'Degree check was not created.',
+            'job_id': job_id,
+            'sids': sids,
+        },
+    )
+    # The job's updated_at is its runner's heartbeat.
+    session.execute(
+        text('UPDATE degree_check_batch_jobs SET updated_at = now() WHERE id = :job_id'),
+        {'job_id': job_id},
+    )
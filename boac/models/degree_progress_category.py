@@ -31,6 +31,7 @@ from boac.models.degree_progress_course import DegreeProgressCourse
 from dateutil.tz import tzutc
 from psycopg2.extras import NumericRange
 from sqlalchemy.dialects.postgresql import ENUM, NUMRANGE
+from sqlalchemy.orm import joinedload
 from sqlalchemy.sql import asc
 
 degree_progress_category_type = ENUM(
@@ -150,11 +151,21 @@ class DegreeProgressCategory(Base):
 
     @classmethod
     def get_categories(cls, template_id):
-        hierarchy = []
+        return cls.get_categories_per_template([template_id])[template_id]
+
+    @classmethod
+    def get_categories_per_template(cls, template_ids):
+        # Two queries, whatever the number of templates: categories with their unit requirements, then courses with theirs.
+        query = cls.query.filter(cls.template_id.in_(template_ids)).options(
+            joinedload(cls.unit_requirements).joinedload(DegreeProgressCategoryUnitRequirement.unit_requirement),
+        ).order_by(asc(cls.created_at), asc(cls.id))
+        rows = query.all()
+        courses_per_category_id = DegreeProgressCourse.get_courses_per_category_id([c.id for c in rows])
+        hierarchy_per_template_id = {template_id: [] for template_id in template_ids}
         categories = []
-        for category in cls.query.filter_by(template_id=template_id).order_by(asc(cls.created_at)).all():
+        for category in rows:
             category_type = category.category_type
-            api_json = category.to_api_json()
+            api_json = category.to_api_json(courses=courses_per_category_id[category.id])
             if category_type == 'Category':
                 # A 'Category' can have both courses and subcategories. A 'Subcategory' can have courses.
                 api_json['courseRequirements'] = []
@@ -171,9 +182,9 @@ class DegreeProgressCategory(Base):
                 key = 'subcategories' if category['categoryType'] == 'Subcategory' else 'courseRequirements'
                 parent[key].append(category)
             else:
-                hierarchy.append(category)
+                hierarchy_per_template_id[category['templateId']].append(category)
 
-        return hierarchy
+        return hierarchy_per_template_id
 
     @classmethod
     def update(
@@ -213,12 +224,14 @@ class DegreeProgressCategory(Base):
         std_commit()
         return cls.find_by_id(category_id=category_id)
 
-    def to_api_json(self):
+    def to_api_json(self, courses=None):
+        if courses is None:
+            courses = DegreeProgressCourse.find_by_category_id(category_id=self.id)
         unit_requirements = [m.unit_requirement.to_api_json() for m in (self.unit_requirements or [])]
         return {
             'id': self.id,
             'categoryType': self.category_type,
-            'courses': [c.to_api_json() for c in DegreeProgressCourse.find_by_category_id(category_id=self.id)],
+            'courses': [c.to_api_json() for c in courses],
             'createdAt': _isoformat(self.created_at),
             'description': self.description,
             'name': self.name,
@@ -30,6 +30,7 @@ from boac.models.base import Base
 from boac.models.degree_progress_category_unit_requirement import DegreeProgressCategoryUnitRequirement
 from boac.models.degree_progress_course_unit_requirement import DegreeProgressCourseUnitRequirement
 from dateutil.tz import tzutc
+from sqlalchemy.orm import joinedload
 
 
 class DegreeProgressCourse(Base):
@@ -157,6 +158,17 @@ class DegreeProgressCourse(Base):
     def find_by_category_id(cls, category_id):
         return cls.query.filter_by(category_id=category_id).all()
 
+    @classmethod
+    def get_courses_per_category_id(cls, category_ids):
+        courses_per_category_id = {category_id: [] for category_id in category_ids}
+        if category_ids:
+            query = cls.query.filter(cls.category_id.in_(category_ids)).options(
+                joinedload(cls.unit_requirements).joinedload(DegreeProgressCourseUnitRequirement.unit_requirement),
+            ).order_by(cls.created_at, cls.id)
+            for course in query.all():
+                courses_per_category_id[course.category_id].append(course)
+        return courses_per_category_id
+
     @classmethod
     def find_by_sid(cls, degree_check_id, sid):
         return cls.query.filter_by(degree_check_id=degree_check_id, sid=sid).all()
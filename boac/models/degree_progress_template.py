@@ -23,9 +23,11 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+import json
+
 from boac import db, std_commit
 from boac.externals import data_loch
-from boac.lib.util import utc_now
+from boac.lib.util import is_int, utc_now
 from boac.merged.sis_terms import current_term_id
 from boac.merged.student import merge_enrollment_terms
 from boac.models.base import Base
@@ -33,6 +35,7 @@ from boac.models.degree_progress_category import DegreeProgressCategory
 from boac.models.degree_progress_course import DegreeProgressCourse
 from boac.models.degree_progress_note import DegreeProgressNote
 from boac.models.degree_progress_unit_requirement import DegreeProgressUnitRequirement
+from boac.models.json_cache import fetch, upsert_rows
 from dateutil.tz import tzutc
 from sqlalchemy import and_, func, text
 from sqlalchemy.dialects.postgresql import ARRAY
@@ -104,6 +107,109 @@ class DegreeProgressTemplate(Base):
         std_commit(session=session)
         return degree
 
+    @classmethod
+    def create_clones(
+            cls,
+            template_id,
+            created_by,
+            advisor_dept_codes,
+            sids,
+            degree_name=None,
+            db_session=None,
+            before_commit=None,
+    ):
+        # Copy the template tree for all sids (None for a plain template copy) with a fixed number of set-based
+        # statements, however many students or categories are involved. Returns clone ids per sid. The optional
+        # before_commit callable receives those ids so that callers can record them in the same transaction.
+        session = db_session or db.session
+        results = session.execute(
+            text("""
+                INSERT INTO degree_progress_templates
+                    (advisor_dept_codes, created_at, created_by, degree_name, parent_template_id, student_sid, updated_at, updated_by)
+                SELECT
+                    CAST(:advisor_dept_codes AS VARCHAR[]), now(), :created_by, COALESCE(:degree_name, t.degree_name),
+                    CASE WHEN s.sid IS NULL THEN NULL ELSE t.id END, s.sid, now(), :created_by
+                FROM degree_progress_templates t
+                CROSS JOIN unnest(CAST(:sids AS VARCHAR[])) WITH ORDINALITY AS s(sid, ordinal)
+                WHERE t.id = :template_id
+                ORDER BY s.ordinal
+                RETURNING id, student_sid
+            """),
+            {
+                'advisor_dept_codes': advisor_dept_codes,
+                'created_by': created_by,
+                'degree_name': degree_name,
+                'sids': list(sids),
+                'template_id': template_id,
+            },
+        )
+        clone_id_per_sid = {row['student_sid']: row['id'] for row in results}
+        clone_ids = list(clone_id_per_sid.values())
+        if not clone_ids:
+            return clone_id_per_sid
+        session.execute(
+            text("""
+                INSERT INTO degree_progress_unit_requirements
+                    (template_id, name, min_units, created_at, created_by, updated_at, updated_by)
+                SELECT c.id, u.name, u.min_units, now(), :created_by, now(), :created_by
+                FROM degree_progress_unit_requirements u
+                CROSS JOIN unnest(CAST(:clone_ids AS INTEGER[])) AS c(id)
+                WHERE u.template_id = :template_id
+            """),
+            {'clone_ids': clone_ids, 'created_by': created_by, 'template_id': template_id},
+        )
+        source_categories = session.execute(
+            text('SELECT id, parent_category_id FROM degree_progress_categories WHERE template_id = :template_id ORDER BY created_at, id'),
+            {'template_id': template_id},
+        ).fetchall()
+        if source_categories:
+            # Allocate category ids up front so that parent references can be mapped before insert.
+            new_ids = iter([
+                row['id'] for row in session.execute(
+                    text("SELECT nextval('degree_progress_categories_id_seq') AS id FROM generate_series(1, :count)"),
+                    {'count': len(source_categories) * len(clone_ids)},
+                )
+            ])
+            category_mappings = []
+            for clone_id in clone_ids:
+                # A category may have been moved under one created after it, so map every id before resolving parents.
+                new_id_per_source_id = {category['id']: next(new_ids) for category in source_categories}
+                for category in source_categories:
+                    category_mappings.append({
+                        'id': new_id_per_source_id[category['id']],
+                        'parent_category_id': new_id_per_source_id.get(category['parent_category_id']),
+                        'source_id': category['id'],
+                        'template_id': clone_id,
+                    })
+            params = {'mappings': json.dumps(category_mappings)}
+            mappings_sql = """json_to_recordset(CAST(:mappings AS JSON))
+                AS m(id INTEGER, parent_category_id INTEGER, source_id INTEGER, template_id INTEGER)"""
+            session.execute(
+                text(f"""
+                    INSERT INTO degree_progress_categories
+                        (id, category_type, course_units, description, name, parent_category_id, position, template_id, created_at, updated_at)
+                    SELECT m.id, s.category_type, s.course_units, s.description, s.name, m.parent_category_id, s.position, m.template_id, now(), now()
+                    FROM {mappings_sql}
+                    JOIN degree_progress_categories s ON s.id = m.source_id
+                """),
+                params,
+            )
+            session.execute(
+                text(f"""
+                    INSERT INTO degree_progress_category_unit_requirements (category_id, unit_requirement_id)
+                    SELECT m.id, cu.id
+                    FROM {mappings_sql}
+                    JOIN degree_progress_category_unit_requirements scu ON scu.category_id = m.source_id
+                    JOIN degree_progress_unit_requirements su ON su.id = scu.unit_requirement_id
+                    JOIN degree_progress_unit_requirements cu ON cu.template_id = m.template_id AND cu.name = su.name
+                """),
+                params,
+            )
+        if before_commit:
+            before_commit(clone_id_per_sid)
+        std_commit(session=session)
+        return clone_id_per_sid
+
     @classmethod
     def delete(cls, template_id):
         template = cls.query.filter_by(id=template_id).first()
@@ -194,15 +300,71 @@ class DegreeProgressTemplate(Base):
             }
         return api_json
 
+    def sync_sis_courses(self):
+        # Import new SIS sections into degree_progress_courses only when the student's enrollment data has changed since
+        # the last sync. Returns SIS units of the student's sections, in enrollment order, as of that sync.
+        latest_term_id = current_term_id()
+        enrollments_version = data_loch.get_enrollments_version_for_sid(sid=self.student_sid, latest_term_id=latest_term_id)
+        version = enrollments_version and f'{latest_term_id}_{enrollments_version}'
+        cache_key = f'degree_check_{self.id}_sis_courses'
+        synced = fetch(cache_key)
+        if synced and (version is None or synced['version'] == version):
+            return synced['sections']
+
+        enrollments = data_loch.get_enrollments_for_sid(sid=self.student_sid, latest_term_id=latest_term_id)
+        sections = {}
+        new_courses = []
+        for term in merge_enrollment_terms(enrollments or []):
+            for enrollment in term.get('enrollments', []):
+                for section in enrollment['sections']:
+                    section_key = f"{section['ccn']}_{term['termId']}"
+                    if section_key in sections:
+                        continue
+                    units = section['units']
+                    sections[section_key] = {'sectionId': section['ccn'], 'termId': term['termId'], 'units': units}
+                    grade = section['grade']
+                    if section.get('primary') and grade and units:
+                        new_courses.append({
+                            'display_name': f"{enrollment['displayName']} {section['component']} {section['sectionNumber']}",
+                            'grade': grade,
+                            'section_id': section['ccn'],
+                            'term_id': term['termId'],
+                            'units': units if is_int(units) else 0,
+                        })
+        if new_courses:
+            # Sections already present in the degree check, assigned or otherwise, are left alone.
+            db.session.execute(
+                text("""
+                    INSERT INTO degree_progress_courses
+                        (degree_check_id, display_name, grade, ignore, section_id, sid, term_id, units, created_at, updated_at)
+                    SELECT :degree_check_id, r.display_name, r.grade, FALSE, r.section_id, :sid, r.term_id, r.units, now(), now()
+                    FROM json_to_recordset(CAST(:courses AS JSON))
+                        AS r(display_name VARCHAR, grade VARCHAR, section_id INTEGER, term_id INTEGER, units NUMERIC)
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM degree_progress_courses c
+                        WHERE c.degree_check_id = :degree_check_id AND c.sid = :sid
+                          AND c.section_id = r.section_id AND c.term_id = r.term_id
+                    )
+                """),
+                {'courses': json.dumps(new_courses), 'degree_check_id': self.id, 'sid': self.student_sid},
+            )
+        sections = list(sections.values())
+        if version:
+            upsert_rows({cache_key: {'sections': sections, 'version': version}})
+        else:
+            std_commit()
+        return sections
+
     def _get_partitioned_courses_json(self):
         assigned_courses = []
         ignored_courses = []
         unassigned_courses = []
         degree_progress_courses = {}
         sid = self.student_sid
+        sections = self.sync_sis_courses()
         # Sort courses by created_at (asc) so "copied" courses come after the primary assigned course.
         courses = DegreeProgressCourse.find_by_sid(degree_check_id=self.id, sid=sid)
-        courses = sorted(courses, key=lambda c: c.created_at)
+        courses = sorted(courses, key=lambda c: (c.created_at, c.id))
 
         def _key(section_id_, term_id_):
             return f'{section_id_}_{term_id_}'
@@ -212,49 +374,21 @@ class DegreeProgressTemplate(Base):
                 degree_progress_courses[key] = []
             degree_progress_courses[key].append(course)
 
-        enrollments = data_loch.get_enrollments_for_sid(
-            sid=sid,
-            latest_term_id=current_term_id(),
-        )
-        for index, term in enumerate(merge_enrollment_terms(enrollments)):
-            for enrollment in term.get('enrollments', []):
-                for section in enrollment['sections']:
-                    section_id = section['ccn']
-                    term_id = term['termId']
-                    units = section['units']
-                    # If user edits degreeCheck.units then we alert the user of diff with original sis.units.
-                    sis = {'units': units}
-                    key = _key(section_id, term_id)
-                    if key in degree_progress_courses:
-                        for idx, course in enumerate(degree_progress_courses[key]):
-                            course_json = {
-                                **course.to_api_json(),
-                                **{'sis': sis},
-                                'isCopy': idx > 0,
-                            }
-                            if course_json['categoryId']:
-                                assigned_courses.append(course_json)
-                            elif course_json['ignore']:
-                                ignored_courses.append(course_json)
-                            else:
-                                unassigned_courses.append(course_json)
-                    else:
-                        grade = section['grade']
-                        if section.get('primary') and grade and units:
-                            course = DegreeProgressCourse.create(
-                                degree_check_id=self.id,
-                                display_name=f"{enrollment['displayName']} {section['component']} {section['sectionNumber']}",
-                                grade=grade,
-                                section_id=section_id,
-                                sid=sid,
-                                term_id=term_id,
-                                units=units,
-                            )
-                            unassigned_courses.append({
-                                **course.to_api_json(),
-                                **{'sis': sis},
-                                'isCopy': False,
-                            })
+        for section in sections:
+            # If user edits degreeCheck.units then we alert the user of diff with original sis.units.
+            sis = {'units': section['units']}
+            for idx, course in enumerate(degree_progress_courses.get(_key(section['sectionId'], section['termId']), [])):
+                course_json = {
+                    **course.to_api_json(),
+                    **{'sis': sis},
+                    'isCopy': idx > 0,
+                }
+                if course_json['categoryId']:
+                    assigned_courses.append(course_json)
+                elif course_json['ignore']:
+                    ignored_courses.append(course_json)
+                else:
+                    unassigned_courses.append(course_json)
         return assigned_courses, ignored_courses, unassigned_courses
 
 
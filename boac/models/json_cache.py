@@ -24,11 +24,12 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 
 
+import json
 import threading
 
 from boac import db, std_commit
 from boac.lib.berkeley import term_name_for_sis_id
-from boac.lib.util import get_args_dict
+from boac.lib.util import get_args_dict, utc_now
 from boac.models.base import Base
 from decorator import decorator
 from flask import current_app as app
@@ -118,6 +119,29 @@ def insert_row(key, json):
             return stowed.json
 
 
+def upsert_rows(json_by_key):
+    """Insert or update many cache rows in a single statement."""
+    if not json_by_key:
+        return
+    now = utc_now().strftime('%Y-%m-%dT%H:%M:%S+00')
+    query = """
+        INSERT INTO json_cache (key, json, created_at, updated_at)
+        SELECT key, json, created_at, updated_at
+        FROM json_populate_recordset(null::json_cache, :json_dumps)
+        ON CONFLICT (key) DO UPDATE SET json = EXCLUDED.json, updated_at = EXCLUDED.updated_at
+    """
+    data = [
+        {
+            'key': key,
+            'json': value,
+            'created_at': now,
+            'updated_at': now,
+        } for key, value in json_by_key.items()
+    ]
+    db.session.execute(text(query), {'json_dumps': json.dumps(data)})
+    std_commit()
+
+
 def update_jsonb_row(stowed):
     """Jump through some hoops to commit changes to a JSONB column."""
     flag_modified(stowed, 'json')
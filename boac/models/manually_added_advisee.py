@@ -26,6 +26,7 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from datetime import datetime
 
 from boac import db, std_commit
+from sqlalchemy import text
 
 
 class ManuallyAddedAdvisee(db.Model):
@@ -46,6 +47,16 @@ class ManuallyAddedAdvisee(db.Model):
             std_commit()
         return manually_added_advisee
 
+    @classmethod
+    def add_all(cls, sids):
+        if sids:
+            sql = text("""
+                INSERT INTO manually_added_advisees (sid, created_at)
+                SELECT unnest(CAST(:sids AS VARCHAR[])), now()
+                ON CONFLICT DO NOTHING""")
+            db.session.execute(sql, {'sids': list(sids)})
+            std_commit()
+
     @classmethod
     def get_all(cls):
         return cls.query.all()
@@ -35,6 +35,7 @@ from boac.models.note_template_attachment import NoteTemplateAttachment
 from boac.models.note_topic import NoteTopic
 from sqlalchemy import and_
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import defer, selectinload
 from sqlalchemy.sql import text
 
 
@@ -290,9 +291,13 @@ class Note(Base):
             note.updated_at = now
 
     @classmethod
-    def get_notes_by_sid(cls, sid):
+    def get_notes_by_sid(cls, sid, include_body=True):
         # SQLAlchemy uses "magic methods" to create SQL; it requires '==' instead of 'is'.
-        return cls.query.filter(and_(cls.sid == sid, cls.deleted_at == None)).order_by(cls.updated_at, cls.id).all()  # noqa: E711
+        query = cls.query.filter(and_(cls.sid == sid, cls.deleted_at == None))  # noqa: E711
+        if not include_body:
+            query = query.options(defer(cls.body))
+        # Attachments and topics are loaded in one further query each, rather than one per note.
+        return query.options(selectinload(cls.attachments), selectinload(cls.topics)).order_by(cls.updated_at, cls.id).all()
 
     @classmethod
     def delete(cls, note_id):
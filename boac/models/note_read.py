@@ -27,6 +27,7 @@ from datetime import datetime
 
 from boac import db, std_commit
 from sqlalchemy import and_
+from sqlalchemy.sql import text
 
 
 class NoteRead(db.Model):
@@ -56,8 +57,22 @@ class NoteRead(db.Model):
         return note_read
 
     @classmethod
-    def get_notes_read_by_user(cls, viewer_id, note_ids):
-        return cls.query.filter(NoteRead.viewer_id == viewer_id, NoteRead.note_id.in_(note_ids)).all()
+    def mark_read(cls, viewer_id, note_ids):
+        if note_ids:
+            sql = text("""
+                INSERT INTO notes_read (viewer_id, note_id, created_at)
+                SELECT :viewer_id, note_id, now() FROM unnest(CAST(:note_ids AS VARCHAR[])) AS note_id
+                ON CONFLICT DO NOTHING""")
+            db.session.execute(sql, {'viewer_id': viewer_id, 'note_ids': [str(_id) for _id in note_ids]})
+            std_commit()
+
+    @classmethod
+    def get_note_ids_read_by_user(cls, viewer_id, note_ids):
+        if not note_ids:
+            return set()
+        sql = text('SELECT note_id FROM notes_read WHERE viewer_id = :viewer_id AND note_id = ANY(:note_ids)')
+        results = db.session.execute(sql, {'viewer_id': viewer_id, 'note_ids': [str(_id) for _id in note_ids]})
+        return set(row['note_id'] for row in results)
 
     @classmethod
     def when_user_read_note(cls, viewer_id, note_id):
@@ -92,6 +92,27 @@ class UniversityDeptMember(Base):
     def get_existing_memberships(cls, authorized_user_id):
         return cls.query.filter_by(authorized_user_id=authorized_user_id).all()
 
+    @classmethod
+    def get_memberships_per_user_id(cls, authorized_user_ids):
+        memberships_per_user_id = {}
+        if not authorized_user_ids:
+            return memberships_per_user_id
+        sql = """
+            SELECT m.authorized_user_id, m.role, m.automate_membership, d.dept_code, d.dept_name
+            FROM university_dept_members m
+            JOIN university_depts d ON d.id = m.university_dept_id
+            WHERE m.authorized_user_id = ANY(:authorized_user_ids)
+            ORDER BY m.authorized_user_id, d.dept_code
+        """
+        for row in db.session.execute(sql, {'authorized_user_ids': list(authorized_user_ids)}):
+            memberships_per_user_id.setdefault(row['authorized_user_id'], []).append({
+                'code': row['dept_code'],
+                'name': row['dept_name'],
+                'role': row['role'],
+                'automateMembership': row['automate_membership'],
+            })
+        return memberships_per_user_id
+
     @classmethod
     def update_membership(
             cls,
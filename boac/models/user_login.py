@@ -27,6 +27,7 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from datetime import datetime
 
 from boac import db, std_commit
+from sqlalchemy import text
 from sqlalchemy.sql import desc
 
 
@@ -50,3 +51,15 @@ class UserLogin(db.Model):
     @classmethod
     def last_login(cls, uid):
         return cls.query.filter(cls.uid == uid).order_by(desc(cls.created_at)).limit(1).first()
+
+    @classmethod
+    def last_login_per_uid(cls, uids):
+        if not uids:
+            return {}
+        sql = text("""
+            SELECT DISTINCT ON (uid) uid, created_at
+            FROM user_logins
+            WHERE uid = ANY(:uids)
+            ORDER BY uid, created_at DESC
+        """)
+        return {row['uid']: row['created_at'] for row in db.session.execute(sql, {'uids': list(uids)})}
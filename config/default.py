@@ -28,6 +28,10 @@ import os
 
 ABBREVIATED_WORDS = ['APR', 'EAP', 'PNP', 'SAP']
 
+# Seconds that each worker may serve a user's sidebar alert counts from memory. Alert refreshes, dismissals and
+# membership changes invalidate cached counts in every worker; this interval bounds staleness should a change go unseen.
+ALERT_BADGE_CACHE_TTL = 300
+
 # Alerts
 ALERT_INFREQUENT_ACTIVITY_DAYS = 14
 ALERT_INFREQUENT_ACTIVITY_ENABLED = True
@@ -48,6 +52,15 @@ API_KEY = None
 # For /appt/desk. 60000 ms = 1 minute.
 APPT_DESK_REFRESH_INTERVAL = 60000
 
+# Longest wait, in seconds, for a drop-in waitlist or same-day schedule request that asks to be held open until it changes.
+# Each waiting request occupies a WSGI thread; set to zero to disable long polling and fall back to the interval above.
+APPT_DESK_LONG_POLL_TIMEOUT = 25
+
+# Most requests, per WSGI process, held open at once by long polling. Keep this well below the threads per process
+# (100, per .ebextensions) so that open desk tabs cannot starve other requests. Beyond the limit, requests are answered
+# at once and the client asks again a second later.
+APPT_DESK_LONG_POLL_MAX_WAITERS = 20
+
 # BOAC-specific AWS credentials.
 AWS_APP_ROLE_ARN = 'aws:arn::<account>:role/<app_boa_role>'
 
@@ -99,6 +112,13 @@ DATA_LOCH_SIS_SCHEMA = 'sis_data'
 DATA_LOCH_SIS_TERMS_SCHEMA = 'sis_terms'
 DATA_LOCH_STUDENT_SCHEMA = 'student'
 
+# A running batch degree-check job that has not checked in for this many seconds is considered interrupted and
+# may be resumed.
+DEGREE_CHECK_BATCH_JOB_TIMEOUT = 300
+
+# Batch degree checks are created, and committed, this many students at a time.
+DEGREE_CHECK_BATCH_SIZE = 200
+
 DISABLE_MATRIX_VIEW_THRESHOLD = 800
 
 # In demo mode, student profile pictures and sensitive data will be blurred.
@@ -147,6 +167,8 @@ MEANINGFUL_STATS_MINIMUM = 4
 
 NOTES_SEARCH_RESULT_SNIPPET_PADDING = 29
 NOTES_ATTACHMENTS_MAX_PER_NOTE = 10
+# Number of attachment streams opened concurrently, ahead of the zip writer, when downloading a student's notes.
+NOTES_DOWNLOAD_ATTACHMENT_CONCURRENCY = 4
 
 # Default is 15 minutes
 PHOTO_SIGNED_URL_EXPIRES_IN_SECONDS = 15 * 60
@@ -157,6 +179,21 @@ PING_FREQUENCY = 900000
 # In minutes.
 SCHEDULED_APPOINTMENT_LENGTH = 30
 
+# Longest date range, in days, of scheduled appointment openings returned by a single request.
+SCHEDULED_APPOINTMENT_OPENINGS_MAX_DAYS = 14
+
+# Per-domain deadlines, in seconds, for the combined search of students, courses, notes and appointments. Domains
+# not finished by their deadline are omitted from search results.
+SEARCH_DOMAIN_TIMEOUTS = {
+    'appointments': 15,
+    'courses': 10,
+    'notes': 15,
+    'students': 10,
+}
+
+# In seconds. Each worker rebuilds its in-memory search indexes when they get this old.
+SEARCH_INDEX_MAX_AGE = 24 * 60 * 60
+
 # Used to encrypt session cookie.
 SECRET_KEY = 'secret'
 
@@ -172,10 +209,22 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 # A common configuration; one request thread, one background worker thread.
 THREADS_PER_PAGE = 2
 
+# In seconds. Each worker keeps a snapshot of a student's academic timeline, taken with its first page, for paging.
+TIMELINE_CACHE_TTL = 300
+# Most timeline snapshots held per worker, one per viewer, student and filter.
+TIMELINE_CACHE_MAX_SIZE = 100
+
+# Number of items per page of a student's academic timeline.
+TIMELINE_PAGE_SIZE = 50
+
 TIMEZONE = 'America/Los_Angeles'
 
 USER_SEARCH_HISTORY_MAX_SIZE = 5
 
+# Seconds that each worker may serve a user's session profile from memory, without a database lookup. Changes to a
+# user's permissions made in another worker take effect within this interval. Set to zero to disable.
+USER_SESSION_CACHE_TTL = 60
+
 # This base-URL config should only be non-None in the "local" env where the Vue front-end runs on port 8080.
 VUE_LOCALHOST_BASE_URL = None
 
@@ -34,6 +34,7 @@ SET row_security = off;
 
 --
 
+ALTER TABLE IF EXISTS ONLY public.alert_view_counts DROP CONSTRAINT IF EXISTS alert_view_counts_viewer_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.alert_views DROP CONSTRAINT IF EXISTS alert_views_alert_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.alert_views DROP CONSTRAINT IF EXISTS alert_views_viewer_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.alerts DROP CONSTRAINT IF EXISTS alerts_sid_fkey;
@@ -49,8 +50,13 @@ ALTER TABLE IF EXISTS ONLY public.appointment_topics DROP CONSTRAINT IF EXISTS a
 ALTER TABLE IF EXISTS ONLY public.appointments_read DROP CONSTRAINT IF EXISTS appointments_read_viewer_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.cohort_filters DROP CONSTRAINT IF EXISTS cohort_filters_owner_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.cohort_filter_events DROP CONSTRAINT IF EXISTS cohort_filter_events_cohort_filter_id_fkey;
+ALTER TABLE IF EXISTS ONLY public.cohort_filter_members DROP CONSTRAINT IF EXISTS cohort_filter_members_cohort_filter_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.cohort_filter_owners DROP CONSTRAINT IF EXISTS cohort_filter_owners_cohort_filter_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.cohort_filter_owners DROP CONSTRAINT IF EXISTS cohort_filter_owners_user_id_fkey;
+ALTER TABLE IF EXISTS ONLY public.degree_check_batch_jobs DROP CONSTRAINT IF EXISTS degree_check_batch_jobs_template_id_fkey;
+ALTER TABLE IF EXISTS ONLY public.degree_check_batch_jobs DROP CONSTRAINT IF EXISTS degree_check_batch_jobs_created_by_fkey;
+ALTER TABLE IF EXISTS ONLY public.degree_check_batch_students DROP CONSTRAINT IF EXISTS degree_check_batch_students_job_id_fkey;
+ALTER TABLE IF EXISTS ONLY public.degree_check_batch_students DROP CONSTRAINT IF EXISTS degree_check_batch_students_degree_check_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.degree_progress_categories DROP CONSTRAINT IF EXISTS degree_progress_categories_template_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.degree_progress_categories DROP CONSTRAINT IF EXISTS degree_progress_categories_parent_category_id_fkey;
 ALTER TABLE IF EXISTS ONLY public.degree_progress_category_unit_requirements DROP CONSTRAINT IF EXISTS degree_progress_category_unit_reqts_unit_requirement_id_fkey;
@@ -105,6 +111,7 @@ DROP INDEX IF EXISTS public.appointments_advisor_uid_idx;
 DROP INDEX IF EXISTS public.appointments_student_sid_idx;
 DROP INDEX IF EXISTS public.appointments_read_appointment_id_idx;
 DROP INDEX IF EXISTS public.appointments_read_viewer_id_idx;
+DROP INDEX IF EXISTS public.alert_view_counts_sid_idx;
 DROP INDEX IF EXISTS public.alert_views_alert_id_idx;
 DROP INDEX IF EXISTS public.alert_views_viewer_id_idx;
 DROP INDEX IF EXISTS public.alerts_sid_idx;
@@ -113,6 +120,8 @@ DROP INDEX IF EXISTS public.cohort_filter_events_cohort_filter_id_idx;
 DROP INDEX IF EXISTS public.cohort_filter_events_sid_idx;
 DROP INDEX IF EXISTS public.cohort_filter_events_event_type_idx;
 DROP INDEX IF EXISTS public.cohort_filter_events_created_at_idx;
+DROP INDEX IF EXISTS public.cohort_filter_members_sid_idx;
+DROP INDEX IF EXISTS public.degree_check_batch_students_job_id_status_idx;
 DROP INDEX IF EXISTS public.degree_progress_categories_id_idx;
 DROP INDEX IF EXISTS public.degree_progress_unit_requirements_template_id_idx;
 DROP INDEX IF EXISTS public.idx_advisor_author_index;
@@ -134,10 +143,12 @@ DROP INDEX IF EXISTS public.user_logins_uid_idx;
 --
 
 ALTER TABLE IF EXISTS ONLY public.alembic_version DROP CONSTRAINT IF EXISTS alembic_version_pkc;
+ALTER TABLE IF EXISTS ONLY public.alert_view_counts DROP CONSTRAINT IF EXISTS alert_view_counts_pkey;
 ALTER TABLE IF EXISTS ONLY public.alert_views DROP CONSTRAINT IF EXISTS alert_views_pkey;
 ALTER TABLE IF EXISTS ONLY public.alerts DROP CONSTRAINT IF EXISTS alerts_pkey;
 ALTER TABLE IF EXISTS ONLY public.alerts DROP CONSTRAINT IF EXISTS alerts_sid_alert_type_key_unique_constraint;
 ALTER TABLE IF EXISTS ONLY public.alerts DROP CONSTRAINT IF EXISTS alerts_sid_alert_type_key_created_at_unique_constraint;
+ALTER TABLE IF EXISTS ONLY public.student_alert_counts DROP CONSTRAINT IF EXISTS student_alert_counts_pkey;
 ALTER TABLE IF EXISTS ONLY public.appointment_availability DROP CONSTRAINT IF EXISTS appointment_availability_pkey;
 ALTER TABLE IF EXISTS ONLY public.appointment_topics DROP CONSTRAINT IF EXISTS appointment_topics_pkey;
 ALTER TABLE IF EXISTS ONLY public.appointments_read DROP CONSTRAINT IF EXISTS appointments_read_pkey;
@@ -145,8 +156,11 @@ ALTER TABLE IF EXISTS ONLY public.appointments DROP CONSTRAINT IF EXISTS appoint
 ALTER TABLE IF EXISTS ONLY public.authorized_users DROP CONSTRAINT IF EXISTS authorized_users_pkey;
 ALTER TABLE IF EXISTS ONLY public.authorized_users DROP CONSTRAINT IF EXISTS authorized_users_uid_key;
 ALTER TABLE IF EXISTS ONLY public.cohort_filter_events DROP CONSTRAINT IF EXISTS cohort_filter_events_pkey;
+ALTER TABLE IF EXISTS ONLY public.cohort_filter_members DROP CONSTRAINT IF EXISTS cohort_filter_members_pkey;
 ALTER TABLE IF EXISTS ONLY public.cohort_filter_owners DROP CONSTRAINT IF EXISTS cohort_filter_owners_pkey;
 ALTER TABLE IF EXISTS ONLY public.cohort_filters DROP CONSTRAINT IF EXISTS cohort_filters_pkey;
+ALTER TABLE IF EXISTS ONLY public.degree_check_batch_jobs DROP CONSTRAINT IF EXISTS degree_check_batch_jobs_pkey;
+ALTER TABLE IF EXISTS ONLY public.degree_check_batch_students DROP CONSTRAINT IF EXISTS degree_check_batch_students_pkey;
 ALTER TABLE IF EXISTS ONLY public.degree_progress_categories DROP CONSTRAINT IF EXISTS degree_progress_categories_pkey;
 ALTER TABLE IF EXISTS ONLY public.degree_progress_category_unit_requirements DROP CONSTRAINT IF EXISTS degree_progress_category_unit_requirements_pkey;
 ALTER TABLE IF EXISTS ONLY public.degree_progress_course_unit_requirements DROP CONSTRAINT IF EXISTS degree_progress_course_unit_requirements_pkey;
@@ -200,6 +214,9 @@ DROP TABLE IF EXISTS public.manually_added_advisees;
 DROP SEQUENCE IF EXISTS public.json_cache_id_seq;
 DROP TABLE IF EXISTS public.json_cache;
 DROP TABLE IF EXISTS public.drop_in_advisors;
+DROP TABLE IF EXISTS public.degree_check_batch_students;
+DROP TABLE IF EXISTS public.degree_check_batch_jobs;
+DROP SEQUENCE IF EXISTS public.degree_check_batch_jobs_id_seq;
 DROP TABLE IF EXISTS public.degree_progress_templates;
 DROP SEQUENCE IF EXISTS public.degree_progress_templates_id_seq;
 DROP TABLE IF EXISTS public.degree_progress_unit_requirements;
@@ -209,6 +226,7 @@ DROP TABLE IF EXISTS public.cohort_filters;
 DROP SEQUENCE IF EXISTS public.cohort_filters_id_seq;
 DROP TABLE IF EXISTS public.cohort_filter_events;
 DROP SEQUENCE IF EXISTS public.cohort_filter_events_id_seq;
+DROP TABLE IF EXISTS public.cohort_filter_members;
 DROP TABLE IF EXISTS public.cohort_filter_owners;
 DROP SEQUENCE IF EXISTS public.authorized_users_id_seq;
 DROP TABLE IF EXISTS public.authorized_users;
@@ -225,6 +243,8 @@ DROP TABLE IF EXISTS public.appointments_read;
 DROP SEQUENCE IF EXISTS public.alerts_id_seq;
 DROP TABLE IF EXISTS public.alerts;
 DROP TABLE IF EXISTS public.alert_views;
+DROP TABLE IF EXISTS public.alert_view_counts;
+DROP TABLE IF EXISTS public.student_alert_counts;
 DROP TABLE IF EXISTS public.alembic_version;
 DROP TABLE IF EXISTS public.degree_progress_courses;
 DROP SEQUENCE IF EXISTS public.degree_progress_courses_id_seq;
@@ -252,6 +272,8 @@ DROP TYPE IF EXISTS public.appointment_student_contact_types;
 DROP TYPE IF EXISTS public.appointment_types;
 DROP TYPE IF EXISTS public.cohort_filter_event_types;
 DROP TYPE IF EXISTS public.cohort_domain_types;
+DROP TYPE IF EXISTS public.degree_check_batch_job_status_types;
+DROP TYPE IF EXISTS public.degree_check_batch_student_status_types;
 DROP TYPE IF EXISTS public.degree_progress_category_types;
 DROP TYPE IF EXISTS public.drop_in_advisor_status_types;
 DROP TYPE IF EXISTS public.generic_permission_types;
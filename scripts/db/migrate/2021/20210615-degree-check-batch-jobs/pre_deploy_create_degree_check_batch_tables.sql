@@ -0,0 +1,55 @@
+BEGIN;
+
+CREATE TYPE degree_check_batch_job_status_types AS ENUM ('running', 'finished');
+
+CREATE TABLE degree_check_batch_jobs (
+  id integer NOT NULL,
+  template_id integer NOT NULL,
+  advisor_dept_codes character varying[] NOT NULL,
+  status degree_check_batch_job_status_types NOT NULL,
+  started_at timestamp with time zone,
+  finished_at timestamp with time zone,
+  created_at timestamp with time zone NOT NULL,
+  created_by integer NOT NULL,
+  updated_at timestamp with time zone NOT NULL
+);
+ALTER TABLE degree_check_batch_jobs OWNER TO boac;
+CREATE SEQUENCE degree_check_batch_jobs_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+ALTER TABLE degree_check_batch_jobs_id_seq OWNER TO boac;
+ALTER SEQUENCE degree_check_batch_jobs_id_seq OWNED BY degree_check_batch_jobs.id;
+ALTER TABLE ONLY degree_check_batch_jobs ALTER COLUMN id SET DEFAULT nextval('degree_check_batch_jobs_id_seq'::regclass);
+ALTER TABLE ONLY degree_check_batch_jobs
+    ADD CONSTRAINT degree_check_batch_jobs_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY degree_check_batch_jobs
+    ADD CONSTRAINT degree_check_batch_jobs_template_id_fkey FOREIGN KEY (template_id) REFERENCES degree_progress_templates(id) ON DELETE CASCADE;
+ALTER TABLE ONLY degree_check_batch_jobs
+    ADD CONSTRAINT degree_check_batch_jobs_created_by_fkey FOREIGN KEY (created_by) REFERENCES authorized_users(id) ON DELETE CASCADE;
+
+--
+
+CREATE TYPE degree_check_batch_student_status_types AS ENUM ('pending', 'created', 'failed');
+
+CREATE TABLE degree_check_batch_students (
+  job_id integer NOT NULL,
+  sid character varying(80) NOT NULL,
+  position integer NOT NULL,
+  status degree_check_batch_student_status_types NOT NULL,
+  degree_check_id integer,
+  error text,
+  updated_at timestamp with time zone NOT NULL
+);
+ALTER TABLE degree_check_batch_students OWNER TO boac;
+ALTER TABLE ONLY degree_check_batch_students
+    ADD CONSTRAINT degree_check_batch_students_pkey PRIMARY KEY (job_id, sid);
+ALTER TABLE ONLY degree_check_batch_students
+    ADD CONSTRAINT degree_check_batch_students_job_id_fkey FOREIGN KEY (job_id) REFERENCES degree_check_batch_jobs(id) ON DELETE CASCADE;
+ALTER TABLE ONLY degree_check_batch_students
+    ADD CONSTRAINT degree_check_batch_students_degree_check_id_fkey FOREIGN KEY (degree_check_id) REFERENCES degree_progress_templates(id) ON DELETE SET NULL;
+CREATE INDEX degree_check_batch_students_job_id_status_idx ON degree_check_batch_students USING btree (job_id, status);
+
+COMMIT;
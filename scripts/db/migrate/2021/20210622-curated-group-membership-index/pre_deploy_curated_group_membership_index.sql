@@ -0,0 +1,25 @@
+BEGIN;
+
+ALTER TABLE student_groups ADD COLUMN IF NOT EXISTS student_count INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE student_group_members ADD COLUMN IF NOT EXISTS first_name_key VARCHAR;
+ALTER TABLE student_group_members ADD COLUMN IF NOT EXISTS last_name_key VARCHAR;
+ALTER TABLE student_group_members ADD COLUMN IF NOT EXISTS historical BOOLEAN;
+ALTER TABLE student_group_members ADD COLUMN IF NOT EXISTS unknown BOOLEAN NOT NULL DEFAULT FALSE;
+
+CREATE INDEX IF NOT EXISTS student_group_members_first_name_key_idx ON student_group_members USING btree (student_group_id, historical, first_name_key, last_name_key, sid);
+CREATE INDEX IF NOT EXISTS student_group_members_last_name_key_idx ON student_group_members USING btree (student_group_id, historical, last_name_key, first_name_key, sid);
+
+-- Sort keys are filled in from the loch the first time a group is viewed, or by the nightly refresh. Members unknown to
+-- the loch are flagged then. The student count leaves out unknown members, as does CuratedGroup.refresh_student_count.
+UPDATE student_groups sg
+  SET student_count = m.student_count
+  FROM (
+    SELECT student_group_id, count(*) AS student_count
+    FROM student_group_members
+    WHERE NOT unknown
+    GROUP BY student_group_id
+  ) m
+  WHERE sg.id = m.student_group_id;
+
+COMMIT;
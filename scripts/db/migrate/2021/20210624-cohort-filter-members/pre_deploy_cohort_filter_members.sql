@@ -0,0 +1,23 @@
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS cohort_filter_members (
+    cohort_filter_id integer NOT NULL,
+    sid character varying(80) NOT NULL
+);
+ALTER TABLE cohort_filter_members OWNER TO boac;
+ALTER TABLE ONLY cohort_filter_members
+    ADD CONSTRAINT cohort_filter_members_pkey PRIMARY KEY (cohort_filter_id, sid);
+ALTER TABLE ONLY cohort_filter_members
+    ADD CONSTRAINT cohort_filter_members_cohort_filter_id_fkey FOREIGN KEY (cohort_filter_id) REFERENCES cohort_filters(id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS cohort_filter_members_sid_idx ON cohort_filter_members USING btree (sid);
+
+INSERT INTO cohort_filter_members (cohort_filter_id, sid)
+  SELECT DISTINCT id, unnest(sids)
+  FROM cohort_filters
+  WHERE sids IS NOT NULL
+  ON CONFLICT DO NOTHING;
+
+ALTER TABLE cohort_filters DROP COLUMN IF EXISTS sids;
+
+COMMIT;
@@ -0,0 +1,2 @@
+ALTER TABLE ONLY cohort_filters
+DROP COLUMN IF EXISTS alert_count;
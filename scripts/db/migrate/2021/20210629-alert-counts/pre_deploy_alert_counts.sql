@@ -0,0 +1,38 @@
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS student_alert_counts (
+    sid character varying(80) NOT NULL,
+    term_id character varying(4) NOT NULL,
+    alert_count integer NOT NULL
+);
+ALTER TABLE student_alert_counts OWNER TO boac;
+ALTER TABLE ONLY student_alert_counts
+    ADD CONSTRAINT student_alert_counts_pkey PRIMARY KEY (sid, term_id);
+
+CREATE TABLE IF NOT EXISTS alert_view_counts (
+    viewer_id integer NOT NULL,
+    sid character varying(80) NOT NULL,
+    term_id character varying(4) NOT NULL,
+    dismissed_count integer NOT NULL
+);
+ALTER TABLE alert_view_counts OWNER TO boac;
+ALTER TABLE ONLY alert_view_counts
+    ADD CONSTRAINT alert_view_counts_pkey PRIMARY KEY (viewer_id, sid, term_id);
+ALTER TABLE ONLY alert_view_counts
+    ADD CONSTRAINT alert_view_counts_viewer_id_fkey FOREIGN KEY (viewer_id) REFERENCES authorized_users(id) ON DELETE CASCADE;
+CREATE INDEX IF NOT EXISTS alert_view_counts_sid_idx ON alert_view_counts USING btree (sid);
+
+INSERT INTO student_alert_counts (sid, term_id, alert_count)
+  SELECT sid, substr(key, 1, 4), count(*)
+  FROM alerts
+  WHERE deleted_at IS NULL AND substr(key, 5, 1) = '_'
+  GROUP BY sid, substr(key, 1, 4);
+
+INSERT INTO alert_view_counts (viewer_id, sid, term_id, dismissed_count)
+  SELECT v.viewer_id, a.sid, substr(a.key, 1, 4), count(*)
+  FROM alerts a
+  JOIN alert_views v ON v.alert_id = a.id
+  WHERE a.deleted_at IS NULL AND v.dismissed_at IS NOT NULL AND substr(a.key, 5, 1) = '_'
+  GROUP BY v.viewer_id, a.sid, substr(a.key, 1, 4);
+
+COMMIT;
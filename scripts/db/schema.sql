@@ -40,6 +40,19 @@ SET default_with_oids = false;
 
 --
 
+CREATE TABLE alert_view_counts (
+    viewer_id integer NOT NULL,
+    sid character varying(80) NOT NULL,
+    term_id character varying(4) NOT NULL,
+    dismissed_count integer NOT NULL
+);
+ALTER TABLE alert_view_counts OWNER TO boac;
+ALTER TABLE ONLY alert_view_counts
+    ADD CONSTRAINT alert_view_counts_pkey PRIMARY KEY (viewer_id, sid, term_id);
+CREATE INDEX alert_view_counts_sid_idx ON alert_view_counts USING btree (sid);
+
+--
+
 CREATE TABLE alert_views (
     alert_id integer NOT NULL,
     viewer_id integer NOT NULL,
@@ -82,6 +95,17 @@ CREATE INDEX alerts_sid_idx ON alerts USING btree (sid);
 
 --
 
+CREATE TABLE student_alert_counts (
+    sid character varying(80) NOT NULL,
+    term_id character varying(4) NOT NULL,
+    alert_count integer NOT NULL
+);
+ALTER TABLE student_alert_counts OWNER TO boac;
+ALTER TABLE ONLY student_alert_counts
+    ADD CONSTRAINT student_alert_counts_pkey PRIMARY KEY (sid, term_id);
+
+--
+
 CREATE TYPE weekday_types AS ENUM ('Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat');
 
 CREATE TABLE appointment_availability (
@@ -317,6 +341,18 @@ CREATE INDEX cohort_filter_events_created_at_idx ON cohort_filter_events USING b
 
 --
 
+CREATE TABLE cohort_filter_members (
+    cohort_filter_id integer NOT NULL,
+    sid character varying(80) NOT NULL
+);
+ALTER TABLE cohort_filter_members OWNER TO boac;
+ALTER TABLE ONLY cohort_filter_members
+    ADD CONSTRAINT cohort_filter_members_pkey PRIMARY KEY (cohort_filter_id, sid);
+
+CREATE INDEX cohort_filter_members_sid_idx ON cohort_filter_members USING btree (sid);
+
+--
+
 CREATE TYPE cohort_domain_types AS ENUM ('default', 'admitted_students');
 
 --
@@ -327,9 +363,7 @@ CREATE TABLE cohort_filters (
     domain cohort_domain_types NOT NULL,
     name character varying(255) NOT NULL,
     filter_criteria jsonb NOT NULL,
-    sids VARCHAR(80)[],
     student_count integer,
-    alert_count integer,
     created_at timestamp with time zone NOT NULL,
     updated_at timestamp with time zone NOT NULL
 );
@@ -529,6 +563,60 @@ CREATE INDEX degree_progress_unit_requirements_template_id_idx ON degree_progres
 
 --
 
+CREATE TYPE degree_check_batch_job_status_types AS ENUM ('running', 'finished');
+
+CREATE TABLE degree_check_batch_jobs (
+  id integer NOT NULL,
+  template_id integer NOT NULL,
+  advisor_dept_codes character varying[] NOT NULL,
+  status degree_check_batch_job_status_types NOT NULL,
+  started_at timestamp with time zone,
+  finished_at timestamp with time zone,
+  created_at timestamp with time zone NOT NULL,
+  created_by integer NOT NULL,
+  updated_at timestamp with time zone NOT NULL
+);
+ALTER TABLE degree_check_batch_jobs OWNER TO boac;
+CREATE SEQUENCE degree_check_batch_jobs_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+ALTER TABLE degree_check_batch_jobs_id_seq OWNER TO boac;
+ALTER SEQUENCE degree_check_batch_jobs_id_seq OWNED BY degree_check_batch_jobs.id;
+ALTER TABLE ONLY degree_check_batch_jobs ALTER COLUMN id SET DEFAULT nextval('degree_check_batch_jobs_id_seq'::regclass);
+ALTER TABLE ONLY degree_check_batch_jobs
+    ADD CONSTRAINT degree_check_batch_jobs_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY degree_check_batch_jobs
+    ADD CONSTRAINT degree_check_batch_jobs_template_id_fkey FOREIGN KEY (template_id) REFERENCES degree_progress_templates(id) ON DELETE CASCADE;
+ALTER TABLE ONLY degree_check_batch_jobs
+    ADD CONSTRAINT degree_check_batch_jobs_created_by_fkey FOREIGN KEY (created_by) REFERENCES authorized_users(id) ON DELETE CASCADE;
+
+--
+
+CREATE TYPE degree_check_batch_student_status_types AS ENUM ('pending', 'created', 'failed');
+
+CREATE TABLE degree_check_batch_students (
+  job_id integer NOT NULL,
+  sid character varying(80) NOT NULL,
+  position integer NOT NULL,
+  status degree_check_batch_student_status_types NOT NULL,
+  degree_check_id integer,
+  error text,
+  updated_at timestamp with time zone NOT NULL
+);
+ALTER TABLE degree_check_batch_students OWNER TO boac;
+ALTER TABLE ONLY degree_check_batch_students
+    ADD CONSTRAINT degree_check_batch_students_pkey PRIMARY KEY (job_id, sid);
+ALTER TABLE ONLY degree_check_batch_students
+    ADD CONSTRAINT degree_check_batch_students_job_id_fkey FOREIGN KEY (job_id) REFERENCES degree_check_batch_jobs(id) ON DELETE CASCADE;
+ALTER TABLE ONLY degree_check_batch_students
+    ADD CONSTRAINT degree_check_batch_students_degree_check_id_fkey FOREIGN KEY (degree_check_id) REFERENCES degree_progress_templates(id) ON DELETE SET NULL;
+CREATE INDEX degree_check_batch_students_job_id_status_idx ON degree_check_batch_students USING btree (job_id, status);
+
+--
+
 CREATE TABLE drop_in_advisors (
     authorized_user_id INTEGER NOT NULL,
     dept_code character varying(255) NOT NULL,
@@ -782,6 +870,7 @@ CREATE TABLE student_groups (
   id INTEGER NOT NULL,
   owner_id INTEGER NOT NULL,
   name VARCHAR(255) NOT NULL,
+  student_count INTEGER NOT NULL DEFAULT 0,
   created_at TIMESTAMP WITH TIME ZONE NOT NULL,
   updated_at TIMESTAMP WITH TIME ZONE NOT NULL
 );
@@ -805,13 +894,19 @@ CREATE INDEX student_groups_owner_id_idx ON student_groups USING btree (owner_id
 
 CREATE TABLE student_group_members (
   student_group_id INTEGER,
-  sid VARCHAR(80) NOT NULL
+  sid VARCHAR(80) NOT NULL,
+  first_name_key VARCHAR,
+  last_name_key VARCHAR,
+  historical BOOLEAN,
+  unknown BOOLEAN NOT NULL DEFAULT FALSE
 );
 ALTER TABLE student_group_members OWNER TO boac;
 ALTER TABLE ONLY student_group_members
     ADD CONSTRAINT student_group_members_pkey PRIMARY KEY (student_group_id, sid);
 CREATE INDEX student_group_members_student_group_id_idx ON student_group_members USING btree (student_group_id);
 CREATE INDEX student_group_members_sid_idx ON student_group_members USING btree (sid);
+CREATE INDEX student_group_members_first_name_key_idx ON student_group_members USING btree (student_group_id, historical, first_name_key, last_name_key, sid);
+CREATE INDEX student_group_members_last_name_key_idx ON student_group_members USING btree (student_group_id, historical, last_name_key, first_name_key, sid);
 
 --
 
@@ -1053,6 +1148,11 @@ ALTER TABLE ONLY university_dept_members
 
 --
 
+ALTER TABLE ONLY alert_view_counts
+    ADD CONSTRAINT alert_view_counts_viewer_id_fkey FOREIGN KEY (viewer_id) REFERENCES authorized_users(id) ON DELETE CASCADE;
+
+--
+
 ALTER TABLE ONLY alert_views
     ADD CONSTRAINT alert_views_alert_id_fkey FOREIGN KEY (alert_id) REFERENCES alerts(id) ON DELETE CASCADE;
 ALTER TABLE ONLY alert_views
@@ -1065,6 +1165,11 @@ ALTER TABLE ONLY cohort_filter_events
 
 --
 
+ALTER TABLE ONLY cohort_filter_members
+    ADD CONSTRAINT cohort_filter_members_cohort_filter_id_fkey FOREIGN KEY (cohort_filter_id) REFERENCES cohort_filters(id) ON DELETE CASCADE;
+
+--
+
 ALTER TABLE ONLY notes_read
     ADD CONSTRAINT notes_read_viewer_id_fkey FOREIGN KEY (viewer_id) REFERENCES authorized_users(id) ON DELETE CASCADE;
 
@@ -59,9 +59,9 @@ export function getAppointment(appointmentId) {
     .then(response => response.data, () => null)
 }
 
-export function getDropInAppointmentWaitlist(deptCode) {
+export function getDropInAppointmentWaitlist(deptCode, wait=0) {
   return axios
-    .get(`${utils.apiBaseUrl()}/api/appointments/waitlist/${deptCode}`)
+    .get(`${utils.apiBaseUrl()}/api/appointments/waitlist/${deptCode}`, {params: wait ? {wait} : {}})
     .then(response => response.data, () => null)
 }
 
@@ -77,6 +77,10 @@ export function deleteUnitRequirement(unitRequirementId: number) {
   return axios.delete(`${utils.apiBaseUrl()}/api/degree/unit_requirement/${unitRequirementId}`)
 }
 
+export function getBatchDegreeCheckJob(jobId: number) {
+  return axios.get(`${utils.apiBaseUrl()}/api/degree/check/batch/${jobId}`).then(response => response.data, () => null)
+}
+
 export function getDegreeChecks(uid: number) {
   return axios.get(`${utils.apiBaseUrl()}/api/degrees/student/${uid}`).then(response => response.data, () => null)
 }
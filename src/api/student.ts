@@ -25,6 +25,19 @@ export function getStudentBySid(sid: string, profileOnly?:boolean) {
   return axios.get(url).then(response => response.data, () => null)
 }
 
+export function getStudentTimeline(sid: string, types?: string[], cursor?: string, limit?: number) {
+  const params = {cursor, limit, types: types && types.join(',')}
+  return axios
+    .get(`${utils.apiBaseUrl()}/api/student/${sid}/timeline`, {params})
+    .then(response => response.data, () => null)
+}
+
+export function getStudentTimelineNote(sid: string, noteId: string, legacySource?: string) {
+  return axios
+    .get(`${utils.apiBaseUrl()}/api/student/${sid}/timeline/note/${noteId}`, {params: {legacySource}})
+    .then(response => response.data, () => null)
+}
+
 export function getStudentsBySids(sids: string[]) {
   return axios
     .post(`${utils.apiBaseUrl()}/api/students/by_sids`, {sids: sids})
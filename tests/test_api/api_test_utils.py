@@ -34,7 +34,6 @@ def all_cohorts_owned_by(uid):
             'id': c.id,
             'name': c.name,
             'criteria': c.filter_criteria,
-            'alertCount': c.alert_count,
             'totalStudentCount': c.student_count,
         }
     cohorts = sorted(AuthorizedUser.query.filter_by(uid=uid).first().cohort_filters, key=lambda c: c.name)
@@ -110,3 +110,5 @@ class TestAlertsController:
 
         response = client.get(f'/api/cohort/{cohort_id}')
         assert response.json['alertCount'] == 5
+        my_cohorts = client.get('/api/cohorts/my').json
+        assert next(c for c in my_cohorts if c['id'] == cohort_id)['alertCount'] == 5
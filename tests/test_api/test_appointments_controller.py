@@ -23,13 +23,19 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+from datetime import timedelta
+from threading import BoundedSemaphore
+import time
+
 from boac import std_commit
+from boac.api import appointments_controller
 from boac.lib.util import localize_datetime, utc_now
 from boac.models.appointment import Appointment
 from boac.models.appointment_availability import AppointmentAvailability
 from boac.models.appointment_read import AppointmentRead
 from boac.models.authorized_user import AuthorizedUser
 from boac.models.authorized_user_extension import DropInAdvisor
+import mock
 import pytest
 import simplejson as json
 from sqlalchemy import and_
@@ -526,6 +532,50 @@ class TestAppointmentAvailability:
                 assert '23:00:00+00:00' in openings[6]['startTime']
                 assert '23:30:00+00:00' in openings[6]['endTime']
 
+    def test_openings_for_date_range(self, app, client, fake_auth, l_s_advisor_id):
+        """Returns a week of openings in one request."""
+        with override_config(app, 'DEPARTMENTS_SUPPORTING_SAME_DAY_APPTS', ['QCADV']):
+            fake_auth.login(l_s_college_scheduler_uid)
+            for weekday in ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']:
+                AppointmentAvailability.create(l_s_advisor_id, 'QCADV', '10:00', '11:00', weekday)
+            today = localize_datetime(utc_now())
+            end_date = today + timedelta(days=6)
+            response = client.get(
+                f"/api/appointments/openings/QCADV?startDate={today.strftime('%Y-%m-%d')}&endDate={end_date.strftime('%Y-%m-%d')}",
+            )
+            assert response.status_code == 200
+            assert len(response.json) == 14
+            assert len(set(o['startTime'][0:10] for o in response.json)) == 7
+            assert response.json == sorted(response.json, key=lambda o: o['startTime'])
+
+    def test_openings_date_range_validation(self, app, client, fake_auth):
+        """Rejects malformed, inverted and overlong date ranges."""
+        with override_config(app, 'DEPARTMENTS_SUPPORTING_SAME_DAY_APPTS', ['QCADV']):
+            fake_auth.login(l_s_college_scheduler_uid)
+            assert client.get('/api/appointments/openings/QCADV?startDate=bogus').status_code == 400
+            assert client.get('/api/appointments/openings/QCADV?startDate=2021-03-02&endDate=2021-03-01').status_code == 400
+            assert client.get('/api/appointments/openings/QCADV?startDate=2021-03-01&endDate=2021-04-01').status_code == 400
+            assert client.get('/api/appointments/openings/COENG?startDate=2021-03-01').status_code == 403
+
+    def test_schedule_today_long_poll(self, app, client, fake_auth, l_s_advisor_id):
+        """Answers an unchanged schedule with 304, holding the request open when asked to wait."""
+        with override_config(app, 'DEPARTMENTS_SUPPORTING_SAME_DAY_APPTS', ['QCADV']):
+            fake_auth.login(l_s_college_scheduler_uid)
+            etag = client.get('/api/appointments/today/QCADV').headers['ETag']
+            start = time.time()
+            response = client.get('/api/appointments/today/QCADV?wait=1', headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            assert time.time() - start >= 1
+            # A change in advisor availability changes the openings, and so the version.
+            today = localize_datetime(utc_now()).strftime('%a')
+            AppointmentAvailability.create(l_s_advisor_id, 'QCADV', '16:00', '17:00', today)
+            start = time.time()
+            response = client.get('/api/appointments/today/QCADV?wait=1', headers={'If-None-Match': etag})
+            assert response.status_code == 200
+            assert time.time() - start < 1
+            assert response.headers['ETag'] != etag
+            assert len([o for o in response.json['openings'] if o['uid'] == l_s_college_advisor_uid]) >= 2
+
 
 class TestAppointmentCancel:
 
@@ -962,6 +1012,54 @@ class TestAppointmentWaitlist:
             for appointment in appointments['unresolved'] + appointments['resolved']:
                 assert appointment['deptCode'] == dept_code
 
+    def test_waitlist_not_modified(self, app, client, fake_auth):
+        """Returns 304 when the waitlist is unchanged since the version held by the client."""
+        dept_code = 'QCADV'
+        with override_config(app, 'DEPARTMENTS_SUPPORTING_DROP_INS', [dept_code]):
+            fake_auth.login(l_s_college_scheduler_uid)
+            response = client.get(f'/api/appointments/waitlist/{dept_code}')
+            assert response.status_code == 200
+            etag = response.headers['ETag']
+            assert etag
+            response = client.get(f'/api/appointments/waitlist/{dept_code}', headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            assert response.headers['ETag'] == etag
+            assert not response.data
+
+            appointment = AppointmentTestUtil.create_drop_in_appointment(client, dept_code)
+            response = client.get(f'/api/appointments/waitlist/{dept_code}', headers={'If-None-Match': etag})
+            assert response.status_code == 200
+            assert response.headers['ETag'] != etag
+            assert appointment['id'] in [a['id'] for a in response.json['waitlist']['unresolved']]
+            Appointment.delete(appointment['id'])
+
+    def test_waitlist_long_poll(self, app, client, fake_auth):
+        """Holds an unchanged waitlist request open until the requested wait times out."""
+        dept_code = 'QCADV'
+        with override_config(app, 'DEPARTMENTS_SUPPORTING_DROP_INS', [dept_code]):
+            fake_auth.login(l_s_college_scheduler_uid)
+            etag = client.get(f'/api/appointments/waitlist/{dept_code}').headers['ETag']
+            start = time.time()
+            response = client.get(f'/api/appointments/waitlist/{dept_code}?wait=1', headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            assert time.time() - start >= 1
+            with override_config(app, 'APPT_DESK_LONG_POLL_TIMEOUT', 0):
+                start = time.time()
+                response = client.get(f'/api/appointments/waitlist/{dept_code}?wait=1', headers={'If-None-Match': etag})
+                assert response.status_code == 304
+                assert time.time() - start < 1
+            # Once every long-poll slot is taken, further requests are answered at once.
+            with mock.patch.object(appointments_controller, '_long_poll_slots', BoundedSemaphore(0)):
+                start = time.time()
+                response = client.get(f'/api/appointments/waitlist/{dept_code}?wait=1', headers={'If-None-Match': etag})
+                assert response.status_code == 304
+                assert time.time() - start < 1
+            # A stale version is answered at once, without waiting.
+            start = time.time()
+            response = client.get(f'/api/appointments/waitlist/{dept_code}?wait=1', headers={'If-None-Match': '"stale"'})
+            assert response.status_code == 200
+            assert time.time() - start < 1
+
 
 class TestMarkAppointmentRead:
 
@@ -1020,6 +1118,39 @@ class TestMarkAppointmentRead:
             assert AppointmentRead.was_read_by(user_id, appointment_id) is True
 
 
+class TestMarkAppointmentsRead:
+
+    @classmethod
+    def _mark_appointments_read(cls, client, appointment_ids, expected_status_code=201):
+        response = client.post(
+            '/api/appointments/mark_read',
+            data=json.dumps({'appointmentIds': appointment_ids}),
+            content_type='application/json',
+        )
+        assert response.status_code == expected_status_code
+        return response.json
+
+    def test_not_authenticated(self, client):
+        """Returns 401 if not authenticated."""
+        self._mark_appointments_read(client, ['11667051-00010'], expected_status_code=401)
+
+    def test_missing_appointment_ids(self, client, fake_auth):
+        """Requires a list of appointment ids."""
+        fake_auth.login(l_s_college_advisor_uid)
+        self._mark_appointments_read(client, [], expected_status_code=400)
+
+    def test_mark_appointments_read(self, client, fake_auth):
+        """Marks several appointments as read at once, tolerating those already read."""
+        appointment_ids = ['11667051-00010', '11667051-00011']
+        user_id = AuthorizedUser.get_id_per_uid(l_s_college_advisor_uid)
+        assert AppointmentRead.get_appointment_ids_read_by_user(user_id, appointment_ids) == set()
+
+        fake_auth.login(l_s_college_advisor_uid)
+        self._mark_appointments_read(client, appointment_ids[0:1])
+        self._mark_appointments_read(client, appointment_ids)
+        assert AppointmentRead.get_appointment_ids_read_by_user(user_id, appointment_ids + ['11667051-00012']) == set(appointment_ids)
+
+
 class TestStreamLegacyAppointmentAttachments:
 
     def test_not_authenticated(self, client):
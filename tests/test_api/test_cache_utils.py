@@ -29,6 +29,7 @@ from boac.models.authorized_user import AuthorizedUser
 from boac.models.curated_group import CuratedGroup, CuratedGroupStudent
 from boac.models.university_dept import UniversityDept
 from boac.models.university_dept_member import UniversityDeptMember
+import mock
 import pytest
 from tests.test_api.api_test_utils import all_cohorts_owned_by
 
@@ -50,6 +51,13 @@ class TestCacheUtils:
         assert '2178_90100' == alert['key']
         assert 'BURMESE 1A midpoint deficient grade of D+.' == alert['message']
 
+    def test_refresh_alerts_recounts_once(self, app):
+        """Alert counts are rebuilt once, after alerts for the term are deactivated and brought up to date."""
+        from boac.api.cache_utils import refresh_alerts
+        with mock.patch.object(Alert, 'refresh_alert_counts', wraps=Alert.refresh_alert_counts) as refresh_alert_counts:
+            refresh_alerts(2178)
+            refresh_alert_counts.assert_called_once_with()
+
     def test_update_curated_group_lists(self, app):
         from boac.api.cache_utils import update_curated_group_lists
         curated_group = CuratedGroup.create(
@@ -77,11 +85,9 @@ class TestCacheUtils:
         uid = '2040'
         cohorts = all_cohorts_owned_by(uid)
         assert len(cohorts)
-        for cohort in cohorts:
-            assert cohort['alertCount'] is None
         load_filtered_cohort_counts()
-        for cohort in all_cohorts_owned_by('2040'):
-            assert cohort['alertCount'] >= 0
+        for cohort in all_cohorts_owned_by(uid):
+            assert cohort['totalStudentCount'] >= 0
 
 
 class TestRefreshCalnetAttributes:
@@ -106,6 +112,21 @@ class TestRefreshCalnetAttributes:
         assert json_cache.fetch(f'calnet_user_for_uid_{removed_advisor}') is None
 
 
+class TestClearMergedEnrollmentTerms:
+
+    def test_clear_merged_enrollment_terms(self, app):
+        """Deletes cached enrollment histories and leaves other cache entries alone."""
+        from boac.api.cache_utils import clear_merged_enrollment_terms
+        from boac.models import json_cache
+        json_cache.upsert_rows({
+            'merged_enrollment_terms_2178_11667051': [],
+            'not_merged_enrollment_terms': [],
+        })
+        clear_merged_enrollment_terms()
+        assert json_cache.fetch('merged_enrollment_terms_2178_11667051') is None
+        assert json_cache.fetch('not_merged_enrollment_terms') == []
+
+
 class TestRefreshCurrentTermIndex:
     """Test current term index refresh."""
 
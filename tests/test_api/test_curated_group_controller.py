@@ -23,9 +23,11 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+from boac.externals import data_loch
 from boac.models.authorized_user import AuthorizedUser
-from boac.models.curated_group import CuratedGroup
+from boac.models.curated_group import CuratedGroup, CuratedGroupStudent
 from boac.models.manually_added_advisee import ManuallyAddedAdvisee
+import mock
 import pytest
 import simplejson as json
 from tests.test_api.api_test_utils import api_curated_group_add_students, api_curated_group_create, \
@@ -182,6 +184,38 @@ class TestGetCuratedGroup:
         alert_counts = [s.get('alertCount') for s in api_json['students']]
         assert alert_counts == [4, 0, 1, 0]
 
+    def test_order_by_last_name_paged(self, asc_advisor, asc_curated_groups, client):
+        """Pages students by last name, with stored total count."""
+        api_json = self._api_get_curated_group(client, asc_curated_groups[0].id, order_by='last_name', offset=1, limit=2)
+        assert api_json['totalStudentCount'] == 4
+        assert [s['lastName'] for s in api_json['students']] == ['Farestveit', 'Jayaprakash']
+        api_json = self._api_get_curated_group(client, asc_curated_groups[0].id, order_by='last_name desc', limit=2)
+        assert [s['lastName'] for s in api_json['students']] == ['Kerschen', 'Jayaprakash']
+
+    def test_order_by_last_name_skips_loch_sid_query(self, asc_advisor, asc_curated_groups):
+        """Name-ordered pages are sliced from indexed group membership."""
+        curated_group = CuratedGroup.find_by_id(asc_curated_groups[0].id)
+        with mock.patch.object(data_loch, 'safe_execute_rds', wraps=data_loch.safe_execute_rds) as safe_execute_rds:
+            api_json = curated_group.to_api_json(order_by='last_name')
+        assert len(api_json['students']) == 4
+        assert not [c for c in safe_execute_rds.call_args_list if 'DISTINCT(sas.sid)' in c.args[0]]
+
+    def test_unindexed_members_indexed_once(self, asc_advisor):
+        """Members missing from the loch are flagged on first view, not looked up again, and neither counted nor listed."""
+        advisor = AuthorizedUser.find_by_uid(asc_advisor_uid)
+        curated_group = CuratedGroup.create(advisor.id, 'Partly unknown to the loch')
+        CuratedGroupStudent.add_students(curated_group.id, ['11667051', '9999999999'])
+        get_sort_keys = mock.patch('boac.models.curated_group.get_student_sort_keys', wraps=data_loch.get_student_sort_keys)
+        with get_sort_keys as get_student_sort_keys:
+            api_json = curated_group.to_api_json(order_by='last_name')
+            assert api_json['totalStudentCount'] == 1
+            assert [s['sid'] for s in api_json['students']] == ['11667051']
+            assert get_student_sort_keys.call_count == 1
+            assert curated_group.to_api_json(order_by='last_name')['totalStudentCount'] == 1
+            assert get_student_sort_keys.call_count == 1
+        assert curated_group.student_count == 1
+        CuratedGroup.delete(curated_group.id)
+
     def test_order_by_level(self, asc_advisor, asc_curated_groups, client):
         """Includes students in response, ordered by level."""
         api_json = self._api_get_curated_group(client, asc_curated_groups[0].id, order_by='level', offset=1, limit=2)
@@ -568,14 +602,15 @@ class TestCuratedGroupWithInactives:
         group_feed = client.get(f'/api/curated_group/{group_id}').json
         assert group_feed['totalStudentCount'] == 3
         assert len(group_feed['students']) == 3
-        assert group_feed['students'][1]['sid'] == self.completed_sid
-        assert group_feed['students'][1]['academicCareerStatus'] == 'Completed'
+        # Historical students follow current students, in name order.
+        assert group_feed['students'][1]['sid'] == self.inactive_sid
+        assert group_feed['students'][1]['academicCareerStatus'] == 'Inactive'
         assert group_feed['students'][1]['fullProfilePending'] is True
-        assert group_feed['students'][1]['degree']['dateAwarded'] == '2010-05-14'
-        assert group_feed['students'][1]['degree']['description'] == 'Doctor of Philosophy'
-        assert group_feed['students'][2]['sid'] == self.inactive_sid
-        assert group_feed['students'][2]['academicCareerStatus'] == 'Inactive'
+        assert group_feed['students'][2]['sid'] == self.completed_sid
+        assert group_feed['students'][2]['academicCareerStatus'] == 'Completed'
         assert group_feed['students'][2]['fullProfilePending'] is True
+        assert group_feed['students'][2]['degree']['dateAwarded'] == '2010-05-14'
+        assert group_feed['students'][2]['degree']['description'] == 'Doctor of Philosophy'
 
     def test_add_inactive_to_group(self, asc_advisor, client):
         group = api_curated_group_create(
@@ -610,6 +645,20 @@ class TestCuratedGroupWithInactives:
         assert manually_added_advisees[0].sid == self.completed_sid
         assert manually_added_advisees[1].sid == self.inactive_sid
 
+    def test_view_does_not_create_manually_added_advisee(self, client, fake_auth):
+        fake_auth.login('2040')
+        group = api_curated_group_create(
+            client,
+            200,
+            'Rubber Orchestras',
+            [self.active_sid, self.inactive_sid],
+        )
+        ManuallyAddedAdvisee.query.delete()
+        response = client.get(f"/api/curated_group/{group['id']}")
+        assert response.status_code == 200
+        assert response.json['totalStudentCount'] == 2
+        assert len(ManuallyAddedAdvisee.query.all()) == 0
+
 
 class TestDownloadCuratedGroupCSV:
     """Download Curated Group CSV API."""
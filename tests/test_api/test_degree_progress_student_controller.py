@@ -26,13 +26,15 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from datetime import datetime
 import json
 
-from boac import std_commit
+from boac import db, std_commit
 from boac.models.authorized_user import AuthorizedUser
+from boac.models.degree_check_batch_job import DegreeCheckBatchJob
 from boac.models.degree_progress_category import DegreeProgressCategory
 from boac.models.degree_progress_course import DegreeProgressCourse
 from boac.models.degree_progress_note import DegreeProgressNote
 from boac.models.degree_progress_template import DegreeProgressTemplate
 import pytest
+from sqlalchemy import text
 
 coe_advisor_read_only_uid = '6972201'
 coe_advisor_read_write_uid = '1133399'
@@ -251,13 +253,119 @@ class TestBatchStudentDegreeChecks:
         fake_auth.login(coe_advisor_read_write_uid)
         student_sids = [coe_student_sid, '11667051', '7890123456', '9100000000']
         api_json = self._api_batch_degree_checks(client, sids=student_sids, template_id=mock_template.id)
+        # Background tasks run in the foreground during tests.
+        assert api_json['percentComplete'] == 100
+        assert api_json['status'] == 'finished'
+        assert api_json['createdCount'] == len(student_sids)
+        assert api_json['failedCount'] == 0
+        for sid in student_sids:
+            degree_checks = DegreeProgressTemplate.find_by_sid(student_sid=sid)
+            degree_check = next(d for d in degree_checks if d['parentTemplateId'] == mock_template.id)
+            assert degree_check['isCurrent'] is True
+            assert degree_check['name'] == mock_template.degree_name
+
+
+class TestBatchDegreeCheckJob:
+
+    @classmethod
+    def _api_batch_job(cls, client, job_id, expected_status_code=200):
+        response = client.get(f'/api/degree/check/batch/{job_id}')
+        assert response.status_code == expected_status_code
+        return json.loads(response.data)
+
+    @classmethod
+    def _api_resume_batch_job(cls, client, job_id, expected_status_code=200):
+        response = client.post(f'/api/degree/check/batch/{job_id}/resume')
+        assert response.status_code == expected_status_code
+        return json.loads(response.data)
+
+    @classmethod
+    def _create_job(cls, template, sids):
+        return DegreeCheckBatchJob.create(
+            advisor_dept_codes=['COENG'],
+            created_by=template.created_by,
+            sids=sids,
+            template_id=template.id,
+        )
+
+    def test_anonymous(self, client, mock_template):
+        """Denies anonymous user."""
+        job = self._create_job(mock_template, [coe_student_sid])
+        self._api_batch_job(client, job_id=job.id, expected_status_code=401)
+        self._api_resume_batch_job(client, job_id=job.id, expected_status_code=401)
+
+    def test_unauthorized_resume(self, client, fake_auth, mock_template):
+        """Denies resume to user without write permission."""
+        fake_auth.login(coe_advisor_read_only_uid)
+        job = self._create_job(mock_template, [coe_student_sid])
+        self._api_resume_batch_job(client, job_id=job.id, expected_status_code=401)
+
+    def test_job_not_found(self, client, fake_auth):
+        """Returns 404 if job does not exist."""
+        fake_auth.login(coe_advisor_read_write_uid)
+        self._api_batch_job(client, job_id=99999999, expected_status_code=404)
+        self._api_batch_job(client, job_id='foo', expected_status_code=404)
+
+    def test_per_sid_status(self, client, fake_auth, mock_template):
+        """Reports the status of each student in the batch."""
+        fake_auth.login(coe_advisor_read_only_uid)
+        sids = [coe_student_sid, '11667051']
+        job = self._create_job(mock_template, sids)
+        api_json = self._api_batch_job(client, job_id=job.id)
+        assert api_json['status'] == 'running'
         assert api_json['percentComplete'] == 0
-        # TODO: Once background job finishes, assert that degree checks were created.
-        # for sid in student_sids:
-        #     assert api_json[sid]
-        #     degree_check = DegreeProgressTemplate.find_by_id(api_json[sid])
-        #     assert degree_check
-        #     assert degree_check.student_sid == sid
+        assert api_json['pendingCount'] == 2
+        assert [s['sid'] for s in api_json['students']] == sids
+        assert [s['status'] for s in api_json['students']] == ['pending', 'pending']
+
+        DegreeCheckBatchJob.run(job_id=job.id, batch_size=1)
+        api_json = self._api_batch_job(client, job_id=job.id)
+        assert api_json['status'] == 'finished'
+        assert api_json['percentComplete'] == 100
+        for student in api_json['students']:
+            assert student['status'] == 'created'
+            assert DegreeProgressTemplate.find_by_id(student['degreeCheckId']).student_sid == student['sid']
+
+    def test_cannot_resume_running_job(self, client, fake_auth, mock_template):
+        """A job whose runner is still checking in cannot be resumed."""
+        fake_auth.login(coe_advisor_read_write_uid)
+        job = self._create_job(mock_template, [coe_student_sid])
+        self._api_resume_batch_job(client, job_id=job.id, expected_status_code=400)
+
+    def test_resume_interrupted_job(self, client, fake_auth, mock_template):
+        """An interrupted job picks up where it left off."""
+        fake_auth.login(coe_advisor_read_write_uid)
+        sids = [coe_student_sid, '11667051', '7890123456']
+        job = self._create_job(mock_template, sids)
+        # Only the first chunk finished before the runner went away.
+        clone_ids = DegreeProgressTemplate.create_clones(
+            advisor_dept_codes=['COENG'],
+            created_by=mock_template.created_by,
+            sids=sids[0:1],
+            template_id=mock_template.id,
+        )
+        db.session.execute(
+            text("""
+                UPDATE degree_check_batch_students SET status = 'created', degree_check_id = :degree_check_id
+                WHERE job_id = :job_id AND sid = :sid
+            """),
+            {'degree_check_id': clone_ids[sids[0]], 'job_id': job.id, 'sid': sids[0]},
+        )
+        db.session.execute(
+            text("UPDATE degree_check_batch_jobs SET updated_at = now() - interval '1 hour' WHERE id = :job_id"),
+            {'job_id': job.id},
+        )
+        assert self._api_batch_job(client, job_id=job.id)['isInterrupted'] is True
+
+        api_json = self._api_resume_batch_job(client, job_id=job.id)
+        assert api_json['status'] == 'finished'
+        assert api_json['isInterrupted'] is False
+        assert api_json['createdCount'] == 3
+        students = self._api_batch_job(client, job_id=job.id)['students']
+        assert students[0]['degreeCheckId'] == clone_ids[sids[0]]
+        for sid in sids:
+            degree_checks = [d for d in DegreeProgressTemplate.find_by_sid(student_sid=sid) if d['parentTemplateId'] == mock_template.id]
+            assert len(degree_checks) == 1
 
 
 class TestCreateStudentDegreeCheck:
@@ -24,7 +24,10 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 
 from datetime import datetime
+import io
+from threading import Thread
 from time import sleep
+from zipfile import ZipFile
 
 from boac.lib.util import localize_datetime, utc_now
 from boac.models.authorized_user import AuthorizedUser
@@ -345,7 +348,7 @@ class TestBatchNoteCreation:
         )
         notes = Note.query.filter(Note.subject == subject).all()
         assert len(notes) == len(distinct_sids)
-        matching_notes_read = NoteRead.get_notes_read_by_user(viewer_id=advisor.id, note_ids=[str(n.id) for n in notes])
+        matching_notes_read = NoteRead.get_note_ids_read_by_user(viewer_id=advisor.id, note_ids=[str(n.id) for n in notes])
         assert len(notes) == len(matching_notes_read)
 
         template_attachment_count = len(mock_note_template.attachments)
@@ -539,6 +542,38 @@ class TestMarkNoteRead:
         assert all_notes_after_read[8]['read'] is True
 
 
+class TestMarkNotesRead:
+
+    @classmethod
+    def _mark_notes_read(cls, client, note_ids, expected_status_code=201):
+        response = client.post('/api/notes/mark_read', json={'noteIds': note_ids})
+        assert response.status_code == expected_status_code
+        return response.json
+
+    def test_not_authenticated(self, client):
+        """Returns 401 if not authenticated."""
+        self._mark_notes_read(client, ['11667051-00001'], expected_status_code=401)
+
+    def test_user_without_advising_data_access(self, client, fake_auth):
+        """Denies access to a user who cannot access notes and appointments."""
+        fake_auth.login(coe_advisor_no_advising_data_uid)
+        self._mark_notes_read(client, ['11667051-00001'], expected_status_code=401)
+
+    def test_missing_note_ids(self, client, fake_auth):
+        """Requires a list of note ids."""
+        fake_auth.login(coe_advisor_uid)
+        self._mark_notes_read(client, None, expected_status_code=400)
+
+    def test_mark_notes_read(self, client, fake_auth):
+        """Marks several notes as read at once, tolerating those already read."""
+        fake_auth.login(coe_advisor_uid)
+        self._mark_notes_read(client, ['11667051-00001'])
+        self._mark_notes_read(client, ['11667051-00001', '11667051-139379', '11667051-151620'])
+        notes = _get_notes(client, 61889)
+        read_note_ids = [n['id'] for n in notes if n['read']]
+        assert read_note_ids == ['11667051-00001', '11667051-139379', '11667051-151620']
+
+
 class TestUpdateNotes:
 
     @classmethod
@@ -822,6 +857,21 @@ class TestStreamNotesZip:
         fake_auth.login(admin_uid)
         self._assert_zip_download(app, client)
 
+    def test_zip_streamed_outside_app_context(self, app, client, fake_auth):
+        """Attachments are written to the zip as the response is sent, after the view has returned."""
+        fake_auth.login(admin_uid)
+        with mock_legacy_note_attachment(app):
+            response = client.get('/api/notes/download_for_sid/9000000000', buffered=False)
+            assert response.status_code == 200
+            # A new thread has no app context, as when the WSGI server sends the response.
+            bodies = []
+            thread = Thread(target=lambda: bodies.append(response.get_data()))
+            thread.start()
+            thread.join()
+            response.close()
+        zipfile = ZipFile(io.BytesIO(bodies[0]), 'r')
+        assert zipfile.read('dog_eaten_homework.pdf') == b'When in the course of human events, it becomes necessarf arf woof woof woof'
+
 
 def _get_notes(client, uid):
     response = client.get(f'/api/student/by_uid/{uid}')
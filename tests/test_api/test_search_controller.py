@@ -250,6 +250,19 @@ class TestStudentSearch:
         assert 'Crossman' == api_json['students'][0]['lastName']
 
 
+class TestMultiDomainSearch:
+    """Combined search across domains."""
+
+    def test_search_reports_latency_per_domain(self, coe_advisor, client):
+        """Reports latency for each domain searched."""
+        api_json = _api_search(client, 'da', courses=True, notes=True, students=True)
+        assert 'courses' in api_json
+        assert 'notes' in api_json
+        assert 'students' in api_json
+        assert set(api_json['latency'].keys()) == {'courses', 'notes', 'students'}
+        assert api_json['timedOut'] == []
+
+
 class TestCourseSearch:
     """Course search API."""
 
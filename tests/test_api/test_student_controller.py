@@ -23,9 +23,12 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+from boac.api import util
+from boac.externals import data_loch
 from boac.models.authorized_user import AuthorizedUser
 from boac.models.cohort_filter import CohortFilter
 from boac.models.curated_group import CuratedGroup
+import mock
 import pytest
 import simplejson as json
 from tests.util import override_config
@@ -797,6 +800,77 @@ class TestNotes:
         assert author['sid'] == advisor_sid
 
 
+class TestTimeline:
+    """Paginated academic timeline API."""
+
+    def test_not_authenticated(self, client):
+        """Returns 401 if not authenticated."""
+        assert client.get('/api/student/11667051/timeline').status_code == 401
+
+    def test_invalid_type(self, client, coe_advisor_login):
+        """Rejects unknown timeline types."""
+        assert client.get('/api/student/11667051/timeline?types=note,gossip').status_code == 400
+
+    def test_invalid_cursor(self, client, coe_advisor_login):
+        """Rejects a malformed cursor."""
+        assert client.get('/api/student/11667051/timeline?cursor=foo').status_code == 400
+
+    def test_profile_with_paged_timeline(self, app, client, coe_advisor_login):
+        """Profile carries timeline counts and the first page in place of all notifications."""
+        response = client.get('/api/student/by_sid/11667051?pagedTimeline=true')
+        assert response.status_code == 200
+        assert 'notifications' not in response.json
+        timeline = response.json['timeline']
+        assert set(timeline['counts'].keys()) == {'alert', 'appointment', 'hold', 'note', 'requirement'}
+        assert len(timeline['items']) == min(sum(timeline['counts'].values()), app.config['TIMELINE_PAGE_SIZE'])
+
+    def test_pages(self, client, coe_advisor_login):
+        """Pages through the timeline, newest first, with no item repeated or skipped."""
+        everything = client.get('/api/student/11667051/timeline?types=note,alert,hold').json
+        assert everything['nextCursor'] is None
+        expected_ids = [item['timelineId'] for item in everything['items']]
+        assert len(expected_ids) == sum(everything['counts'].values()) > 2
+
+        timeline_ids = []
+        cursor = None
+        while True:
+            url = '/api/student/11667051/timeline?types=note,alert,hold&limit=2'
+            response = client.get(f'{url}&cursor={cursor}' if cursor else url)
+            assert response.status_code == 200
+            assert len(response.json['items']) <= 2
+            timeline_ids += [item['timelineId'] for item in response.json['items']]
+            cursor = response.json['nextCursor']
+            if not cursor:
+                break
+        assert timeline_ids == expected_ids
+
+    def test_later_pages_from_snapshot(self, client, coe_advisor_login):
+        """Later pages come from the snapshot taken with the first page, without querying every source again."""
+        url = '/api/student/11667051/timeline?types=note,alert,hold&limit=2'
+        with mock.patch.object(util, 'get_notifications', wraps=util.get_notifications) as get_notifications:
+            cursor = client.get(url).json['nextCursor']
+            response = client.get(f'{url}&cursor={cursor}')
+            assert response.status_code == 200
+            assert len(response.json['items']) == 2
+            assert get_notifications.call_count == 1
+
+    def test_note_bodies_on_demand(self, client, coe_advisor_login):
+        """Omits note bodies from timeline pages; the body is fetched per note."""
+        with mock.patch.object(data_loch, 'get_sis_advising_notes', wraps=data_loch.get_sis_advising_notes) as get_sis_advising_notes:
+            items = client.get('/api/student/11667051/timeline?types=note').json['items']
+            get_sis_advising_notes.assert_called_once_with('11667051', note_id=None, include_body=False)
+        note = next(item for item in items if item['id'] == '11667051-00001')
+        assert note['body'] is None
+        assert note['message'] is None
+        response = client.get(f"/api/student/11667051/timeline/note/{note['id']}?legacySource={note['legacySource']}")
+        assert response.status_code == 200
+        assert response.json['body'] == 'Brigitte is making athletic and moral progress'
+
+    def test_note_not_found(self, client, coe_advisor_login):
+        """Returns 404 for an unknown note."""
+        assert client.get('/api/student/11667051/timeline/note/11667051-99999?legacySource=SIS').status_code == 404
+
+
 class TestDistinctSids:
 
     @classmethod
@@ -32,7 +32,7 @@ from boac.models.university_dept import UniversityDept
 from flask import current_app as app
 import simplejson as json
 from tests.test_api.test_appointments_controller import AppointmentTestUtil
-from tests.util import override_config
+from tests.util import count_statements, override_config
 
 admin_uid = '2040'
 asc_advisor_uid = '1081940'
@@ -382,6 +382,26 @@ class TestUsers:
         users = response.json['users']
         assert len(users) == 4
 
+    def test_users_feed_query_count(self, app):
+        """Builds the users feed in a constant number of queries, however many users are requested."""
+        from boac.api.util import authorized_users_api_feed
+        users = AuthorizedUser.get_all_active_users()
+        assert len(users) > 10
+
+        def _count_statements(feed_users):
+            with count_statements() as statements:
+                feed = authorized_users_api_feed(feed_users)
+            return feed, len(statements)
+        # Warm the CalNet cache so that both counts below reflect cache hits.
+        authorized_users_api_feed(users)
+        single_feed, single_count = _count_statements(users[0:1])
+        full_feed, full_count = _count_statements(users)
+        assert len(single_feed) == 1
+        assert len(full_feed) == len(users)
+        assert full_count == single_count
+        coe_advisor = next(u for u in full_feed if u['uid'] == coe_advisor_uid)
+        assert {'code': 'COENG', 'name': 'College of Engineering', 'role': 'advisor', 'automateMembership': True} in coe_advisor['departments']
+
     def test_drop_in_advisors_for_dept(self, client, fake_auth):
         with override_config(app, 'DEPARTMENTS_SUPPORTING_DROP_INS', ['QCADV']):
             fake_auth.login(l_s_college_scheduler_uid)
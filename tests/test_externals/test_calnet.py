@@ -0,0 +1,70 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from boac.externals import calnet
+
+
+class TestCalnet:
+    """CalNet LDAP client."""
+
+    def test_search_uids(self, app):
+        """Returns mapped attributes, unwrapping single values."""
+        persons = calnet.client(app).search_uids(['1133399', '1081940'])
+        assert len(persons) == 2
+        person = next(p for p in persons if p['uid'] == '1133399')
+        assert person['csid'] == '800700600'
+        assert person['name'] == 'Roberta Joan Anderson'
+        assert person['sortable_name'] == 'Anderson, Roberta Joan'
+        assert person['campus_email'] == 'joni@berkeley.edu'
+        assert person['affiliations'] == 'EMPLOYEE-TYPE-STAFF'
+        assert person['expired'] is False
+        assert set(person.keys()) == set(calnet.SCHEMA_DICT.values()) | {'expired'}
+
+    def test_search_csids(self, app):
+        persons = calnet.client(app).search_csids(['100200300'])
+        assert [p['uid'] for p in persons] == ['1081940']
+
+    def test_search_batches(self, app):
+        """Searches in batches over a pooled connection."""
+        uids = ['1133399', '1081940'] + [str(n) for n in range(calnet.BATCH_QUERY_MAXIMUM)]
+        persons = calnet.client(app).search_uids(uids)
+        assert {'1133399', '1081940'} <= {p['uid'] for p in persons}
+
+    def test_search_including_expired(self, app):
+        """Prefers active accounts, falling back to expired accounts."""
+        persons = calnet.client(app).search_uids_including_expired(['1133399', '99999999'])
+        assert [p['uid'] for p in persons] == ['1133399']
+        assert persons[0]['expired'] is False
+
+    def test_connections_reused(self, app):
+        """Returns connections to the pool for reuse."""
+        client = calnet.client(app)
+        client.search_uids(['1133399'])
+        pool = client._connection_pool()
+        assert pool.qsize() >= 1
+        with client._pooled_connection() as conn:
+            pooled_conn = conn
+        with client._pooled_connection() as conn:
+            assert conn is pooled_conn
@@ -88,12 +88,11 @@ class TestDataLoch:
         sis_profile = json.loads(student_profiles[0]['profile'])['sisProfile']
         assert sis_profile['academicCareer'] == 'UGRD'
 
-    def test_get_enrolled_primary_sections(self, app):
-        sections = data_loch.get_enrolled_primary_sections('2178', 'MATH1')
-        assert len(sections) == 6
+    def test_get_enrolled_primary_sections_for_term(self, app):
+        sections = data_loch.get_enrolled_primary_sections_for_term('2178')
+        assert len([s for s in sections if s['sis_course_name_compressed'].startswith('MATH1')]) == 6
         for section in sections:
             assert section['term_id'] == '2178'
-            assert section['sis_course_name'].startswith('MATH 1')
 
     def test_get_term_gpas(self, app):
         term_gpas = data_loch.get_term_gpas(['11667051'])
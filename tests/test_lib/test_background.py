@@ -0,0 +1,73 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+import time
+
+from boac.lib.background import concurrent_execute
+import pytest
+from tests.util import override_config
+
+
+class TestConcurrentExecute:
+    """Concurrent execution of named tasks."""
+
+    def test_foreground_when_background_tasks_disabled(self, app):
+        """Runs tasks in sequence and reports latency when background tasks are disabled."""
+        results, latency, timed_out = concurrent_execute({'a': lambda: 1, 'b': lambda: 2})
+        assert results == {'a': 1, 'b': 2}
+        assert set(latency.keys()) == {'a', 'b'}
+        assert timed_out == []
+
+    def test_concurrent_results(self, app):
+        """Runs tasks concurrently."""
+        def _nap():
+            time.sleep(0.5)
+            return 'rested'
+        with override_config(app, 'BACKGROUND_TASKS', True):
+            start = time.time()
+            results, latency, timed_out = concurrent_execute({'a': _nap, 'b': _nap, 'c': _nap})
+            assert time.time() - start < 1.4
+        assert results == {'a': 'rested', 'b': 'rested', 'c': 'rested'}
+        assert all(ms >= 500 for ms in latency.values())
+        assert timed_out == []
+
+    def test_partial_results_on_timeout(self, app):
+        """Returns partial results when a task misses its deadline."""
+        def _slow():
+            time.sleep(1)
+            return 'late'
+        with override_config(app, 'BACKGROUND_TASKS', True):
+            results, latency, timed_out = concurrent_execute({'fast': lambda: 'early', 'slow': _slow}, timeouts={'slow': 0.1})
+        assert results == {'fast': 'early'}
+        assert set(latency.keys()) == {'fast', 'slow'}
+        assert timed_out == ['slow']
+
+    def test_task_error(self, app):
+        """Re-raises errors from tasks."""
+        def _error():
+            raise ValueError('Nope')
+        with override_config(app, 'BACKGROUND_TASKS', True):
+            with pytest.raises(ValueError):
+                concurrent_execute({'ok': lambda: 'ok', 'error': _error})
@@ -0,0 +1,66 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from threading import Timer
+import time
+
+from boac.lib.background import get_engine
+from boac.lib.change_feed import ChangeFeed
+from sqlalchemy import text
+
+
+class TestChangeFeed:
+    """Postgres LISTEN/NOTIFY change feed."""
+
+    def test_wait_times_out(self, app):
+        """Returns False if no change arrives within the timeout."""
+        feed = ChangeFeed('test_changes_timeout')
+        start = time.time()
+        assert feed.wait('COENG', feed.sequence('COENG'), timeout=0.2) is False
+        assert time.time() - start >= 0.2
+
+    def test_wait_wakes_on_dispatch(self, app):
+        """Wakes waiters on a change to their key, ignoring changes to other keys."""
+        feed = ChangeFeed('test_changes_dispatch')
+        since = feed.sequence('COENG')
+        Timer(0.1, feed._dispatch, args=['QCADV']).start()
+        Timer(0.2, feed._dispatch, args=['COENG']).start()
+        start = time.time()
+        assert feed.wait('COENG', since, timeout=5) is True
+        assert time.time() - start < 5
+        assert feed.sequence('COENG') == since + 1
+        assert feed.sequence('QCADV') == 1
+
+    def test_notification_on_commit(self, app):
+        """Delivers changes committed by another connection through the listener thread."""
+        feed = ChangeFeed('test_changes_notify')
+        since = feed.sequence('COENG')
+        # The first wait starts the listener, which may not yet be listening when the first notification is sent.
+        for attempt in range(50):
+            with get_engine(app).begin() as connection:
+                connection.execute(text('SELECT pg_notify(:channel, :key)'), {'channel': feed.channel, 'key': 'COENG'})
+            if feed.wait('COENG', since, timeout=0.2):
+                break
+        assert feed.sequence('COENG') > since
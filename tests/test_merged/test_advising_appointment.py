@@ -24,10 +24,15 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 
 
+from boac import db
 from boac.merged.advising_appointment import (
     get_advising_appointments,
+    get_non_legacy_advising_appointments,
     search_advising_appointments,
 )
+from boac.models.appointment import Appointment
+from boac.models.authorized_user import AuthorizedUser
+from tests.util import count_statements
 
 
 coe_advisor_uid = '1133399'
@@ -135,6 +140,43 @@ you got to pull up the intruder by the root of the weed; N.Y. Chew through the m
         assert appointments[4]['statusBy']['firstName'] == 'Milicent'
         assert appointments[4]['statusDate']
 
+    def test_get_non_legacy_advising_appointments_query_count(self, app):
+        """Loads topics and status events of local appointments in a fixed number of queries."""
+        sid = '9000000000'
+
+        def _create_appointments(count):
+            for index in range(count):
+                Appointment.create(
+                    appointment_type='Drop-in',
+                    created_by=AuthorizedUser.get_id_per_uid(coe_advisor_uid),
+                    dept_code='COENG',
+                    details=f'Appointment {index}',
+                    student_sid=sid,
+                    topics=['Topic for appointments, 1'],
+                )
+            db.session.expire_all()
+
+        def _count_statements():
+            with count_statements() as statements:
+                appointments = get_non_legacy_advising_appointments(sid)
+            return appointments, len(statements)
+
+        _create_appointments(2)
+        # Warm the CalNet cache.
+        get_non_legacy_advising_appointments(sid)
+        db.session.expire_all()
+        appointments, statement_count = _count_statements()
+        assert len(appointments) == 2
+
+        _create_appointments(18)
+        appointments, more_statement_count = _count_statements()
+        assert len(appointments) == 20
+        assert more_statement_count == statement_count
+        for appointment in appointments.values():
+            assert appointment['topics'] == ['Topic for appointments, 1']
+            assert appointment['status'] == 'waiting'
+            assert appointment['statusBy']['uid'] == coe_advisor_uid
+
     def test_search(self, fake_auth, app):
         """Finds new and legacy appointments matching the criteria, ordered by rank."""
         fake_auth.login(coe_advisor_uid)
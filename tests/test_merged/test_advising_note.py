@@ -27,12 +27,25 @@ from datetime import datetime, timedelta
 import io
 from zipfile import ZipFile
 
+from boac import db
+from boac.api.errors import InternalServerError
+from boac.externals import s3
 from boac.lib.util import localize_datetime, utc_now
-from boac.merged.advising_note import get_advising_notes, get_zip_stream_for_sid, search_advising_notes
+from boac.merged.advising_note import (
+    _AttachmentStreams,
+    get_advising_note,
+    get_advising_notes,
+    get_non_legacy_advising_notes,
+    get_zip_stream_for_sid,
+    search_advising_notes,
+)
 from boac.models.note import Note
 from dateutil.parser import parse
+from dateutil.tz import tzutc
+import mock
+import pytest
 import pytz
-from tests.util import mock_legacy_note_attachment
+from tests.util import count_statements, mock_legacy_note_attachment, override_config
 
 
 asc_advisor = '6446'
@@ -140,6 +153,32 @@ class TestMergedAdvisingNote:
         assert len(boa_created_note['attachments']) == 1
         assert 'legacySource' not in boa_created_note
 
+    def test_get_advising_note(self, app, fake_auth):
+        """Looks up a single note in its own source, for the given student only."""
+        fake_auth.login(coe_advisor)
+        note = _create_coe_advisor_note('9000000000', 'Looked up by id', body='Found by id')
+        assert get_advising_note('9000000000', str(note.id))['body'] == 'Found by id'
+        assert get_advising_note('11667051', str(note.id)) is None
+        sis_note = get_advising_note('11667051', '11667051-00001', legacy_source='SIS')
+        assert sis_note['body'] == 'Brigitte is making athletic and moral progress'
+        assert get_advising_note('9000000000', '11667051-00001', legacy_source='SIS') is None
+
+    def test_get_non_legacy_advising_notes_query_count(self, app, fake_auth):
+        """Loads topics and attachments of all local notes in one query each."""
+        sid = '9000000000'
+        # Search is beside the point here; skip refreshing the search index after each note.
+        with mock.patch.object(Note, 'refresh_search_index'):
+            for index in range(200):
+                _create_coe_advisor_note(sid, f'Note {index}', topics=['Fooball', 'Barball'])
+        db.session.expire_all()
+        with count_statements() as statements:
+            notes = get_non_legacy_advising_notes(sid)
+        assert len(statements) == 3
+        assert len(notes) == 200
+        for note in notes.values():
+            assert sorted(note['topics']) == ['Barball', 'Fooball']
+            assert note['attachments'] == []
+
     def test_get_advising_notes_ucbconversion_attachment(self, app, fake_auth):
         fake_auth.login(coe_advisor)
         notes = get_advising_notes('11667051')
@@ -459,6 +498,55 @@ class TestMergedAdvisingNote:
                 "2017-11-02,9000000000,Wolfgang Pauli-O'Rourke,,700600500,,,,dog_eaten_homework.pdf,I am confounded by this confounding student"
             assert csv_rows[2] == "2017-11-02,9000000000,Wolfgang Pauli-O'Rourke,,600500400,,,Ne Scéaw,,Is this student even on campus?"
 
+    def test_stream_zipped_bundle_concurrently(self, app, fake_auth):
+        """Attachment streams are opened on a thread pool, with the app role assumed once."""
+        with mock_legacy_note_attachment(app):
+            with override_config(app, 'BACKGROUND_TASKS', True):
+                with mock.patch.object(s3, 'get_sts_credentials', wraps=s3.get_sts_credentials) as get_sts_credentials:
+                    stream = get_zip_stream_for_sid('9000000000')['stream']
+                    body = b''.join(chunk for chunk in stream)
+                    assert get_sts_credentials.call_count == 1
+            zipfile = ZipFile(io.BytesIO(body), 'r')
+            assert len(zipfile.namelist()) == 2
+            assert zipfile.read('dog_eaten_homework.pdf') == b'When in the course of human events, it becomes necessarf arf woof woof woof'
+
+    def test_attachment_streams_closed_early(self, app):
+        """Closing an abandoned download shuts down the pool opening attachments ahead of the zip writer."""
+        s3_key = f"{app.config['DATA_LOCH_S3_ADVISING_NOTE_ATTACHMENT_PATH']}/9000000000/9000000000_00002_1.pdf"
+        with mock_legacy_note_attachment(app):
+            with override_config(app, 'BACKGROUND_TASKS', True):
+                attachment_streams = _AttachmentStreams([('first.pdf', s3_key), ('second.pdf', s3_key), ('third.pdf', s3_key)])
+            assert next(attachment_streams.iter_stream(0))
+            executor = attachment_streams.executor
+            with mock.patch.object(executor, 'shutdown', wraps=executor.shutdown) as shutdown:
+                attachment_streams.close()
+                shutdown.assert_called_once_with(wait=False)
+            assert attachment_streams.futures == {}
+
+    def test_attachment_streams_renew_credentials(self, app):
+        """Assumes the app role again when the credentials in hand are about to expire."""
+        s3_key = f"{app.config['DATA_LOCH_S3_ADVISING_NOTE_ATTACHMENT_PATH']}/9000000000/9000000000_00002_1.pdf"
+        with mock_legacy_note_attachment(app):
+            attachment_streams = _AttachmentStreams([('first.pdf', s3_key), ('second.pdf', s3_key)])
+            with mock.patch.object(s3, 'get_sts_credentials', wraps=s3.get_sts_credentials) as get_sts_credentials:
+                assert b''.join(attachment_streams.iter_stream(0))
+                assert get_sts_credentials.call_count == 0
+                attachment_streams.credentials = {
+                    **attachment_streams.credentials,
+                    'Expiration': datetime.now(tzutc()) + timedelta(minutes=1),
+                }
+                assert b''.join(attachment_streams.iter_stream(1))
+                assert get_sts_credentials.call_count == 1
+
+    def test_attachment_stream_failure(self, app):
+        """An attachment that cannot be opened fails the download rather than leave an empty entry in the zip."""
+        s3_key = f"{app.config['DATA_LOCH_S3_ADVISING_NOTE_ATTACHMENT_PATH']}/9000000000/9000000000_00002_1.pdf"
+        with mock_legacy_note_attachment(app):
+            attachment_streams = _AttachmentStreams([('first.pdf', s3_key)])
+            with mock.patch.object(s3, 'stream_object', return_value=None):
+                with pytest.raises(InternalServerError):
+                    next(attachment_streams.iter_stream(0))
+
 
 def _create_coe_advisor_note(
     sid,
@@ -470,7 +558,7 @@ def _create_coe_advisor_note(
     author_role='Spherical',
     author_dept_codes='COENG',
 ):
-    Note.create(
+    return Note.create(
         author_uid=author_uid,
         author_name=author_name,
         author_role=author_role,
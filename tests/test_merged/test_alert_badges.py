@@ -0,0 +1,85 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from boac.lib.change_feed import alert_badge_changes
+from boac.merged.alert_badges import get_alert_badges
+from boac.models.alert import Alert
+from boac.models.authorized_user import AuthorizedUser
+from boac.models.curated_group import CuratedGroup
+import mock
+import pytest
+from tests.util import count_statements, override_config
+
+asc_advisor_uid = '2040'
+
+
+@pytest.mark.usefixtures('db_session')
+class TestAlertBadges:
+    """Sidebar alert counts cached in worker memory."""
+
+    def test_badges_served_from_memory(self, app):
+        """Cached alert counts per curated group are served without database queries."""
+        viewer_id = AuthorizedUser.get_id_per_uid(asc_advisor_uid)
+        Alert.update_all_for_term(2178)
+        curated_group = CuratedGroup.create(viewer_id, 'Alerted students')
+        CuratedGroup.add_students(curated_group.id, ['11667051'])
+        with override_config(app, 'ALERT_BADGE_CACHE_TTL', 60), mock.patch.object(alert_badge_changes, 'start_listener'):
+            # Notifications are delivered only on commit, so tests bump the sequence as the listener would.
+            alert_badge_changes._dispatch(str(viewer_id))
+            assert get_alert_badges(viewer_id)['curatedGroups'][curated_group.id] == 2
+            with count_statements() as statements:
+                badges = get_alert_badges(viewer_id)
+        assert badges['curatedGroups'][curated_group.id] == 2
+        assert statements == []
+
+    def test_dismissal_evicts_badges(self, app):
+        """Dismissing an alert publishes a change for other workers and evicts the viewer's badges in this one."""
+        viewer_id = AuthorizedUser.get_id_per_uid(asc_advisor_uid)
+        Alert.update_all_for_term(2178)
+        curated_group = CuratedGroup.create(viewer_id, 'Alerted students')
+        CuratedGroup.add_students(curated_group.id, ['11667051'])
+        alert = Alert.current_alerts_for_sid(sid='11667051', viewer_id=viewer_id)[0]
+        with override_config(app, 'ALERT_BADGE_CACHE_TTL', 60), mock.patch.object(alert_badge_changes, 'start_listener'):
+            assert get_alert_badges(viewer_id)['curatedGroups'][curated_group.id] == 2
+            with mock.patch.object(alert_badge_changes, 'publish', wraps=alert_badge_changes.publish) as publish:
+                Alert.dismiss(alert['id'], viewer_id)
+                publish.assert_called_once_with(str(viewer_id))
+            assert get_alert_badges(viewer_id)['curatedGroups'][curated_group.id] == 1
+
+    def test_change_notice_invalidates_badges(self, app):
+        """Badges cached before a dismissal in another worker are recomputed once its change notice arrives."""
+        viewer_id = AuthorizedUser.get_id_per_uid(asc_advisor_uid)
+        Alert.update_all_for_term(2178)
+        curated_group = CuratedGroup.create(viewer_id, 'Alerted students')
+        CuratedGroup.add_students(curated_group.id, ['11667051'])
+        alert = Alert.current_alerts_for_sid(sid='11667051', viewer_id=viewer_id)[0]
+        with override_config(app, 'ALERT_BADGE_CACHE_TTL', 60), mock.patch.object(alert_badge_changes, 'start_listener'):
+            assert get_alert_badges(viewer_id)['curatedGroups'][curated_group.id] == 2
+            # Another worker's dismissal leaves this worker's cache in place.
+            with mock.patch('boac.models.alert.evict_alert_badges'):
+                Alert.dismiss(alert['id'], viewer_id)
+            assert get_alert_badges(viewer_id)['curatedGroups'][curated_group.id] == 2
+            alert_badge_changes._dispatch(str(viewer_id))
+            assert get_alert_badges(viewer_id)['curatedGroups'][curated_group.id] == 1
@@ -0,0 +1,75 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+import time
+
+from boac.merged import calnet
+from boac.models import json_cache
+from boac.models.json_cache import fetch, fetch_bulk
+from tests.util import count_statements
+
+
+class TestCalnet:
+    """CalNet feeds cached in bulk."""
+
+    def test_get_calnet_users_for_uids(self, app):
+        """Caches a feed for every UID, found in CalNet or not."""
+        json_cache.clear('calnet_user_for_uid_%')
+        users = calnet.get_calnet_users_for_uids(app, ['1133399', '1081940', '99999999'])
+        assert users['1133399']['csid'] == '800700600'
+        assert users['1081940']['name'] == 'Loramps Glub'
+        assert users['99999999']['uid'] == '99999999'
+        assert users['99999999']['name'] is None
+        cached = fetch_bulk(['calnet_user_for_uid_1133399', 'calnet_user_for_uid_99999999'])
+        assert cached['calnet_user_for_uid_1133399']['campusEmail'] == 'joni@berkeley.edu'
+        assert cached['calnet_user_for_uid_99999999']['uid'] == '99999999'
+
+    def test_get_calnet_users_for_csids(self, app):
+        json_cache.clear('calnet_user_for_csid_%')
+        users = calnet.get_calnet_users_for_csids(app, ['100200300'])
+        assert users['100200300']['uid'] == '1081940'
+        assert fetch('calnet_user_for_csid_100200300')['uid'] == '1081940'
+
+    def test_bulk_cache_write(self, app):
+        """Benchmark: caches thousands of CalNet feeds with one INSERT statement."""
+        json_cache.clear('calnet_user_for_uid_%')
+        uids = ['1133399', '1081940'] + [str(uid) for uid in range(1000000, 1003000)]
+        with count_statements() as statements:
+            start = time.time()
+            users = calnet.get_calnet_users_for_uids(app, uids)
+            elapsed = time.time() - start
+        inserts = [s for s in statements if s.strip().startswith('INSERT INTO json_cache')]
+        app.logger.info(f'Cached CalNet feeds for {len(uids)} UIDs in {round(elapsed * 1000)} ms')
+        assert len(users) == len(uids)
+        assert len(inserts) == 1
+        assert users['1133399']['name'] == 'Roberta Joan Anderson'
+
+    def test_existing_cache_rows_updated(self, app):
+        """Replaces stale cached feeds rather than failing on conflict."""
+        from boac.models.json_cache import upsert_rows
+        upsert_rows({'calnet_user_for_uid_1081940': {'uid': '1081940', 'name': 'Stale'}})
+        assert fetch('calnet_user_for_uid_1081940')['name'] == 'Stale'
+        upsert_rows({'calnet_user_for_uid_1081940': {'uid': '1081940', 'name': 'Fresh'}})
+        assert fetch('calnet_user_for_uid_1081940')['name'] == 'Fresh'
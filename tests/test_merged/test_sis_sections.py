@@ -26,8 +26,11 @@ ENHANCEMENTS, OR MODIFICATIONS.
 import io
 
 from boac.externals import data_loch
+from boac.lib.change_feed import search_index_changes
 from boac.lib.mockingdata import MockRows, register_mock
-from boac.merged.sis_sections import get_sis_section
+from boac.merged.sis_sections import EnrolledPrimarySectionIndex, get_enrolled_primary_section_index, get_sis_section, \
+    refresh_enrolled_primary_section_index, search_enrolled_primary_sections, search_enrolled_primary_sections_for_parsed_code
+import mock
 import pytest
 
 
@@ -101,3 +104,75 @@ class TestGetSisSection:
             assert section['meetings'][0]['time'] is None
             assert section['meetings'][0]['location'] is None
             assert section['meetings'][0]['instructors'] == ['Hal Colossus']
+
+
+class TestEnrolledPrimarySectionIndex:
+
+    def test_search_by_course_name(self, app):
+        """Finds sections by compressed course name prefix, in course and section order."""
+        sections, total_count = search_enrolled_primary_sections('2178', 'MATH1')
+        assert total_count == 6
+        assert [(s['sis_course_name'], s['sis_section_num']) for s in sections] == [
+            ('MATH 16A', '001'),
+            ('MATH 16A', '002'),
+            ('MATH 16B', '001'),
+            ('MATH 185', '001'),
+            ('MATH 1A', '001'),
+            ('MATH 1A', '002'),
+        ]
+
+    def test_search_by_course_name_with_limit(self, app):
+        """Counts all matches when results are limited."""
+        sections, total_count = search_enrolled_primary_sections('2178', 'MATH', limit=2)
+        assert total_count == 7
+        assert [s['sis_section_id'] for s in sections] == ['22172', '22173']
+
+    def test_search_by_parsed_code(self, app):
+        sections, total_count = search_enrolled_primary_sections_for_parsed_code('2178', 'MATH', '16')
+        assert total_count == 3
+        assert {s['sis_course_name'] for s in sections} == {'MATH 16A', 'MATH 16B'}
+        sections, total_count = search_enrolled_primary_sections_for_parsed_code('2178', None, '1A', limit=1)
+        assert total_count == 3
+        assert sections[0]['sis_course_name'] == 'DANISH 1A'
+        assert search_enrolled_primary_sections_for_parsed_code('2178', 'DANISH', '16') == ([], 0)
+
+    def test_index_per_term(self, app):
+        """Keeps a separate index for each term."""
+        sections, total_count = search_enrolled_primary_sections('2172', 'MATH')
+        assert total_count == 1
+        assert sections[0]['sis_section_id'] == '22100'
+        index = refresh_enrolled_primary_section_index('2172')
+        assert index.term_id == '2172'
+        assert len(index.sections) == 1
+
+    def test_null_section_attributes(self, app):
+        """Sorts sections lacking instruction format or section number rather than fail."""
+        rows = [
+            {
+                'sis_catalog_id': '1A',
+                'sis_course_name_compressed': 'MATH1A',
+                'sis_instruction_format': instruction_format,
+                'sis_section_id': section_id,
+                'sis_section_num': section_num,
+                'sis_subject_area_compressed': 'MATH',
+            } for section_id, instruction_format, section_num in [('1', 'LEC', '002'), ('2', None, '001'), ('3', 'LEC', None)]
+        ]
+        index = EnrolledPrimarySectionIndex('2178', rows)
+        assert [s['sis_section_id'] for s in index.sections] == ['2', '3', '1']
+
+    def test_rebuild_on_change_notice(self, app):
+        """A refresh announced by another process replaces this worker's index for that term only."""
+        previous_index = get_enrolled_primary_section_index('2178')
+        other_term_index = get_enrolled_primary_section_index('2172')
+        get_sections = mock.patch.object(
+            data_loch,
+            'get_enrolled_primary_sections_for_term',
+            wraps=data_loch.get_enrolled_primary_sections_for_term,
+        )
+        with get_sections as get_enrolled_primary_sections_for_term:
+            search_index_changes._dispatch('enrolled_primary_sections_2178')
+            index = get_enrolled_primary_section_index('2178')
+            assert index is not previous_index
+            assert get_enrolled_primary_section_index('2178') is index
+            assert get_enrolled_primary_section_index('2172') is other_term_index
+            get_enrolled_primary_sections_for_term.assert_called_once_with('2178')
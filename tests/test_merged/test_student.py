@@ -23,8 +23,12 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
+from boac.externals import data_loch
 from boac.merged import student
+from boac.merged.sis_terms import current_term_id, future_term_id
+from boac.models.json_cache import clear, fetch
 from boac.models.manually_added_advisee import ManuallyAddedAdvisee
+import mock
 
 
 coe_advisor = '1133399'
@@ -66,11 +70,38 @@ class TestMergedStudent:
         assert profiles[1]['uid'] == '27182'
         assert profiles[1]['underrepresented'] is None
 
-    def test_get_historical_student_profiles(self):
-        """Returns profiles of non-current students after adding them to manually_added_advisees."""
+    def test_get_merged_enrollment_terms(self, fake_auth):
+        """Caches merged past terms and merges only current and future terms on later views."""
+        fake_auth.login(coe_advisor)
+        sid = '11667051'
+        cache_key = f'merged_enrollment_terms_{current_term_id()}_{sid}'
+        enrollment_results = data_loch.get_enrollments_for_sid(sid, latest_term_id=future_term_id())
+        expected = student.merge_enrollment_terms(enrollment_results, academic_standing={'2172': 'GST'})
+
+        clear(cache_key)
+        terms = student.get_merged_enrollment_terms(sid, academic_standing={'2172': 'GST'})
+        assert terms == expected
+        past_terms = fetch(cache_key)
+        assert len(past_terms)
+        assert all(t['termId'] < current_term_id() for t in past_terms)
+
+        with mock.patch.object(data_loch, 'get_enrollments_for_sid', wraps=data_loch.get_enrollments_for_sid) as get_enrollments:
+            terms = student.get_merged_enrollment_terms(sid, academic_standing={'2172': 'GST'})
+            get_enrollments.assert_called_once_with(sid, latest_term_id=future_term_id(), first_term_id=current_term_id())
+        assert terms == expected
+
+    def test_get_full_student_profiles_with_historical(self):
+        """Resolves current and non-current students in one loch query, without registering anyone as a side effect."""
         ManuallyAddedAdvisee.query.delete()
         assert len(ManuallyAddedAdvisee.get_all()) == 0
 
-        profiles = student.get_historical_student_profiles(['2718281828', '3141592653'])
-        assert len(profiles) == 2
-        assert len(ManuallyAddedAdvisee.get_all()) == 2
+        sids = ['2718281828', '11667051', '3141592653', '9999999999']
+        with mock.patch.object(data_loch, 'get_student_profiles', wraps=data_loch.get_student_profiles) as get_student_profiles:
+            profiles = student.get_full_student_profiles(sids, include_historical=True)
+            get_student_profiles.assert_called_once_with(sids, include_historical=True)
+        assert [p['sid'] for p in profiles] == ['11667051', '2718281828', '3141592653']
+        assert not profiles[0].get('fullProfilePending')
+        assert profiles[1]['fullProfilePending'] is True
+        assert profiles[2]['fullProfilePending'] is True
+        assert all('photoUrl' in p for p in profiles)
+        assert len(ManuallyAddedAdvisee.get_all()) == 0
@@ -0,0 +1,92 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from boac.externals import data_loch
+from boac.lib.change_feed import search_index_changes
+from boac.merged import typeahead
+import mock
+
+
+class TestTypeahead:
+    """In-memory typeahead index."""
+
+    def test_match_students_by_name(self, app):
+        """Matches current students by name prefix, ordered by first and last name."""
+        students = typeahead.match_students_by_name_or_sid(['PAUL'])
+        assert [(s['first_name'], s['last_name']) for s in students] == [
+            ('Paul', 'Farestveit'),
+            ('Paul', 'Kerschen'),
+            ('Wolfgang', "Pauli-O'Rourke"),
+        ]
+
+    def test_match_students_by_multiple_prefixes(self, app):
+        """Every prefix must match."""
+        students = typeahead.match_students_by_name_or_sid(['PAUL', 'K'])
+        assert [s['sid'] for s in students] == ['3456789012']
+
+    def test_match_students_by_sid(self, app):
+        """Matches current and non-current students by SID prefix."""
+        students = typeahead.match_students_by_name_or_sid(['9'])
+        assert [s['sid'] for s in students] == ['9100000000', '9191919191', '9000000000']
+
+    def test_match_students_limit(self, app):
+        students = typeahead.match_students_by_name_or_sid(['PAUL'], limit='2')
+        assert len(students) == 2
+
+    def test_match_advising_note_authors_by_name(self, app):
+        authors = typeahead.match_advising_note_authors_by_name(['JO'])
+        assert [(a['first_name'], a['last_name']) for a in authors] == [
+            ('John', 'Deleted-in-BOA'),
+            ('Joni', 'Mitchell'),
+            ('Robert', 'Johnson'),
+        ]
+        assert typeahead.match_advising_note_authors_by_name(['JO', 'MITCH'])[0]['uid'] == '1133399'
+        assert typeahead.match_advising_note_authors_by_name(['ZZZ']) == []
+
+    def test_refresh_swaps_index(self, app):
+        """Refresh replaces the live index."""
+        previous_index = typeahead.get_typeahead_index()
+        index = typeahead.refresh_typeahead_index()
+        assert index is not previous_index
+        assert typeahead.get_typeahead_index() is index
+
+    def test_refresh_keeps_index_when_loch_fails(self, app):
+        """A failed loch query leaves the previous index in place."""
+        previous_index = typeahead.get_typeahead_index()
+        with mock.patch.object(data_loch, 'get_student_names', return_value=None):
+            assert typeahead.refresh_typeahead_index() is previous_index
+        assert typeahead.get_typeahead_index() is previous_index
+        assert typeahead.match_students_by_name_or_sid(['PAUL'])
+
+    def test_rebuild_on_change_notice(self, app):
+        """A refresh announced by another process replaces this worker's index on next use."""
+        previous_index = typeahead.get_typeahead_index()
+        assert typeahead.get_typeahead_index() is previous_index
+        with mock.patch.object(data_loch, 'get_student_names', wraps=data_loch.get_student_names) as get_student_names:
+            search_index_changes._dispatch('typeahead')
+            index = typeahead.get_typeahead_index()
+            assert index is not previous_index
+            assert typeahead.get_typeahead_index() is index
+            assert get_student_names.call_count == 1
@@ -0,0 +1,83 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from boac import db
+from boac.lib.change_feed import user_session_changes
+from boac.merged.user_session import UserSession
+from boac.models import json_cache
+from boac.models.authorized_user import AuthorizedUser
+import mock
+from tests.util import count_statements, override_config
+
+coe_advisor_uid = '1133399'
+
+
+class TestUserSession:
+    """User session cached in worker memory."""
+
+    def test_session_served_from_memory(self, app):
+        """Loads a cached session profile without database queries."""
+        user_id = AuthorizedUser.get_id_per_uid(coe_advisor_uid)
+        with override_config(app, 'USER_SESSION_CACHE_TTL', 60):
+            UserSession.flush_cache_for_id(user_id)
+            assert UserSession(user_id).get_uid() == coe_advisor_uid
+            with count_statements() as statements:
+                user_session = UserSession(user_id)
+            UserSession.flush_cache_for_id(user_id)
+        assert user_session.get_uid() == coe_advisor_uid
+        assert user_session.is_authenticated
+        assert statements == []
+
+    def test_flush_cache_for_id(self, app):
+        """Flushing a user's session drops the copy held in memory."""
+        user_id = AuthorizedUser.get_id_per_uid(coe_advisor_uid)
+        with override_config(app, 'USER_SESSION_CACHE_TTL', 60):
+            assert UserSession(user_id).in_demo_mode is False
+            user = AuthorizedUser.find_by_id(user_id)
+            user.in_demo_mode = True
+            db.session.flush()
+            assert UserSession(user_id).in_demo_mode is False
+            UserSession.flush_cache_for_id(user_id)
+            assert UserSession(user_id).in_demo_mode is True
+            UserSession.flush_cache_for_id(user_id)
+
+    def test_flush_published_to_other_workers(self, app):
+        """A flush published by any worker process invalidates the copy held in this one."""
+        user_id = AuthorizedUser.get_id_per_uid(coe_advisor_uid)
+        with override_config(app, 'USER_SESSION_CACHE_TTL', 60):
+            with mock.patch.object(user_session_changes, 'publish', wraps=user_session_changes.publish) as publish:
+                UserSession.flush_cache_for_id(user_id)
+                publish.assert_called_once_with(str(user_id))
+            assert UserSession(user_id).in_demo_mode is False
+            user = AuthorizedUser.find_by_id(user_id)
+            user.in_demo_mode = True
+            db.session.flush()
+            assert UserSession(user_id).in_demo_mode is False
+            # Simulate a flush in another worker: it clears the row cached in the database, and its notification is
+            # delivered only on commit, so tests bump the sequence as the listener would.
+            json_cache.clear(f'boa_user_session_{user_id}')
+            user_session_changes._dispatch(str(user_id))
+            assert UserSession(user_id).in_demo_mode is True
+            UserSession.flush_cache_for_id(user_id)
@@ -28,6 +28,7 @@ from time import sleep
 
 from boac import std_commit
 from boac.models.alert import Alert
+from boac.models.authorized_user import AuthorizedUser
 import pytest
 from tests.util import override_config
 
@@ -107,6 +108,23 @@ class TestAlert:
         assert len(get_current_alerts('11667051')) == 0
         assert len(get_current_alerts('3456789012')) == 0
 
+    def test_alert_counts_per_viewer(self):
+        """Counts of undismissed alerts are kept per viewer through dismissal and deactivation."""
+        viewer_id = AuthorizedUser.find_by_uid('2040').id
+        other_viewer_id = AuthorizedUser.find_by_uid('1133399').id
+        Alert.update_all_for_term(2178)
+        assert Alert.current_alert_counts_for_sids(viewer_id, ['11667051'], count_only=True) == [{'sid': '11667051', 'alertCount': 2}]
+
+        alert_id = get_current_alerts('11667051')[0]['id']
+        Alert.dismiss(alert_id, viewer_id)
+        Alert.dismiss(alert_id, viewer_id)
+        assert Alert.current_alert_counts_for_sids(viewer_id, ['11667051'], count_only=True) == [{'sid': '11667051', 'alertCount': 1}]
+        assert Alert.current_alert_counts_for_sids(other_viewer_id, ['11667051'], count_only=True) == [{'sid': '11667051', 'alertCount': 2}]
+
+        Alert.deactivate_all_for_term(2178)
+        assert Alert.current_alert_counts_for_sids(viewer_id, ['11667051'], count_only=True) == []
+        assert Alert.current_alert_counts_for_sids(other_viewer_id, ['11667051'], count_only=True) == []
+
     def test_assignment_alerts_change_updated_at_timestamp(self):
         Alert.update_all_for_term(2178)
         alerts = Alert.current_alerts_for_sid(sid='3456789012', viewer_id='2040')
@@ -23,11 +23,12 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 
-from datetime import date
+from datetime import date, datetime
 
 from boac.models.appointment_availability import AppointmentAvailability
 from boac.models.authorized_user import AuthorizedUser
 import pytest
+import pytz
 
 
 @pytest.fixture()
@@ -209,3 +210,22 @@ class TestAppointmentAvailability:
         assert len(monday_schedule) == 1
         assert monday_schedule[0]['startTime'] == '09:00:00'
         assert monday_schedule[0]['endTime'] == '14:00:00'
+
+    def test_openings_over_date_range(self, advisor_1_id, advisor_2_id):
+        AppointmentAvailability.create(advisor_1_id, 'QCADV', '10:00', '11:00', 'Fri')
+        AppointmentAvailability.create(advisor_1_id, 'QCADV', '10:00', '11:00', 'Mon')
+        AppointmentAvailability.create(advisor_2_id, 'QCADV', '10:00', '11:00', 'Mon')
+        AppointmentAvailability.create(advisor_2_id, 'QCADV', '09:00', '09:30', 'Mon', '2020-03-09')
+        AppointmentAvailability.create(advisor_1_id, 'QCADV', None, None, 'Fri', '2020-03-13')
+
+        # Friday the 6th through Friday the 13th spans the start of daylight saving time on the 8th.
+        dates = [date(2020, 3, d) for d in range(6, 14)]
+        booked_times = [('53791', datetime(2020, 3, 9, 17, 30, tzinfo=pytz.utc))]
+        openings = AppointmentAvailability.get_openings('QCADV', dates, booked_times)
+        assert [(o['uid'], o['startTime']) for o in openings] == [
+            ('53791', '2020-03-06T18:00:00+00:00'),
+            ('53791', '2020-03-06T18:30:00+00:00'),
+            ('188242', '2020-03-09T16:00:00+00:00'),
+            ('53791', '2020-03-09T17:00:00+00:00'),
+        ]
+        assert openings[0]['endTime'] == '2020-03-06 18:30:00+00:00'
@@ -151,6 +151,24 @@ class TestCohortFilter:
         std_commit(allow_test_environment=True)
         assert cohort_count(owner) == previous_owner_count - 1
 
+    def test_membership_refresh_writes_changes_only(self):
+        """Membership refresh records only added and removed SIDs."""
+        cohort = CohortFilter.create(
+            uid=asc_advisor_uid,
+            name='Football, Offense',
+            filter_criteria={
+                'groupCodes': ['MFB-DB', 'MFB-DL', 'MFB-MLB', 'MFB-OLB'],
+            },
+        )
+        cohort_filter = CohortFilter.query.filter_by(id=cohort['id']).first()
+        sids = CohortFilter.get_sids(cohort_filter.id)
+        assert len(sids) > 1
+        added_sids, removed_sids = cohort_filter._update_members(sids[1:] + ['9999999999'])
+        assert added_sids == ['9999999999']
+        assert removed_sids == [sids[0]]
+        assert sorted(CohortFilter.get_sids(cohort_filter.id)) == sorted(sids[1:] + ['9999999999'])
+        assert cohort_filter._update_members(sids[1:] + ['9999999999']) == ([], [])
+
     def test_jsonify_cohort(self):
         """Can be JSONified."""
         cohorts = AuthorizedUser.find_by_uid(coe_advisor_uid).cohort_filters
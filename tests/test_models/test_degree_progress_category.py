@@ -0,0 +1,124 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from boac import db
+from boac.models.authorized_user import AuthorizedUser
+from boac.models.degree_progress_category import DegreeProgressCategory
+from boac.models.degree_progress_course import DegreeProgressCourse
+from boac.models.degree_progress_template import DegreeProgressTemplate
+from boac.models.degree_progress_unit_requirement import DegreeProgressUnitRequirement
+import pytest
+from tests.util import count_statements
+
+coe_advisor_uid = '1133399'
+student_sid = '11667051'
+
+
+def _create_degree_check(name, category_count):
+    coe_advisor_id = AuthorizedUser.get_id_per_uid(coe_advisor_uid)
+    degree_check = DegreeProgressTemplate.create(
+        advisor_dept_codes=['COENG'],
+        created_by=coe_advisor_id,
+        degree_name=name,
+        student_sid=student_sid,
+    )
+    unit_requirement = DegreeProgressUnitRequirement.create(
+        created_by=coe_advisor_id,
+        min_units=12,
+        name='Upper Division',
+        template_id=degree_check.id,
+    )
+    for index in range(category_count):
+        category = DegreeProgressCategory.create(
+            category_type='Category',
+            name=f'Category {index}',
+            position=index,
+            template_id=degree_check.id,
+            unit_requirement_ids=[unit_requirement.id],
+        )
+        subcategory = DegreeProgressCategory.create(
+            category_type='Subcategory',
+            name=f'Subcategory {index}',
+            parent_category_id=category.id,
+            position=index,
+            template_id=degree_check.id,
+        )
+        DegreeProgressCourse.create(
+            category_id=subcategory.id,
+            degree_check_id=degree_check.id,
+            display_name=f'Course {index}',
+            grade='A',
+            section_id=10000 + index,
+            sid=student_sid,
+            term_id=2178,
+            units=4,
+            unit_requirement_ids=[unit_requirement.id],
+        )
+    return degree_check
+
+
+def _count_statements(func):
+    with count_statements() as statements:
+        result = func()
+    return result, len(statements)
+
+
+@pytest.mark.usefixtures('db_session')
+class TestDegreeProgressCategory:
+    """Degree Progress Category."""
+
+    def test_get_categories(self):
+        """Assembles the category tree with courses and unit requirements."""
+        degree_check = _create_degree_check('Celtic Studies BA 2021', category_count=2)
+        categories = DegreeProgressCategory.get_categories(template_id=degree_check.id)
+        assert [c['name'] for c in categories] == ['Category 0', 'Category 1']
+        for index, category in enumerate(categories):
+            assert [u['name'] for u in category['unitRequirements']] == ['Upper Division']
+            assert category['courseRequirements'] == []
+            assert len(category['subcategories']) == 1
+            subcategory = category['subcategories'][0]
+            assert subcategory['name'] == f'Subcategory {index}'
+            assert len(subcategory['courses']) == 1
+            course = subcategory['courses'][0]
+            assert course['name'] == f'Course {index}'
+            assert [u['name'] for u in course['unitRequirements']] == ['Upper Division']
+
+    def test_get_categories_query_count(self):
+        """The number of queries does not grow with the size or number of templates."""
+        small_id = _create_degree_check('Celtic Studies BA 2021', category_count=1).id
+        large_id = _create_degree_check('Celtic Studies BA 2022', category_count=5).id
+        db.session.expire_all()
+        _, small_count = _count_statements(lambda: DegreeProgressCategory.get_categories(template_id=small_id))
+        db.session.expire_all()
+        _, large_count = _count_statements(lambda: DegreeProgressCategory.get_categories(template_id=large_id))
+        assert small_count == large_count == 2
+
+        db.session.expire_all()
+        categories_per_template, count = _count_statements(
+            lambda: DegreeProgressCategory.get_categories_per_template([small_id, large_id]),
+        )
+        assert count == 2
+        assert len(categories_per_template[small_id]) == 1
+        assert len(categories_per_template[large_id]) == 5
@@ -0,0 +1,216 @@
+"""
+Copyright ©2021. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from boac.externals import data_loch
+from boac.models.authorized_user import AuthorizedUser
+from boac.models.degree_progress_category import DegreeProgressCategory
+from boac.models.degree_progress_course import DegreeProgressCourse
+from boac.models.degree_progress_template import DegreeProgressTemplate
+from boac.models.degree_progress_unit_requirement import DegreeProgressUnitRequirement
+import mock
+import pytest
+from tests.util import count_statements
+
+coe_advisor_uid = '1133399'
+
+
+@pytest.fixture()
+def template_with_categories():
+    coe_advisor_id = AuthorizedUser.get_id_per_uid(coe_advisor_uid)
+    template = DegreeProgressTemplate.create(
+        advisor_dept_codes=['COENG'],
+        created_by=coe_advisor_id,
+        degree_name='Celtic Studies BA 2021',
+    )
+    unit_requirements = [
+        DegreeProgressUnitRequirement.create(
+            created_by=coe_advisor_id,
+            min_units=index * 10,
+            name=f'Unit Requirement #{index}',
+            template_id=template.id,
+        ) for index in (1, 2)
+    ]
+    category = DegreeProgressCategory.create(
+        category_type='Category',
+        name='Ancient Languages',
+        position=1,
+        template_id=template.id,
+        unit_requirement_ids=[unit_requirements[0].id],
+    )
+    subcategory = DegreeProgressCategory.create(
+        category_type='Subcategory',
+        name='Old Irish',
+        parent_category_id=category.id,
+        position=1,
+        template_id=template.id,
+    )
+    DegreeProgressCategory.create(
+        category_type='Course Requirement',
+        course_units_lower=3,
+        course_units_upper=4,
+        name='Celtic 105A',
+        parent_category_id=subcategory.id,
+        position=1,
+        template_id=template.id,
+        unit_requirement_ids=[u.id for u in unit_requirements],
+    )
+    DegreeProgressCategory.create(
+        category_type='Course Requirement',
+        name='Celtic 70',
+        parent_category_id=category.id,
+        position=1,
+        template_id=template.id,
+    )
+    return template
+
+
+def _simplify(categories):
+    return [
+        {
+            'categoryType': c['categoryType'],
+            'courseRequirements': _simplify(c.get('courseRequirements', [])),
+            'name': c['name'],
+            'subcategories': _simplify(c.get('subcategories', [])),
+            'unitRequirements': [u['name'] for u in c['unitRequirements']],
+            'units': [c['unitsLower'], c['unitsUpper']],
+        } for c in categories
+    ]
+
+
+@pytest.mark.usefixtures('db_session')
+class TestDegreeProgressTemplate:
+    """Degree Progress Template."""
+
+    def test_create_clones(self, template_with_categories):
+        """Copies the category tree and unit requirements for each student."""
+        template = template_with_categories
+        sids = ['11667051', '7890123456', '9100000000']
+        clone_ids = DegreeProgressTemplate.create_clones(
+            advisor_dept_codes=['COENG'],
+            created_by=template.created_by,
+            sids=sids,
+            template_id=template.id,
+        )
+        assert sorted(clone_ids.keys()) == sorted(sids)
+        expected_categories = _simplify(DegreeProgressCategory.get_categories(template_id=template.id))
+        for sid, clone_id in clone_ids.items():
+            clone = DegreeProgressTemplate.find_by_id(clone_id)
+            assert clone.student_sid == sid
+            assert clone.parent_template_id == template.id
+            assert clone.degree_name == template.degree_name
+            assert sorted(u.name for u in clone.unit_requirements) == ['Unit Requirement #1', 'Unit Requirement #2']
+            categories = DegreeProgressCategory.get_categories(template_id=clone_id)
+            assert _simplify(categories) == expected_categories
+            clone_unit_requirement_ids = set(u.id for u in clone.unit_requirements)
+            for category in categories:
+                assert set(u['id'] for u in category['unitRequirements']) <= clone_unit_requirement_ids
+
+    def test_create_clones_of_moved_category(self, template_with_categories):
+        """Keeps a category moved under one created after it in place."""
+        template = template_with_categories
+        later_category = DegreeProgressCategory.create(
+            category_type='Category',
+            name='Modern Languages',
+            position=2,
+            template_id=template.id,
+        )
+        moved_category = DegreeProgressCategory.query.filter_by(template_id=template.id, name='Celtic 70').first()
+        DegreeProgressCategory.update(
+            category_id=moved_category.id,
+            course_units_lower=None,
+            course_units_upper=None,
+            description=None,
+            name=moved_category.name,
+            parent_category_id=later_category.id,
+            unit_requirement_ids=[],
+        )
+        expected_categories = _simplify(DegreeProgressCategory.get_categories(template_id=template.id))
+        assert [c['name'] for c in expected_categories] == ['Ancient Languages', 'Modern Languages']
+        clone_ids = DegreeProgressTemplate.create_clones(
+            advisor_dept_codes=['COENG'],
+            created_by=template.created_by,
+            sids=['11667051'],
+            template_id=template.id,
+        )
+        assert _simplify(DegreeProgressCategory.get_categories(template_id=clone_ids['11667051'])) == expected_categories
+
+    def test_create_clones_query_count(self, template_with_categories):
+        """Issues the same number of statements no matter how many students."""
+        template = template_with_categories
+        statement_counts = []
+        for sids in (['11667051'], ['7890123456', '9100000000', '9000000000', '2345678901']):
+            with count_statements() as statements:
+                DegreeProgressTemplate.create_clones(
+                    advisor_dept_codes=['COENG'],
+                    created_by=template.created_by,
+                    sids=sids,
+                    template_id=template.id,
+                )
+            statement_counts.append(len(statements))
+        assert statement_counts[0] == statement_counts[1]
+
+    def test_create_plain_copy(self, template_with_categories):
+        """A copy that is not a degree check has no student and no parent template."""
+        template = template_with_categories
+        clone_ids = DegreeProgressTemplate.create_clones(
+            advisor_dept_codes=['COENG'],
+            created_by=template.created_by,
+            degree_name='Celtic Studies BA 2022',
+            sids=[None],
+            template_id=template.id,
+        )
+        clone = DegreeProgressTemplate.find_by_id(clone_ids[None])
+        assert clone.degree_name == 'Celtic Studies BA 2022'
+        assert clone.parent_template_id is None
+        assert clone.student_sid is None
+
+    def test_sync_sis_courses(self, template_with_categories):
+        """Imports SIS courses once, and again only when enrollment data changes."""
+        template = template_with_categories
+        sid = '11667051'
+        clone_ids = DegreeProgressTemplate.create_clones(
+            advisor_dept_codes=['COENG'],
+            created_by=template.created_by,
+            sids=[sid],
+            template_id=template.id,
+        )
+        degree_check = DegreeProgressTemplate.find_by_id(clone_ids[sid])
+        sections = degree_check.sync_sis_courses()
+        assert len(sections)
+        courses = DegreeProgressCourse.find_by_sid(degree_check_id=degree_check.id, sid=sid)
+        assert len(courses)
+        section_keys = set((s['sectionId'], s['termId']) for s in sections)
+        for course in courses:
+            assert (course.section_id, str(course.term_id)) in section_keys
+
+        with mock.patch.object(data_loch, 'get_enrollments_for_sid') as get_enrollments:
+            assert degree_check.sync_sis_courses() == sections
+            assert not get_enrollments.called
+        assert len(DegreeProgressCourse.find_by_sid(degree_check_id=degree_check.id, sid=sid)) == len(courses)
+
+        with mock.patch.object(data_loch, 'get_enrollments_version_for_sid', return_value='changed'):
+            assert degree_check.sync_sis_courses() == sections
+        # Courses already in the degree check are not imported twice.
+        assert len(DegreeProgressCourse.find_by_sid(degree_check_id=degree_check.id, sid=sid)) == len(courses)
@@ -25,8 +25,10 @@ ENHANCEMENTS, OR MODIFICATIONS.
 
 from contextlib import contextmanager
 
+from boac import db
 import boto3
 import moto
+from sqlalchemy import event
 
 
 @contextmanager
@@ -60,6 +62,21 @@ def mock_advising_note_s3_bucket(app):
         yield s3
 
 
+@contextmanager
+def count_statements():
+    """Collect the SQL statements executed within the block."""
+    engine = db.session.get_bind()
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', _record)
+
+
 @contextmanager
 def override_config(app, key, value):
     """Temporarily override an app config value."""